@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SnapText 渲染性能基准测试
+
+生成合成底图（1080p/4K/8K）和数据集（100–100k 行，拉丁/中日韩文字，1–20 个位置），
+在 offscreen Qt 平台下通过 ImageTextProcessor 批量生成，
+以 JSON 输出每个用例的 images/s、各阶段耗时、峰值内存和写入字节数。
+
+每个用例在独立的子进程中运行，峰值内存互不影响。
+
+用法（在项目根目录下运行）:
+    python -m benchmarks.bench_render --preset quick
+    python -m benchmarks.bench_render --resolutions 4k --rows 1000 --scripts cjk --positions 5,20 -o result.json
+    python -m benchmarks.bench_render --preset standard --baseline result.json --threshold 0.1
+"""
+import os
+import sys
+import csv
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from itertools import product
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+# 合成底图分辨率
+RESOLUTIONS = {
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+    '8k': (7680, 4320),
+}
+
+# 文字类型
+SCRIPTS = ('latin', 'cjk')
+
+# 预设的用例组合
+PRESETS = {
+    'quick': {'resolutions': ['1080p'], 'rows': [100], 'scripts': ['latin', 'cjk'], 'positions': [3]},
+    'standard': {'resolutions': ['1080p', '4k'], 'rows': [100, 1000], 'scripts': ['latin', 'cjk'],
+                 'positions': [1, 5, 20]},
+    'full': {'resolutions': ['1080p', '4k', '8k'], 'rows': [100, 1000, 10000, 100000],
+             'scripts': ['latin', 'cjk'], 'positions': [1, 5, 20]},
+}
+
+# 常用汉字范围（CJK 统一表意文字）
+_CJK_RANGE = (0x4E00, 0x9FA5)
+
+
+def case_id(case):
+    """用例的唯一名称，用于与基线结果对比"""
+    return (f"{case['resolution']}-{case['rows']}r-{case['script']}-{case['positions']}p"
+            f"-w{case['workers']}-{case['format']}")
+
+
+def _random_text(rng, script):
+    """生成一段随机文字"""
+    if script == 'cjk':
+        return "".join(chr(rng.randint(*_CJK_RANGE)) for _ in range(rng.randint(2, 4)))
+    word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 12)))
+    return word.capitalize()
+
+
+def make_base_image(path, width, height, seed):
+    """
+    生成合成底图：渐变背景加随机色块，避免纯色图片的编码结果过于理想
+
+    Args:
+        path: 保存路径
+        width: 宽度
+        height: 高度
+        seed: 随机种子
+    """
+    from PyQt6.QtCore import QRect
+    from PyQt6.QtGui import QImage, QPainter, QColor, QLinearGradient
+
+    rng = random.Random(seed)
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    painter = QPainter(image)
+    gradient = QLinearGradient(0, 0, width, height)
+    gradient.setColorAt(0, QColor(240, 244, 250))
+    gradient.setColorAt(1, QColor(200, 214, 236))
+    painter.fillRect(0, 0, width, height, gradient)
+    for _ in range(60):
+        w = rng.randint(width // 40, width // 6)
+        h = rng.randint(height // 40, height // 6)
+        rect = QRect(rng.randint(0, width - w), rng.randint(0, height - h), w, h)
+        painter.fillRect(rect, QColor(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255), 90))
+    painter.end()
+    if not image.save(path):
+        raise RuntimeError(f"无法保存合成底图: {path}")
+
+
+def make_dataset(path, rows, columns, script, seed):
+    """
+    生成合成数据集 CSV（第一列带行号，保证输出文件名不重复）
+
+    Args:
+        path: 保存路径
+        rows: 行数
+        columns: 列数（与位置数相同）
+        script: 文字类型 latin/cjk
+        seed: 随机种子
+    """
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([f"col{i+1}" for i in range(columns)])
+        for i in range(rows):
+            row = [_random_text(rng, script) for _ in range(columns)]
+            row[0] = f"{row[0]}{i}"
+            writer.writerow(row)
+
+
+def make_positions(width, height, count, script, seed):
+    """
+    生成网格排列的文字位置
+
+    Args:
+        width: 底图宽度
+        height: 底图高度
+        count: 位置数
+        script: 文字类型 latin/cjk
+        seed: 随机种子
+
+    Returns:
+        文字位置信息列表
+    """
+    from PyQt6.QtCore import QPoint
+    from PyQt6.QtGui import QFont, QColor
+
+    rng = random.Random(seed)
+    grid_cols = math.ceil(math.sqrt(count))
+    grid_rows = math.ceil(count / grid_cols)
+    positions = []
+    for i in range(count):
+        col, row = i % grid_cols, i // grid_cols
+        x = int((col + 0.5) * width / grid_cols)
+        y = int((row + 0.5) * height / grid_rows)
+        font = QFont("Arial") if script == 'latin' else QFont()
+        font.setPixelSize(max(12, height // (grid_rows * 6)))
+        font.setBold(i % 3 == 0)
+        positions.append({
+            'position': QPoint(x, y),
+            'text': f"位置 {i+1}",
+            'font': font,
+            'color': QColor(rng.randint(0, 160), rng.randint(0, 160), rng.randint(0, 160)),
+            'index': i,
+            'relative_x': x / width,
+            'relative_y': y / height,
+        })
+    return positions
+
+
+def _peak_rss_mb(who):
+    """进程峰值内存（MB），不支持时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def _bytes_written(output_dir):
+    """输出目录中图片文件的总字节数（不含任务清单和任务报告）"""
+    from src.config.constants import MANIFEST_FILENAME, JOB_REPORT_FILENAME
+
+    return sum(entry.stat().st_size for entry in os.scandir(output_dir)
+               if entry.is_file() and entry.name not in (MANIFEST_FILENAME, JOB_REPORT_FILENAME))
+
+
+def run_case(case, work_dir):
+    """
+    在当前进程中运行一个用例
+
+    Args:
+        case: 用例参数字典
+        work_dir: 存放合成输入和输出的目录
+
+    Returns:
+        结果字典
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtCore import QEventLoop
+    from PyQt6.QtGui import QGuiApplication
+    from src.processors.image_text_processor import ImageTextProcessor
+    from src.processors.output_encoder import OutputEncoder
+    from src.processors.text_processor import TextProcessor
+
+    app = QGuiApplication.instance() or QGuiApplication(["snaptext-bench"])
+
+    width, height = RESOLUTIONS[case['resolution']]
+    seed = case['seed']
+    image_path = os.path.join(work_dir, "base.png")
+    data_path = os.path.join(work_dir, "data.csv")
+    output_dir = os.path.join(work_dir, "out")
+
+    setup_start = time.perf_counter()
+    make_base_image(image_path, width, height, seed)
+    make_dataset(data_path, case['rows'], case['positions'], case['script'], seed)
+    text_positions = make_positions(width, height, case['positions'], case['script'], seed)
+
+    errors = []
+    text_processor = TextProcessor()
+    text_processor.error_occurred.connect(errors.append)
+    data = text_processor.import_text(file_path=data_path)
+    if not data:
+        raise RuntimeError(errors[-1] if errors else "无法加载合成数据")
+    setup_seconds = time.perf_counter() - setup_start
+
+    processor = ImageTextProcessor()
+    processor.error_occurred.connect(errors.append)
+    loop = QEventLoop()
+    result = {}
+    processor.job_finished.connect(lambda stats: (result.update(stats), loop.quit()))
+
+    start = time.perf_counter()
+    processor.start_generation(image_path, data, text_positions, output_dir,
+                               workers=case['workers'],
+                               encoder=OutputEncoder(image_format=case['format']),
+                               incremental=False,
+                               instrument=True)
+    loop.exec()
+    seconds = time.perf_counter() - start
+    if errors:
+        raise RuntimeError(errors[-1])
+
+    metrics = result['metrics']
+    rendered = result['rendered']
+    return dict(case, **{
+        'id': case_id(case),
+        'images': rendered,
+        'failed': result['failed'],
+        'seconds': round(seconds, 3),
+        'setup_seconds': round(setup_seconds, 3),
+        'images_per_second': round(rendered / seconds, 2) if seconds > 0 else None,
+        'stage_ms_per_image': {name: info['mean_ms'] for name, info in metrics['stages'].items()},
+        'stage_percentiles_ms': {name: {key: info[key] for key in ('p50_ms', 'p95_ms', 'p99_ms')}
+                                 for name, info in metrics['stages'].items()},
+        'image_latency_ms': metrics['image_latency'],
+        'stage_utilization': {name: info['utilization'] for name, info in result.get('stages', {}).items()},
+        'peak_rss_mb': _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        'peak_rss_children_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+        'bytes_written': _bytes_written(output_dir),
+    })
+
+
+def run_case_in_subprocess(case, keep_dir=None):
+    """
+    在独立的子进程中运行一个用例，使峰值内存统计互不影响
+
+    Args:
+        case: 用例参数字典
+        keep_dir: 保留合成输入和输出的目录，默认使用临时目录并在结束后删除
+
+    Returns:
+        结果字典
+    """
+    work_dir = keep_dir or tempfile.mkdtemp(prefix="snaptext_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_render", "--run-case", json.dumps(case),
+             "--work-dir", work_dir],
+            cwd=root_dir, stdout=subprocess.PIPE, text=True, encoding='utf-8'
+        )
+        if completed.returncode != 0:
+            return dict(case, id=case_id(case), error=f"子进程退出码 {completed.returncode}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        if keep_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def build_cases(args):
+    """根据预设和命令行参数展开用例列表"""
+    matrix = dict(PRESETS[args.preset])
+    for key in ('resolutions', 'rows', 'scripts', 'positions'):
+        value = getattr(args, key)
+        if value:
+            matrix[key] = value
+
+    cases = []
+    for resolution, rows, script, positions, workers in product(
+            matrix['resolutions'], matrix['rows'], matrix['scripts'], matrix['positions'], args.workers):
+        cases.append({
+            'resolution': resolution,
+            'rows': rows,
+            'script': script,
+            'positions': positions,
+            'workers': workers,
+            'format': args.format,
+            'seed': args.seed,
+        })
+    return cases
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """
+    与基线结果对比 images/s
+
+    Args:
+        results: 本次的用例结果列表
+        baseline: 基线 JSON（本工具的输出）
+        threshold: 允许的相对下降比例
+
+    Returns:
+        变慢的用例列表
+    """
+    previous = {case['id']: case for case in baseline.get('cases', []) if case.get('images_per_second')}
+    regressions = []
+    for case in results:
+        old = previous.get(case['id'])
+        if not old or not case.get('images_per_second'):
+            continue
+        change = case['images_per_second'] / old['images_per_second'] - 1
+        case['baseline_images_per_second'] = old['images_per_second']
+        case['change'] = round(change, 4)
+        if change < -threshold:
+            regressions.append(case['id'])
+    return regressions
+
+
+def environment_info():
+    """运行环境信息"""
+    from PyQt6.QtCore import QT_VERSION_STR
+    from src.config.constants import APP_VERSION
+
+    return {
+        'snaptext_version': APP_VERSION,
+        'python': platform.python_version(),
+        'qt': QT_VERSION_STR,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(",") if item]
+
+
+def _choice_list(choices):
+    def parse(value):
+        items = [item.strip().lower() for item in value.split(",") if item.strip()]
+        for item in items:
+            if item not in choices:
+                raise argparse.ArgumentTypeError(f"无效的取值 {item}，可选: {', '.join(choices)}")
+        return items
+    return parse
+
+
+def build_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_render",
+                                     description="SnapText 渲染性能基准测试")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick", help="预设的用例组合")
+    parser.add_argument("--resolutions", type=_choice_list(tuple(RESOLUTIONS)), help="底图分辨率，如 1080p,4k")
+    parser.add_argument("--rows", type=_int_list, help="数据行数，如 100,1000")
+    parser.add_argument("--scripts", type=_choice_list(SCRIPTS), help="文字类型，如 latin,cjk")
+    parser.add_argument("--positions", type=_int_list, help="文字位置数，如 1,5,20")
+    parser.add_argument("--workers", type=_int_list, default=[1], help="渲染进程数，如 1,4")
+    parser.add_argument("--format", choices=["png", "jpeg", "webp"], default="png", help="输出格式")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    parser.add_argument("-o", "--output", help="结果 JSON 的保存路径，默认输出到标准输出")
+    parser.add_argument("--baseline", help="用于对比的基线结果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="与基线相比 images/s 允许下降的比例，超过时退出码为1")
+    parser.add_argument("--keep", help="保留合成输入和输出的目录")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    """
+    基准测试入口
+
+    Args:
+        argv: 命令行参数列表（不含程序名）
+
+    Returns:
+        进程退出码
+    """
+    args = build_parser().parse_args(argv)
+
+    # 子进程：运行单个用例，把结果写到标准输出的最后一行
+    if args.run_case:
+        result = run_case(json.loads(args.run_case), args.work_dir)
+        print(json.dumps(result, ensure_ascii=False))
+        return 0
+
+    results = []
+    cases = build_cases(args)
+    for i, case in enumerate(cases, 1):
+        print(f"[{i}/{len(cases)}] {case_id(case)}", file=sys.stderr, flush=True)
+        keep_dir = os.path.join(args.keep, case_id(case)) if args.keep else None
+        result = run_case_in_subprocess(case, keep_dir)
+        if 'error' not in result:
+            print(f"    {result['images_per_second']} images/s, {result['bytes_written']} 字节",
+                  file=sys.stderr, flush=True)
+        results.append(result)
+
+    report = {'environment': environment_info(), 'cases': results}
+    exit_code = 1 if any('error' in result for result in results) else 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f), args.threshold)
+        report['regressions'] = regressions
+        if regressions:
+            print(f"性能下降超过 {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            exit_code = 1
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
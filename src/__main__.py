@@ -4,10 +4,18 @@
 """
 SnapText 应用程序主入口点
 允许通过 python -m src 来启动应用
+通过 python -m src render ... 进行无界面批量生成（子命令见 src/cli.py）
 """
 
 import sys
-from src.app import main
+import multiprocessing
 
 if __name__ == "__main__":
-    sys.exit(main()) 
\ No newline at end of file
+    # 打包后的程序启动渲染子进程时需要
+    multiprocessing.freeze_support()
+    from src.cli import COMMANDS, main as cli_main
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS + ("-h", "--help"):
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from src.app import main
+    sys.exit(main())
@@ -7,6 +7,7 @@ SnapText - 批量图片文字处理工具
 """
 import sys
 import os
+import multiprocessing
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QIcon
 
@@ -20,8 +21,8 @@ def main():
     主程序入口函数。
     初始化应用程序，设置图标，创建主窗口，并处理异常。
     """
-    # 初始化日志
-    logger = Logger()
+    # 获取日志记录器（每个进程只初始化一次）
+    logger = Logger.get_instance()
     logger.info(f"启动 {APP_NAME} v{APP_VERSION}")
     
     try:
@@ -50,4 +51,6 @@ def main():
         return 1
 
 if __name__ == "__main__":
+    # 打包后的程序（PyInstaller 以本文件为入口）启动渲染子进程时，子进程在这里执行渲染任务后退出，不会再打开主窗口
+    multiprocessing.freeze_support()
     sys.exit(main()) 
\ No newline at end of file
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SnapText - 批量图片文字处理工具
+无界面命令行入口，用于在服务器或定时任务中批量生成图片
+
+用法:
+    python -m src render --image 底图.png --data 数据.csv --template 模板.json --output 输出目录
+    python -m src render --image 底图.png --data 数据.csv --template 模板.json --output 输出.pdf
+    python -m src render --image 底图.png --data 数据.csv --template 模板.json --output 输出.docx --columns 2 --rows 3
+    python -m src render --image 底图.png --data 数据.csv --template 模板.json --output 输出.zip
+    python -m src render --image 底图.png --data 数据.csv --template 模板.json --output - > 输出.tar
+    python -m src bench-encode --image 底图.png --data 数据.csv --template 模板.json --format jpeg
+    python -m src check --image 底图.png --data 数据.csv --template 模板.json --max-width 400
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+
+from src.config.constants import (APP_NAME, APP_VERSION, DEFAULT_OUTPUT_FORMAT,
+                                  DEFAULT_PNG_COMPRESSION, DEFAULT_JPEG_QUALITY,
+                                  DEFAULT_WEBP_QUALITY, DEFAULT_PDF_COMPRESSION, DEFAULT_DOCX_COLUMNS,
+                                  DEFAULT_DOCX_ROWS, DEFAULT_NAME_TEMPLATE, DEFAULT_SHARD_SIZE,
+                                  RENDER_BACKENDS, DEFAULT_RENDER_BACKEND, DEFAULT_LOG_LEVEL, LOG_LEVEL_ENV,
+                                  LAYOUT_MAX_ISSUES)
+from src.utils.logger import logger
+
+# 命令行子命令（python -m src 后跟这些子命令时不启动图形界面）
+COMMANDS = ("render", "bench-encode", "check")
+
+
+def _add_input_arguments(parser):
+    """添加底图、数据和模板参数"""
+    parser.add_argument("--image", required=True, help="底图路径")
+    parser.add_argument("--data", required=True, help="数据文件路径 (CSV/TXT)")
+    parser.add_argument("--template", required=True, help="位置模板路径 (JSON，可在主窗口中保存)")
+
+
+def _add_encoder_arguments(parser):
+    """添加渲染后端和输出格式参数"""
+    parser.add_argument("--backend", choices=RENDER_BACKENDS, default=DEFAULT_RENDER_BACKEND,
+                        help="渲染后端：qt 使用 QPainter，pillow 使用 PIL.ImageDraw（不需要 Qt 平台插件）")
+    parser.add_argument("--format", choices=["png", "jpeg", "webp"], default=DEFAULT_OUTPUT_FORMAT,
+                        help="输出格式")
+    parser.add_argument("--png-level", type=int, choices=range(0, 10), default=DEFAULT_PNG_COMPRESSION,
+                        metavar="0-9", help="PNG 压缩级别，越小越快，默认使用 Qt 默认值")
+    parser.add_argument("--jpeg-quality", type=int, default=DEFAULT_JPEG_QUALITY, help="JPEG 质量 0-100")
+    parser.add_argument("--jpeg-progressive", action="store_true", help="输出渐进式 JPEG")
+    parser.add_argument("--webp-quality", type=int, default=DEFAULT_WEBP_QUALITY, help="WebP 质量 0-100")
+    parser.add_argument("--webp-lossless", action="store_true", help="输出无损 WebP")
+
+
+def build_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description=f"{APP_NAME} v{APP_VERSION} 无界面批量生成"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # 所有子命令共用的参数
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper,
+                               help=f"日志级别，默认读取环境变量 {LOG_LEVEL_ENV}，否则为 {DEFAULT_LOG_LEVEL}")
+
+    render_parser = subparsers.add_parser("render", parents=[common_parser], help="按位置模板批量生成图片")
+    _add_input_arguments(render_parser)
+    render_parser.add_argument("--output", required=True,
+                               help="输出目录；以 .pdf 或 .docx 结尾时所有图片按顺序写入同一个文档，"
+                                    "以 .zip 或 .tar 结尾时写入归档，- 表示把归档写到标准输出")
+    render_parser.add_argument("--limit", type=int, default=None, help="最多生成的数据组数")
+    render_parser.add_argument("--workers", type=int, default=None,
+                               help="渲染进程数，默认为1（大批量任务可设为CPU核心数）")
+    render_parser.add_argument("--encoder-threads", type=int, default=None,
+                               help="单进程流水线中的编码线程数，默认根据CPU核心数计算")
+    render_parser.add_argument("--full-copy", action="store_true",
+                               help="每张图片完整复制底图，而不是复用画布只恢复文字区域")
+    render_parser.add_argument("--no-sprite-cache", action="store_true",
+                               help="每次都重新绘制文字，不缓存重复文字的贴图")
+    render_parser.add_argument("--force", action="store_true",
+                               help="重新生成所有图片，不跳过内容未改变的输出")
+    render_parser.add_argument("--verify-checksums", action="store_true",
+                               help="跳过未改变的输出前重新计算文件校验和（默认只检查文件大小）")
+    render_parser.add_argument("--report", action="store_true",
+                               help="统计各阶段耗时分布 (p50/p95/p99)，并在输出目录中保存任务报告")
+    _add_encoder_arguments(render_parser)
+    render_parser.add_argument("--pdf-compression", choices=["jpeg", "flate"], default=DEFAULT_PDF_COMPRESSION,
+                               help="PDF 中底图和整页图片的压缩方式（JPEG 质量使用 --jpeg-quality）")
+    render_parser.add_argument("--pdf-raster", action="store_true",
+                               help="PDF 每页嵌入一张完整的图片，不使用矢量文字")
+    render_parser.add_argument("--columns", type=int, default=DEFAULT_DOCX_COLUMNS,
+                               help="Word 文档每页的图片列数")
+    render_parser.add_argument("--rows", type=int, default=DEFAULT_DOCX_ROWS,
+                               help="Word 文档每页的图片行数")
+    render_parser.add_argument("--dpi", type=int, default=None,
+                               help="决定 PDF 页面尺寸和 Word 文档中图片尺寸的分辨率，默认读取底图中记录的分辨率")
+    render_parser.add_argument("--name-template", default=DEFAULT_NAME_TEMPLATE,
+                               help="文件名模板，{0}、{1} 等为数据列，{index} 为行号，如 \"{index:06d}_{0}\"；"
+                                    "重名的文件依次加上 _2、_3 等后缀")
+    render_parser.add_argument("--shard", choices=["hash", "index"], default=None,
+                               help="把输出文件分散到子目录中：hash 按文件名哈希，index 按行号")
+    render_parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE,
+                               help="按行号分子目录时每个子目录中的文件数")
+    render_parser.add_argument("--archive-format", choices=["zip", "tar"], default=None,
+                               help="归档格式，默认根据输出文件扩展名判断，写到标准输出时为 tar")
+    render_parser.add_argument("-q", "--quiet", action="store_true", help="不输出进度")
+
+    bench_parser = subparsers.add_parser("bench-encode", parents=[common_parser], help="编码测试：统计当前模板每张图片的编码耗时和大小")
+    _add_input_arguments(bench_parser)
+    bench_parser.add_argument("--iterations", type=int, default=5, help="重复编码次数")
+    _add_encoder_arguments(bench_parser)
+
+    check_parser = subparsers.add_parser("check", parents=[common_parser],
+                                         help="排版预检：不生成图片，找出宽度超过上限或超出底图的文字")
+    _add_input_arguments(check_parser)
+    check_parser.add_argument("--backend", choices=RENDER_BACKENDS, default=DEFAULT_RENDER_BACKEND,
+                              help="按该渲染后端的字体度量测量文字")
+    check_parser.add_argument("--max-width", type=int, default=None,
+                              help="文字宽度上限（原图像素），不指定时只检查文字是否超出底图")
+    check_parser.add_argument("--limit", type=int, default=None, help="最多检查的数据组数")
+    check_parser.add_argument("--max-issues", type=int, default=LAYOUT_MAX_ISSUES,
+                              help="报告中最多列出的问题数")
+
+    return parser
+
+
+def _create_application(backend=DEFAULT_RENDER_BACKEND):
+    """
+    创建无界面的 Qt 应用（使用 offscreen 平台插件）
+
+    Pillow 渲染后端不需要 Qt 平台插件，此时不创建应用，返回None。
+    """
+    if backend == 'pillow':
+        return None
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtGui import QGuiApplication
+
+    app = QGuiApplication.instance()
+    if app is None:
+        app = QGuiApplication([sys.argv[0]])
+        app.setApplicationName(APP_NAME)
+    return app
+
+
+def _create_encoder(args):
+    """根据命令行参数创建输出图片编码器"""
+    from src.processors.output_encoder import OutputEncoder
+
+    return OutputEncoder(
+        image_format=args.format,
+        png_compression=args.png_level,
+        jpeg_quality=args.jpeg_quality,
+        jpeg_progressive=args.jpeg_progressive,
+        webp_quality=args.webp_quality,
+        webp_lossless=args.webp_lossless
+    )
+
+
+def _create_sink(args):
+    """
+    根据输出路径创建单文件输出目标
+
+    Returns:
+        输出目标，输出到目录时返回None
+    """
+    extension = os.path.splitext(args.output)[1].lower()
+    if extension == ".pdf":
+        from src.processors.pdf_sink import PdfSink
+
+        return PdfSink(args.output, compression=args.pdf_compression, jpeg_quality=args.jpeg_quality,
+                       dpi=args.dpi, vector_text=not args.pdf_raster)
+    if extension == ".docx":
+        from src.processors.docx_sink import DocxSink
+
+        return DocxSink(args.output, columns=args.columns, rows=args.rows, dpi=args.dpi)
+    if extension in (".zip", ".tar") or args.output == "-":
+        from src.processors.archive_sink import ArchiveSink
+
+        return ArchiveSink(args.output, archive_format=args.archive_format)
+    return None
+
+
+def _load_inputs(args, errors):
+    """
+    加载数据和位置模板
+
+    Args:
+        args: 解析后的命令行参数
+        errors: 错误信息列表
+
+    Returns:
+        (数据, 示例数据, 文字位置信息列表)，失败时返回 (None, None, None)
+    """
+    from src.processors.text_processor import TextProcessor
+    from src.processors.position_template import load_template
+
+    # 加载数据
+    text_processor = TextProcessor()
+    text_processor.error_occurred.connect(errors.append)
+    data = text_processor.import_text(file_path=args.data)
+    if not data:
+        print(errors[-1] if errors else f"无法加载数据: {args.data}", file=sys.stderr)
+        return None, None, None
+
+    # 加载位置模板
+    text_positions = load_template(args.template)
+    if not text_positions:
+        print(f"模板中没有文字位置: {args.template}", file=sys.stderr)
+        return None, None, None
+
+    return data, text_processor.get_sample(), text_positions
+
+
+def run_render(args):
+    """
+    执行 render 子命令
+
+    Args:
+        args: 解析后的命令行参数
+
+    Returns:
+        进程退出码
+    """
+    app = _create_application(args.backend)  # 只用于在本函数执行期间保持 Qt 应用存活
+
+    from src.processors.render_worker import RenderWorker
+    from src.processors.output_layout import OutputLayout
+
+    errors = []
+    data, _, text_positions = _load_inputs(args, errors)
+    if data is None:
+        return 1
+
+    sink = _create_sink(args)
+    output_dir = os.path.dirname(os.path.abspath(args.output)) if sink is not None else args.output
+    workers = args.workers or 1
+    try:
+        layout = OutputLayout(args.name_template, shard=args.shard, shard_size=args.shard_size)
+        worker = RenderWorker(args.image, data, text_positions, output_dir, workers,
+                              reuse_canvas=not args.full_copy,
+                              encoder_threads=args.encoder_threads,
+                              encoder=_create_encoder(args),
+                              limit=args.limit,
+                              incremental=not args.force,
+                              verify_checksums=args.verify_checksums,
+                              instrument=args.report,
+                              sink=sink,
+                              layout=layout,
+                              backend=args.backend,
+                              sprite_cache=not args.no_sprite_cache)
+    except ValueError as e:
+        # 设置无效（文件名模板、渲染后端与输出不兼容等）
+        print(str(e), file=sys.stderr)
+        return 1
+    worker.error_occurred.connect(errors.append)
+    if not args.quiet:
+        worker.progress_updated.connect(
+            lambda value: print(f"\r进度: {value}%", end="", file=sys.stderr, flush=True)
+        )
+        worker.finished.connect(lambda: print(file=sys.stderr))  # 结束进度行
+    if not logger.is_enabled_for(logging.INFO):
+        # 完成信息由日志的控制台输出打印，日志级别高于 INFO 时才在这里输出
+        worker.generation_completed.connect(lambda message: print(message, file=sys.stderr))
+
+    # 在当前线程中同步执行，无需事件循环
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.cancel()
+        print("\n已中断", file=sys.stderr)
+        return 130
+
+    if errors:
+        print(errors[-1], file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_bench_encode(args):
+    """
+    执行 bench-encode 子命令，把结果以JSON输出到标准输出
+
+    Args:
+        args: 解析后的命令行参数
+
+    Returns:
+        进程退出码
+    """
+    app = _create_application(args.backend)  # 只用于在本函数执行期间保持 Qt 应用存活
+
+    from src.processors.image_text_processor import ImageTextProcessor
+
+    errors = []
+    data, sample, text_positions = _load_inputs(args, errors)
+    if data is None:
+        return 1
+
+    result = ImageTextProcessor().benchmark_encoding(
+        args.image, text_positions, sample[0], _create_encoder(args), args.iterations, args.backend
+    )
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+def run_check(args):
+    """
+    执行 check 子命令，把预检报告以JSON输出到标准输出
+
+    Args:
+        args: 解析后的命令行参数
+
+    Returns:
+        进程退出码，发现问题时为 1
+    """
+    app = _create_application(args.backend)  # 只用于在本函数执行期间保持 Qt 应用存活
+
+    from src.processors.image_text_processor import ImageTextProcessor
+
+    errors = []
+    data, _, text_positions = _load_inputs(args, errors)
+    if data is None:
+        return 1
+
+    report = ImageTextProcessor().check_layout(
+        args.image, text_positions, data, args.max_width, args.limit, args.backend, args.max_issues
+    )
+    print(json.dumps(report, ensure_ascii=False))
+    print(f"已检查 {report['rows']} 组数据，{report['rows_with_issues']} 组有问题"
+          f"（超宽 {report['width_overflows']} 处，超出底图 {report['bounds_overflows']} 处）", file=sys.stderr)
+    return 1 if report['rows_with_issues'] else 0
+
+
+def main(argv=None):
+    """
+    命令行入口函数
+
+    Args:
+        argv: 命令行参数列表（不含程序名），默认使用 sys.argv
+
+    Returns:
+        进程退出码
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.log_level:
+        # 通过环境变量传给多进程渲染池的子进程
+        os.environ[LOG_LEVEL_ENV] = args.log_level
+        logger.set_level(args.log_level)
+
+    try:
+        if args.command == "render":
+            return run_render(args)
+        if args.command == "bench-encode":
+            return run_bench_encode(args)
+        if args.command == "check":
+            return run_check(args)
+    except Exception as e:
+        logger.error("命令行执行失败: %s", e, exc_info=True)
+        print(f"错误: {str(e)}", file=sys.stderr)
+        return 1
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
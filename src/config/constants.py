@@ -15,19 +15,67 @@ WINDOW_WIDTH = 900
 WINDOW_HEIGHT = 650
 WINDOW_MARGIN = 15
 WINDOW_SPACING = 15
+PREVIEW_MAX_WIDTH = 700  # 位置选择器中预览图片的最大宽度
+PREVIEW_MAX_HEIGHT = 500  # 位置选择器中预览图片的最大高度
+PREVIEW_MAX_ZOOM = 8.0  # 位置选择器的最大缩放比例（显示像素 / 原图像素）
+PREVIEW_ZOOM_STEP = 1.25  # 滚轮每格的缩放倍数
+TILE_SIZE = 256  # 位置选择器瓦片金字塔的瓦片边长（像素）
+TILE_BLOCK = 4  # 每次解码 TILE_BLOCK x TILE_BLOCK 个相邻的瓦片
+TILE_CACHE_BYTES = 64 * 1024 * 1024  # 瓦片缓存最多占用的内存（字节）
+ROW_PREVIEW_FRAMES = 24  # 位置选择器逐行预览时缓存的叠加层帧数
+ROW_PREVIEW_PREFETCH = 6  # 逐行预览时在后台预先绘制当前行前后各多少行
 
 # 文件相关
 TEMP_DIR = tempfile.gettempdir()
 TEMP_IMAGE_FILE = os.path.join(TEMP_DIR, "snaptext_image.png")
 TEMP_DATA_FILE = os.path.join(TEMP_DIR, "snaptext_data.csv")
+MANIFEST_FILENAME = ".snaptext_manifest.jsonl"  # 输出目录中的任务清单文件名
+JOB_REPORT_FILENAME = "snaptext_job_report.json"  # 输出目录中的任务报告文件名
+METRICS_INTERVAL = 1.0  # 生成过程中发出性能统计信号的最小间隔（秒）
 
 # 默认值
 DEFAULT_POSITION_COUNT = 3
 DEFAULT_DATA_COUNT = 1
-MAX_DATA_COUNT = 40
+MAX_DATA_COUNT = 10000000  # 数据文件按流式读取，不再整体载入内存
+DATA_SAMPLE_SIZE = 20  # 导入数据时保留的示例行数
+ROW_INDEX_STRIDE = 1000  # 数据文件每隔多少行记录一次字节位置（用于读取任意一行）
+SCAN_PROGRESS_INTERVAL = 10000  # 后台扫描数据文件时每隔多少行报告一次进度（并检查是否已取消）
 
 # 支持的图片格式
 SUPPORTED_IMAGE_FORMATS = "图片文件 (*.png *.jpg *.jpeg *.bmp);;所有文件 (*.*)"
 
 # 支持的数据格式
-SUPPORTED_DATA_FORMATS = "CSV 文件 (*.csv);;文本文件 (*.txt);;所有文件 (*.*)" 
\ No newline at end of file
+SUPPORTED_DATA_FORMATS = "CSV 文件 (*.csv);;文本文件 (*.txt);;所有文件 (*.*)"
+
+# 支持的位置模板格式
+SUPPORTED_TEMPLATE_FORMATS = "位置模板 (*.json);;所有文件 (*.*)"
+
+# 输出图片格式默认值
+DEFAULT_OUTPUT_FORMAT = "png"
+DEFAULT_PNG_COMPRESSION = -1  # -1 表示使用 Qt 默认压缩级别
+DEFAULT_JPEG_QUALITY = 90
+DEFAULT_WEBP_QUALITY = 80
+DEFAULT_PDF_COMPRESSION = "jpeg"  # PDF 中底图和整页图片的压缩方式 (jpeg/flate)
+DEFAULT_DOCX_COLUMNS = 2  # Word 文档每页的图片列数
+DEFAULT_DOCX_ROWS = 3  # Word 文档每页的图片行数
+ARCHIVE_INDEX_FILENAME = "index.csv"  # 归档中记录 行号 -> 成员名 的索引文件
+
+# 输出文件布局默认值
+DEFAULT_NAME_TEMPLATE = "{0}"  # 文件名模板：默认使用第一列
+DEFAULT_SHARD_SIZE = 1000  # 按行号分子目录时每个子目录中的文件数
+DEFAULT_SHARD_WIDTH = 2  # 按哈希分子目录时子目录名的十六进制位数
+
+# 渲染后端: qt 使用 QPainter 绘制，pillow 使用 PIL.ImageDraw 绘制（不需要 Qt 平台插件）
+RENDER_BACKENDS = ("qt", "pillow")
+DEFAULT_RENDER_BACKEND = "qt"
+DEFAULT_SPRITE_CACHE_BYTES = 16 * 1024 * 1024  # 每个渲染线程/进程的文字贴图缓存容量（字节）
+LAYOUT_MEASURE_CACHE_SIZE = 262144  # 排版预检最多缓存的文字测量结果数
+LAYOUT_MAX_ISSUES = 1000  # 排版预检报告中最多列出的问题数（统计数字不受限制）
+
+# 日志设置
+DEFAULT_LOG_LEVEL = "INFO"
+LOG_LEVEL_ENV = "SNAPTEXT_LOG_LEVEL"  # 设置日志级别的环境变量
+LOG_SAMPLE_INTERVAL = 1000  # 热循环中的诊断信息每多少次记录一次
+LOG_FILENAME = "snaptext.log"  # 日志目录中的当前日志文件名
+LOG_MAX_BYTES = 10 * 1024 * 1024  # 单个日志文件超过该大小时轮转
+LOG_BACKUP_COUNT = 10  # 保留的压缩旧日志数量
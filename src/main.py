@@ -7,7 +7,10 @@ SnapText - 批量图片文字处理工具
 """
 
 import sys
+import multiprocessing
 from src.app import main
 
 if __name__ == "__main__":
+    # 打包后的程序启动渲染子进程时需要
+    multiprocessing.freeze_support()
     sys.exit(main()) 
\ No newline at end of file
@@ -5,9 +5,13 @@
 from src.processors.text_processor import TextProcessor
 from src.processors.image_text_processor import ImageTextProcessor
 from src.processors.position_selector import PositionSelector
+from src.processors.render_worker import RenderWorker
+from src.processors.render_plan import RenderPlan
 
 __all__ = [
     'TextProcessor',
     'ImageTextProcessor',
-    'PositionSelector'
+    'PositionSelector',
+    'RenderWorker',
+    'RenderPlan'
 ] 
\ No newline at end of file
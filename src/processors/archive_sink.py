@@ -0,0 +1,123 @@
+"""
+归档输出目标
+
+把编码后的图片按行号顺序直接写入一个 ZIP（只存储，不再压缩）或 TAR 文件，也可以写到标准输出供管道使用，
+不在输出目录中创建大量小文件。归档最后附带一个索引文件，记录每个数据行对应的成员名。
+"""
+import csv
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from src.processors.output_sink import OutputSink
+from src.config.constants import ARCHIVE_INDEX_FILENAME
+from src.utils.logger import logger
+
+# 支持的归档格式
+ARCHIVE_FORMATS = ('zip', 'tar')
+
+# 表示写到标准输出的路径
+STDOUT_PATH = "-"
+
+
+class ArchiveSink(OutputSink):
+    """ZIP/TAR 归档输出目标"""
+
+    EXTENSION = ".zip"
+    FILE_FILTER = "ZIP 文件 (*.zip)"
+    REQUIRES_QT = False
+    RESERVED_NAMES = (ARCHIVE_INDEX_FILENAME,)
+
+    def __init__(self, path, archive_format=None):
+        """
+        初始化归档输出目标
+
+        Args:
+            path: 归档文件路径，"-" 表示写到标准输出
+            archive_format: 归档格式 (zip/tar)，默认根据扩展名判断，写到标准输出时为 tar
+        """
+        super().__init__(path)
+        if archive_format is None:
+            archive_format = 'zip' if path.lower().endswith('.zip') else 'tar'
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"不支持的归档格式: {archive_format}")
+        self.archive_format = archive_format
+        self.encoder = None
+
+        self._archive = None
+        self._file = None
+        self._index_file = None  # 行号 -> 成员名 索引的临时文件
+        self._index_writer = None
+        self._mtime = time.time()
+
+    def describe(self):
+        """输出设置的简短描述"""
+        target = "，写到标准输出" if self.path == STDOUT_PATH else ""
+        image_format = f"（{self.encoder.describe()}）" if self.encoder is not None else ""
+        return f"{self.archive_format.upper()} 归档{target}{image_format}"
+
+    def location(self):
+        """输出位置，用于提示信息"""
+        return "标准输出" if self.path == STDOUT_PATH else self.path
+
+    def image_encoder(self, encoder):
+        """图片格式使用任务设置的编码器"""
+        self.encoder = encoder
+        return encoder
+
+    def open(self, base_image, plan):
+        """打开归档文件或标准输出"""
+        if self.path == STDOUT_PATH:
+            self._file = sys.stdout.buffer
+        else:
+            self._file = open(self.path, 'wb')
+
+        # 标准输出不能回退，ZIP 使用数据描述符，TAR 使用流模式
+        if self.archive_format == 'zip':
+            self._archive = zipfile.ZipFile(self._file, 'w', zipfile.ZIP_STORED)
+        else:
+            self._archive = tarfile.open(fileobj=self._file, mode='w|', format=tarfile.PAX_FORMAT)
+
+        self._index_file = tempfile.TemporaryFile('w+', encoding='utf-8', newline='')
+        self._index_writer = csv.writer(self._index_file)
+        self._index_writer.writerow(['row', 'member'])
+
+    def _add_member(self, name, data):
+        """写入一个归档成员"""
+        if self.archive_format == 'zip':
+            info = zipfile.ZipInfo(name, time.localtime(self._mtime)[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.external_attr = 0o644 << 16
+            self._archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = self._mtime
+            info.mode = 0o644
+            self._archive.addfile(info, io.BytesIO(data))
+
+    def _write_image(self, index, output_path, image_data):
+        """把图片写为归档成员，并记录到索引"""
+        name = output_path.replace(os.sep, '/')
+        self._add_member(name, image_data)
+        self._index_writer.writerow([index + 1, name])
+
+    def _finish(self):
+        """写入索引，关闭归档"""
+        if self._archive is None:
+            return
+        try:
+            self._index_file.seek(0)
+            self._add_member(ARCHIVE_INDEX_FILENAME, self._index_file.read().encode('utf-8'))
+        finally:
+            self._archive.close()
+            self._archive = None
+            self._index_file.close()
+            if self.path == STDOUT_PATH:
+                self._file.flush()
+            else:
+                self._file.close()
+            logger.info("归档已保存: %s，共 %d 张图片", self.location(), self.page_count)
@@ -0,0 +1,172 @@
+"""
+流式数据源
+
+按需从 CSV/TXT 文件逐行读取并校验数据，不把整个数据集保存在内存中。
+导入时只扫描一遍文件统计行数、校验格式并保留少量示例行，
+同时每隔 ROW_INDEX_STRIDE 行记录一次该行在文件中的字节位置，读取任意一行时从最近的记录处开始读。
+"""
+import csv
+import os
+from itertools import islice
+from src.config.constants import DATA_SAMPLE_SIZE, ROW_INDEX_STRIDE, SCAN_PROGRESS_INTERVAL
+from src.utils.logger import logger
+
+# TXT 文件的字段数和默认表头
+TXT_FIELD_COUNT = 3
+TXT_HEADERS = ["姓名", "学号", "班级"]
+
+
+class DataStream:
+    """流式数据源，可重复迭代，每次迭代重新打开文件"""
+
+    def __init__(self, file_path):
+        """
+        初始化数据源
+
+        Args:
+            file_path: 数据文件路径（.txt 按制表符分隔读取，其他按CSV读取）
+        """
+        self.file_path = file_path
+        _, ext = os.path.splitext(file_path)
+        self.is_txt = ext.lower() == '.txt'
+
+        self.headers = []
+        self.row_length = None
+        self.sample = []
+        self._count = None
+        self._row_offsets = []  # 第 k * ROW_INDEX_STRIDE 行开始处的字节位置（扫描时记录）
+
+    def _read_rows(self, start=0):
+        """
+        逐行读取原始数据
+
+        按字节读取文件并记录读到的位置，从 start 行开始读时先跳到扫描时记录的最近位置。
+
+        Args:
+            start: 从第几行开始读取
+
+        Yields:
+            (行号, 数据行, 该行开始处的字节位置)，行号从0开始，不含表头
+        """
+        checkpoint = min(start // ROW_INDEX_STRIDE, len(self._row_offsets) - 1)
+        index, offset = (checkpoint * ROW_INDEX_STRIDE, self._row_offsets[checkpoint]) if checkpoint > 0 else (0, 0)
+
+        with open(self.file_path, 'rb') as f:
+            f.seek(offset)
+            position = [offset]  # 已读取到的字节位置
+
+            def lines():
+                for raw in f:
+                    position[0] += len(raw)
+                    yield raw.decode('utf-8')  # 保留原始换行符，与 csv 模块推荐的 newline='' 一致
+
+            if self.is_txt:
+                row_start = offset
+                for line in lines():
+                    line = line.strip()
+                    if line:  # 忽略空行
+                        if index >= start:
+                            yield index, line.split('\t'), row_start
+                        index += 1
+                    row_start = position[0]
+            else:
+                # csv.reader 按需读取行，返回一行数据时正好读到下一行的开始处
+                reader = csv.reader(lines())
+                if offset == 0:
+                    headers = next(reader, None)  # 跳过表头
+                    if headers is not None and not self.headers:
+                        self.headers = headers
+                row_start = position[0]
+                for row in reader:
+                    if index >= start:
+                        yield index, row, row_start
+                    index += 1
+                    row_start = position[0]
+
+    def _validate_row(self, index, row):
+        """校验单行数据，格式不正确时抛出 ValueError"""
+        if self.is_txt and len(row) != TXT_FIELD_COUNT:
+            raise ValueError(f"第{index+1}行数据必须包含{TXT_FIELD_COUNT}个字段，用制表符分隔")
+        if self.row_length is None:
+            self.row_length = len(row)
+        elif len(row) != self.row_length:
+            raise ValueError(f"第{index+1}行数据格式不正确")
+
+    def scan(self, progress=None):
+        """
+        扫描一遍文件：校验每一行、统计行数并保留示例行
+
+        Args:
+            progress: 进度回调 progress(已扫描行数, 已读取的字节比例)，每 SCAN_PROGRESS_INTERVAL 行调用一次，
+                返回 True 时停止扫描
+
+        Returns:
+            数据行数，被进度回调停止时返回None
+        """
+        count = 0
+        sample = []
+        offsets = []
+        file_size = os.path.getsize(self.file_path) if progress is not None else 0
+        self.row_length = None
+        self._row_offsets = []
+        for index, row, row_start in self._read_rows():
+            self._validate_row(index, row)
+            if len(sample) < DATA_SAMPLE_SIZE:
+                sample.append(row)
+            if index % ROW_INDEX_STRIDE == 0:
+                offsets.append(row_start)
+            count += 1
+            if progress is not None and count % SCAN_PROGRESS_INTERVAL == 0:
+                if progress(count, row_start / file_size if file_size else 1.0):
+                    logger.debug("扫描数据文件 %s 已停止（已扫描 %d 条）", self.file_path, count)
+                    return None
+
+        if self.is_txt and count:
+            self.headers = list(TXT_HEADERS)
+        self.sample = sample
+        self._count = count
+        self._row_offsets = offsets
+        logger.debug("扫描数据文件 %s: %d 条数据", self.file_path, count)
+        return count
+
+    def __len__(self):
+        if self._count is None:
+            self.scan()
+        return self._count
+
+    def __iter__(self):
+        """逐行读取并校验数据"""
+        for index, row, _ in self._read_rows():
+            self._validate_row(index, row)
+            yield row
+
+    def head(self, count):
+        """
+        只迭代前 count 行
+
+        Args:
+            count: 行数
+
+        Returns:
+            迭代器
+        """
+        return islice(iter(self), count)
+
+    def rows(self, start, count):
+        """
+        读取从 start 行开始的 count 行（从扫描时记录的最近位置开始读，不必从头读取文件）
+
+        Args:
+            start: 起始行号（从0开始）
+            count: 行数
+
+        Returns:
+            数据行列表，超出数据范围的部分不返回
+        """
+        if self._count is None:
+            self.scan()
+        rows = []
+        for index, row, _ in islice(self._read_rows(start), max(0, count)):
+            self._validate_row(index, row)
+            rows.append(row)
+        return rows
@@ -0,0 +1,202 @@
+"""
+Word (DOCX) 输出目标
+
+把整批图片按行号顺序排成网格写入同一个 Word 文档，每页一个 行数 x 列数 的表格。
+
+python-docx 的 Document 会把所有图片保存在内存中直到 save()，这里只用它生成文档骨架
+（样式、页面设置）以及表格和图片的 XML：图片生成后立即写入 DOCX 压缩包，
+每满一页的表格 XML 写入临时文件，结束时再把正文和关系表写入压缩包，
+内存中最多只保留一页的表格，与数据行数无关。
+"""
+import io
+import os
+import tempfile
+import zipfile
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.shape import CT_Inline
+from docx.oxml.table import CT_Tbl
+from docx.shared import Emu, Inches, Mm
+from lxml import etree
+from src.processors.output_sink import OutputSink
+from src.processors.output_encoder import OutputEncoder
+from src.config.constants import APP_NAME, DEFAULT_DOCX_COLUMNS, DEFAULT_DOCX_ROWS
+from src.utils.logger import logger
+
+# 图片文件扩展名 -> 内容类型
+_IMAGE_CONTENT_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+}
+
+_IMAGE_RELATIONSHIP = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+
+# 页面设置 (A4) 和单元格内边距（python-docx 默认表格样式左右各 0.08 英寸）
+_PAGE_WIDTH = Mm(210)
+_PAGE_HEIGHT = Mm(297)
+_PAGE_MARGIN = Mm(12.7)
+_CELL_PADDING = Inches(0.16)
+_PAGE_BREAK = ('<w:p xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+               '<w:r><w:br w:type="page"/></w:r></w:p>')
+
+
+class DocxSink(OutputSink):
+    """Word 文档输出目标"""
+
+    EXTENSION = ".docx"
+    FILE_FILTER = "Word 文档 (*.docx)"
+
+    def __init__(self, path, columns=DEFAULT_DOCX_COLUMNS, rows=DEFAULT_DOCX_ROWS, dpi=None):
+        """
+        初始化 Word 文档输出目标
+
+        Args:
+            path: DOCX 文件路径
+            columns: 每页的列数
+            rows: 每页的行数
+            dpi: 决定图片在文档中尺寸的分辨率，默认读取底图中记录的分辨率；
+                 放不进网格单元格时按比例缩小
+        """
+        super().__init__(path)
+        if columns < 1 or rows < 1:
+            raise ValueError(f"无效的网格布局: {columns} 列 x {rows} 行")
+        self.columns = columns
+        self.rows = rows
+        self.dpi = dpi
+        self.encoder = OutputEncoder('png')
+
+        self._zip = None
+        self._body_file = None  # 正文表格的临时文件
+        self._rels_file = None  # 图片关系的临时文件
+        self._cells = []  # 当前页的图片: [(图片序号, 关系ID, 名称)]
+        self._page_written = False
+
+    def describe(self):
+        """输出设置的简短描述"""
+        return f"Word 文档（每页 {self.columns} 列 x {self.rows} 行，{self.encoder.describe()}）"
+
+    def image_encoder(self, encoder):
+        """使用任务设置的编码器；Word 不支持 WebP，改为 PNG"""
+        if encoder.image_format == 'webp':
+            logger.info("Word 文档不支持 WebP 图片，改为 PNG")
+            encoder = OutputEncoder('png')
+        self.encoder = encoder
+        return encoder
+
+    def open(self, base_image, plan):
+        """创建文档骨架，计算图片在网格中的尺寸"""
+        dpi = self.dpi or round(base_image.dotsPerMeterX() * 0.0254) or 96
+        width = Inches(base_image.width() / dpi)
+        height = Inches(base_image.height() / dpi)
+
+        # 图片放不进单元格时按比例缩小
+        self._cell_width = (_PAGE_WIDTH - 2 * _PAGE_MARGIN) // self.columns
+        cell_height = (_PAGE_HEIGHT - 2 * _PAGE_MARGIN) // self.rows
+        scale = min(1.0, (self._cell_width - _CELL_PADDING) / width, (cell_height - _CELL_PADDING) / height)
+        if scale < 1.0:
+            logger.info("图片按 %d dpi 放不进每页 %d 列 x %d 行的网格，缩小为 %.0f%%",
+                        dpi, self.columns, self.rows, scale * 100)
+        self._image_size = (Emu(int(width * scale)), Emu(int(height * scale)))
+
+        self._zip = zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED)
+        self._body_file = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._rels_file = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._copy_template()
+
+    def _copy_template(self):
+        """用 python-docx 生成文档骨架，除正文和关系表外的部件直接写入压缩包"""
+        document = Document()
+        section = document.sections[0]
+        section.page_width = _PAGE_WIDTH
+        section.page_height = _PAGE_HEIGHT
+        section.left_margin = section.right_margin = _PAGE_MARGIN
+        section.top_margin = section.bottom_margin = _PAGE_MARGIN
+        document.core_properties.author = APP_NAME
+        buffer = io.BytesIO()
+        document.save(buffer)
+
+        with zipfile.ZipFile(buffer) as template:
+            for name in template.namelist():
+                data = template.read(name)
+                if name == 'word/document.xml':
+                    xml = data.decode('utf-8')
+                    body_start = xml.index('<w:body>') + len('<w:body>')
+                    self._document_head = xml[:body_start]
+                    self._document_tail = xml[xml.index('<w:sectPr', body_start):]
+                elif name == 'word/_rels/document.xml.rels':
+                    self._rels_head = data.decode('utf-8').replace('</Relationships>', '')
+                elif name == '[Content_Types].xml':
+                    self._zip.writestr(name, self._add_content_type(data.decode('utf-8')))
+                else:
+                    self._zip.writestr(name, data)
+
+    def _add_content_type(self, xml):
+        """在内容类型表中加入图片格式"""
+        extension = self.encoder.extension.lstrip('.')
+        if f'Extension="{extension}"' in xml:
+            return xml
+        default = f'<Default Extension="{extension}" ContentType="{_IMAGE_CONTENT_TYPES[self.encoder.extension]}"/>'
+        start = xml.index('>', xml.index('<Types')) + 1
+        return xml[:start] + default + xml[start:]
+
+    def _write_image(self, index, output_path, image_data):
+        """把图片写入压缩包，放入当前页的网格，满一页时写出表格"""
+        number = self.page_count + 1
+        media_name = f"media/image{number}{self.encoder.extension}"
+        rel_id = f"rIdImg{number}"
+        # 图片本身已经压缩，直接存储
+        self._zip.writestr(f"word/{media_name}", image_data, compress_type=zipfile.ZIP_STORED)
+        self._rels_file.write(f'<Relationship Id="{rel_id}" Type="{_IMAGE_RELATIONSHIP}" Target="{media_name}"/>')
+
+        self._cells.append((number, rel_id, os.path.basename(output_path)))
+        if len(self._cells) == self.columns * self.rows:
+            self._write_table()
+
+    def _write_table(self):
+        """把当前页的网格写为表格"""
+        if not self._cells:
+            return
+        rows = -(-len(self._cells) // self.columns)
+        table = CT_Tbl.new_tbl(rows, self.columns, self._cell_width * self.columns)
+        table.tblPr.autofit = False
+
+        cx, cy = self._image_size
+        for i, (number, rel_id, name) in enumerate(self._cells):
+            cell = table.tr_lst[i // self.columns].tc_lst[i % self.columns]
+            paragraph = cell.p_lst[0]
+            paragraph.get_or_add_pPr().jc_val = WD_ALIGN_PARAGRAPH.CENTER
+            paragraph.add_r().add_drawing(CT_Inline.new_pic_inline(number, rel_id, name, cx, cy))
+
+        if self._page_written:
+            self._body_file.write(_PAGE_BREAK)
+        self._body_file.write(etree.tostring(table, encoding='unicode'))
+        self._page_written = True
+        self._cells = []
+
+    def _finish(self):
+        """写出最后一页、正文和关系表，关闭文档"""
+        if self._zip is None:
+            return
+        try:
+            self._write_table()
+            with self._zip.open('word/document.xml', 'w') as f:
+                f.write(self._document_head.encode('utf-8'))
+                self._copy_temp(self._body_file, f)
+                f.write(self._document_tail.encode('utf-8'))
+            with self._zip.open('word/_rels/document.xml.rels', 'w') as f:
+                f.write(self._rels_head.encode('utf-8'))
+                self._copy_temp(self._rels_file, f)
+                f.write(b'</Relationships>')
+        finally:
+            self._zip.close()
+            self._zip = None
+            self._body_file.close()
+            self._rels_file.close()
+            logger.info("Word 文档已保存: %s，共 %d 张图片", self.path, self.page_count)
+
+    @staticmethod
+    def _copy_temp(temp_file, target):
+        """把临时文本文件的内容以 UTF-8 写入压缩包中的文件"""
+        temp_file.seek(0)
+        for chunk in iter(lambda: temp_file.read(1024 * 1024), ''):
+            target.write(chunk.encode('utf-8'))
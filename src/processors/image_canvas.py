@@ -0,0 +1,223 @@
+"""
+可缩放、平移的图片画布
+
+以预览图为底层，放大后按当前缩放比例选择瓦片金字塔中的级别，在预览图上绘制更清晰的瓦片；
+瓦片尚未解码完成时先显示放大的预览图。
+"""
+import math
+from PyQt6.QtWidgets import QWidget, QSizePolicy
+from PyQt6.QtGui import QPainter
+from PyQt6.QtCore import Qt, QPoint, QPointF, QRect, QRectF, pyqtSignal
+from src.config.constants import TILE_SIZE, PREVIEW_MAX_ZOOM, PREVIEW_ZOOM_STEP
+
+
+class ImageCanvas(QWidget):
+    """
+    图片画布
+
+    滚轮以鼠标位置为中心缩放，右键或中键拖动平移，左键点击和鼠标移动通过信号通知（控件坐标）。
+    """
+
+    clicked = pyqtSignal(QPoint)  # 左键点击
+    hovered = pyqtSignal(QPoint)  # 鼠标移动
+    view_changed = pyqtSignal()  # 缩放或平移后（平移时每次鼠标移动都会发出）
+    pan_finished = pyqtSignal()  # 拖动平移结束
+
+    def __init__(self, preview, image_size, pyramid=None, parent=None):
+        """
+        初始化画布
+
+        Args:
+            preview: 预览图 QPixmap（按显示尺寸解码的整张图片）
+            image_size: 原图尺寸 QSize
+            pyramid: 瓦片金字塔 TilePyramid，为None时只显示预览图
+            parent: 父控件
+        """
+        super().__init__(parent)
+        self.preview = preview
+        self.image_size = image_size
+        self.pyramid = pyramid
+        self.placeholder_text = ""  # 没有预览图时显示的文字
+
+        self.zoom = 1.0  # 显示像素 / 原图像素
+        self._origin = QPointF(0, 0)  # 原图左上角在控件中的位置
+        self._fitted = True  # 是否处于适应窗口状态（窗口大小改变时重新适应）
+        self._drag_start = None  # 平移开始时的 (鼠标位置, 原图左上角位置)
+
+        self.setMouseTracking(True)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        if pyramid is not None:
+            pyramid.tiles_ready.connect(self.update)
+
+    def preview_scale(self):
+        """预览图相对原图的缩放比例"""
+        if self.preview.isNull() or self.image_size.width() <= 0:
+            return 1.0
+        return self.preview.width() / self.image_size.width()
+
+    def fit_zoom(self):
+        """适应窗口的缩放比例（不放大超过原图尺寸）"""
+        if self.image_size.isEmpty():
+            return 1.0
+        return min(self.width() / self.image_size.width(), self.height() / self.image_size.height(), 1.0)
+
+    def fit(self):
+        """缩放到适应窗口并居中"""
+        self._fitted = True
+        self.zoom = self.fit_zoom()
+        self._clamp_origin()
+        self.update()
+        self.view_changed.emit()
+
+    def zoom_at(self, anchor, zoom):
+        """
+        以控件中的某一点为中心缩放
+
+        Args:
+            anchor: 缩放中心（控件坐标），该点对应的原图位置保持不变
+            zoom: 新的缩放比例（会被限制在适应窗口和最大缩放比例之间）
+        """
+        min_zoom = self.fit_zoom()
+        zoom = max(min_zoom, min(zoom, max(PREVIEW_MAX_ZOOM, min_zoom)))
+        if zoom == self.zoom:
+            return
+        source = self.map_to_source(anchor)
+        self.zoom = zoom
+        self._origin = QPointF(anchor.x() - source.x() * zoom, anchor.y() - source.y() * zoom)
+        self._fitted = zoom == min_zoom
+        self._clamp_origin()
+        self.update()
+        self.view_changed.emit()
+
+    def map_to_source(self, pos):
+        """控件坐标 -> 原图坐标 (QPointF)"""
+        return QPointF((pos.x() - self._origin.x()) / self.zoom, (pos.y() - self._origin.y()) / self.zoom)
+
+    def map_from_source(self, x, y):
+        """原图坐标 -> 控件坐标 (QPointF)"""
+        return QPointF(x * self.zoom + self._origin.x(), y * self.zoom + self._origin.y())
+
+    def origin(self):
+        """原图左上角在控件中的位置"""
+        return QPointF(self._origin)
+
+    def is_panning(self):
+        """是否正在拖动平移"""
+        return self._drag_start is not None
+
+    def _clamp_origin(self):
+        """限制平移范围：图片小于控件时居中，否则不露出图片以外的区域"""
+        x, y = self._origin.x(), self._origin.y()
+        width = self.image_size.width() * self.zoom
+        height = self.image_size.height() * self.zoom
+        x = (self.width() - width) / 2 if width <= self.width() else min(0.0, max(self.width() - width, x))
+        y = (self.height() - height) / 2 if height <= self.height() else min(0.0, max(self.height() - height, y))
+        self._origin = QPointF(x, y)
+
+    def _tile_level(self):
+        """当前缩放比例下应使用的瓦片级别，预览图已经足够清晰时返回None"""
+        if self.pyramid is None or self.zoom <= self.preview_scale():
+            return None
+        level = int(math.floor(math.log2(1 / self.zoom))) if self.zoom < 1 else 0
+        level = max(min(level, self.pyramid.max_level), self.pyramid.min_level)
+        # 可以整级解码的级别都比预览图粗（图片超过分配上限）时只显示预览图
+        return level if level <= self.pyramid.max_level else None
+
+    def paintEvent(self, event):
+        """绘制预览图和当前级别的瓦片"""
+        painter = QPainter(self)
+        if self.preview.isNull():
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, self.placeholder_text)
+            painter.end()
+            return
+
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+        target = QRectF(self._origin.x(), self._origin.y(),
+                        self.image_size.width() * self.zoom, self.image_size.height() * self.zoom)
+        painter.drawPixmap(target, self.preview, QRectF(self.preview.rect()))
+
+        level = self._tile_level()
+        if level is not None:
+            self._paint_tiles(painter, level, event.rect())
+        painter.end()
+
+    def _paint_tiles(self, painter, level, dirty_rect):
+        """
+        绘制与需要重绘的区域相交的瓦片，并请求解码控件中可见但尚未解码的瓦片
+
+        Args:
+            painter: 控件的 QPainter
+            level: 瓦片级别
+            dirty_rect: 需要重绘的区域
+        """
+        scale = self.zoom * (1 << level)  # 显示像素 / 该级像素
+        level_size = self.pyramid.level_size(level)
+        columns = -(-level_size.width() // TILE_SIZE)
+        rows = -(-level_size.height() // TILE_SIZE)
+
+        # 可见范围按整个控件计算，局部重绘时也不会取消其余可见瓦片的解码请求
+        first_column = max(0, int(-self._origin.x() / scale // TILE_SIZE))
+        last_column = min(columns - 1, int((self.width() - self._origin.x()) / scale // TILE_SIZE))
+        first_row = max(0, int(-self._origin.y() / scale // TILE_SIZE))
+        last_row = min(rows - 1, int((self.height() - self._origin.y()) / scale // TILE_SIZE))
+
+        missing = []
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                # 瓦片边缘取整到同一组坐标，相邻瓦片之间没有缝隙
+                left = round(self._origin.x() + column * TILE_SIZE * scale)
+                top = round(self._origin.y() + row * TILE_SIZE * scale)
+                right = round(self._origin.x() + min((column + 1) * TILE_SIZE, level_size.width()) * scale)
+                bottom = round(self._origin.y() + min((row + 1) * TILE_SIZE, level_size.height()) * scale)
+                rect = QRect(left, top, right - left, bottom - top)
+
+                pixmap = self.pyramid.tile(level, column, row)
+                if pixmap is None:
+                    missing.append((column, row))
+                elif rect.intersects(dirty_rect):
+                    painter.drawPixmap(rect, pixmap)
+        if missing:
+            self.pyramid.request(level, missing)
+
+    def wheelEvent(self, event):
+        """滚轮缩放"""
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.zoom_at(event.position(), self.zoom * PREVIEW_ZOOM_STEP ** steps)
+        event.accept()
+
+    def mousePressEvent(self, event):
+        """左键点击通知，右键或中键开始平移"""
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.clicked.emit(event.pos())
+        elif event.button() in (Qt.MouseButton.RightButton, Qt.MouseButton.MiddleButton):
+            self._drag_start = (event.position(), QPointF(self._origin))
+            self.setCursor(Qt.CursorShape.ClosedHandCursor)
+
+    def mouseMoveEvent(self, event):
+        """平移，或通知鼠标位置"""
+        if self._drag_start is None:
+            self.hovered.emit(event.pos())
+            return
+        start, origin = self._drag_start
+        delta = event.position() - start
+        self._origin = origin + delta
+        self._clamp_origin()
+        self.update()
+        self.view_changed.emit()
+
+    def mouseReleaseEvent(self, event):
+        """结束平移"""
+        if self._drag_start is not None and event.button() in (Qt.MouseButton.RightButton,
+                                                               Qt.MouseButton.MiddleButton):
+            self._drag_start = None
+            self.unsetCursor()
+            self.pan_finished.emit()
+
+    def resizeEvent(self, event):
+        """窗口大小改变时保持适应窗口，或限制平移范围"""
+        super().resizeEvent(event)
+        if self._fitted:
+            self.zoom = self.fit_zoom()
+        self._clamp_origin()
+        self.view_changed.emit()
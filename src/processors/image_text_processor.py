@@ -2,153 +2,261 @@
 图像文字处理器
 """
 import os
+import time
+from itertools import islice
 from PyQt6.QtWidgets import QFileDialog
-from PyQt6.QtCore import QObject, pyqtSignal
-from PyQt6.QtGui import QPixmap, QPainter, QFont, QColor
-from src.utils.file_utils import ensure_dir_exists
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from src.processors.render_worker import RenderWorker, load_base_image, probe_base_image
+from src.processors.render_plan import RenderPlan
+from src.processors.output_encoder import benchmark_encoder
+from src.processors.layout_check import LayoutChecker
+from src.processors.position_template import positions_to_template
+from src.config.constants import DEFAULT_RENDER_BACKEND, LAYOUT_MAX_ISSUES
+from src.utils.file_utils import get_safe_filename
 from src.utils.logger import logger
 
 class ImageTextProcessor(QObject):
     """图像文本处理类"""
-    
+
     # 定义信号
     progress_updated = pyqtSignal(int)  # 进度更新信号
     generation_completed = pyqtSignal(str)  # 生成完成信号
+    generation_cancelled = pyqtSignal(str)  # 生成取消信号
     error_occurred = pyqtSignal(str)  # 错误信号
-    
+    metrics_updated = pyqtSignal(dict)  # 性能统计信号（开启 instrument 时定期发出）
+    job_finished = pyqtSignal(dict)  # 后台任务结束信号（携带任务统计信息，见 RenderWorker.job_stats）
+
     def __init__(self):
         super().__init__()
         self.output_dir = ""  # 输出目录
-    
-    def generate_screenshots(self, image_path, data, text_positions):
+        self._thread = None  # 后台渲染线程
+        self._worker = None  # 后台渲染工作对象
+
+    def generate_screenshots(self, image_path, data, text_positions, **options):
         """
         生成带文字的截图
-        
+
+        选择输出目录后，渲染在后台线程中进行，进度和结果通过信号返回。
+
         Args:
             image_path: 图片路径
             data: 要添加的文本数据列表
             text_positions: 文字位置信息列表
+            **options: 任务设置，见 RenderWorker（workers、encoder 等）
+
+        Returns:
+            是否已开始生成
         """
         try:
             # 选择保存目录
-            self.output_dir = QFileDialog.getExistingDirectory(
-                None, 
-                "选择保存目录", 
+            output_dir = QFileDialog.getExistingDirectory(
+                None,
+                "选择保存目录",
                 os.path.join(os.path.expanduser("~"), "Desktop")
             )
-            
-            if not self.output_dir:
-                return
-            
-            # 确保输出目录存在
-            ensure_dir_exists(self.output_dir)
-            
-            # 加载原始图片
-            pixmap = QPixmap(image_path)
-            if pixmap.isNull():
-                raise ValueError(f"无法加载图片: {image_path}")
-            
-            # 输出图片信息
-            image_width = pixmap.width()
-            image_height = pixmap.height()
-            logger.debug(f"输出图片尺寸: {image_width} x {image_height}")
-            
-            # 开始处理每组数据
-            total_count = len(data)
-            for i, row in enumerate(data):
-                try:
-                    # 创建新的图片
-                    new_pixmap = pixmap.copy()
-                    painter = QPainter(new_pixmap)
-                    painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
-                    painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
-                    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
-                    
-                    # 在指定位置绘制文字
-                    for pos_info in text_positions:
-                        try:
-                            # 确保索引在数据范围内
-                            index = min(pos_info.get('index', 0), len(row) - 1)
-                            text = str(row[index])  # 确保转换为字符串
-
-                            # 使用 PositionSelector 传来的原始 QFont (包含绝对点数)
-                            font = QFont(pos_info['font'])
-                            painter.setFont(font)
-                            painter.setPen(QColor(pos_info['color']))
-
-                            # 使用 PositionSelector 传来的绝对坐标
-                            position = pos_info['position']
-
-                            # 计算文字尺寸用于居中
-                            metrics = painter.fontMetrics()
-                            text_width = metrics.horizontalAdvance(text)
-                            text_height = metrics.height()
-                            baseline_offset = metrics.descent() # 用于垂直对齐的基线偏移
-
-                            # 计算绘制文字所需的左上角坐标 (x, y)，使文字块在 position 处居中
-                            x = position.x() - text_width / 2
-                            # 垂直居中: 目标中心y + 文字高度一半 - 基线偏移 (drawText从基线开始绘制)
-                            y = position.y() + text_height / 2 - baseline_offset
-
-                            # 确保为整数坐标
-                            x = int(x)
-                            y = int(y)
-
-                            # 记录调试信息
-                            logger.debug(f"绘制文字: '{text}' at ({x}, {y}) Font: {font.family()} {font.pointSize()}pt")
-                            logger.debug(f"  目标中心点 (绝对): ({position.x()}, {position.y()})")
-                            logger.debug(f"  文本度量: 宽={text_width}, 高={text_height}, 基线偏移={baseline_offset}")
-
-                            # 绘制文字
-                            painter.drawText(x, y, text)
-
-                        except Exception as e:
-                            logger.error(f"绘制单个文字时出错: {str(e)}")
-                            continue
-                    
-                    painter.end()
-                    
-                    # 生成文件名
-                    # 使用第一列数据作为文件名的一部分
-                    filename = f"{row[0] if row else i+1}.png"
-                    safe_filename = self._get_safe_filename(filename)
-                    
-                    # 保存图片
-                    output_path = os.path.join(self.output_dir, safe_filename)
-                    success = new_pixmap.save(output_path)
-                    if success:
-                        logger.debug(f"已保存: {output_path}")
-                    else:
-                        logger.error(f"保存失败: {output_path}")
-                    
-                    # 更新进度
-                    progress = int((i + 1) / total_count * 100)
-                    self.progress_updated.emit(progress)
-                    
-                except Exception as e:
-                    logger.error(f"处理数据行 {i+1} 时出错: {str(e)}")
-            
-            # 完成处理
-            message = f"已生成 {total_count} 张图片，保存在 {self.output_dir}"
-            self.generation_completed.emit(message)
-            logger.info(message)
-            
+
+            if not output_dir:
+                return False
+
+            return self.start_generation(image_path, data, text_positions, output_dir, **options)
+
+        except Exception as e:
+            error_message = f"生成截图失败: {str(e)}"
+            self.error_occurred.emit(error_message)
+            logger.error(error_message)
+            return False
+
+    def generate_document(self, image_path, data, text_positions, sink_class, sink_options=None, **options):
+        """
+        生成带文字的截图，按顺序写入同一个文档（如 PDF）
+
+        选择保存文件后，渲染在后台线程中进行，进度和结果通过信号返回。
+
+        Args:
+            image_path: 图片路径
+            data: 要添加的文本数据列表
+            text_positions: 文字位置信息列表
+            sink_class: 输出目标类（如 PdfSink、DocxSink）
+            sink_options: 创建输出目标的参数
+            **options: 任务设置，见 RenderWorker（workers、encoder、instrument 等）
+
+        Returns:
+            是否已开始生成
+        """
+        try:
+            output_path, _ = QFileDialog.getSaveFileName(
+                None,
+                "选择保存文件",
+                os.path.join(os.path.expanduser("~"), "Desktop", f"SnapText{sink_class.EXTENSION}"),
+                sink_class.FILE_FILTER
+            )
+
+            if not output_path:
+                return False
+            if not output_path.lower().endswith(sink_class.EXTENSION):
+                output_path += sink_class.EXTENSION
+
+            sink = sink_class(output_path, **(sink_options or {}))
+            return self.start_generation(image_path, data, text_positions, os.path.dirname(output_path),
+                                         sink=sink, **options)
+
         except Exception as e:
             error_message = f"生成截图失败: {str(e)}"
             self.error_occurred.emit(error_message)
             logger.error(error_message)
-    
+            return False
+
+    def start_generation(self, image_path, data, text_positions, output_dir, **options):
+        """
+        在后台线程中开始生成截图
+
+        Args:
+            image_path: 图片路径
+            data: 要添加的文本数据（列表或 DataStream），在后台线程中按需读取
+            text_positions: 文字位置信息列表
+            output_dir: 输出目录
+            **options: 任务设置，见 RenderWorker（workers、encoder、instrument、sink 等）
+
+        Returns:
+            是否已开始生成
+        """
+        if self.is_running():
+            logger.warning("已有生成任务正在进行")
+            return False
+
+        self.output_dir = output_dir
+
+        self._thread = QThread()
+        self._worker = RenderWorker(image_path, data, list(text_positions), output_dir, **options)
+        self._worker.moveToThread(self._thread)
+
+        # 工作对象的信号转发到处理器自身的信号（跨线程自动排队到GUI线程）
+        self._thread.started.connect(self._worker.run)
+        self._worker.progress_updated.connect(self.progress_updated)
+        self._worker.generation_completed.connect(self.generation_completed)
+        self._worker.generation_cancelled.connect(self.generation_cancelled)
+        self._worker.error_occurred.connect(self.error_occurred)
+        self._worker.metrics_updated.connect(self.metrics_updated)
+        self._worker.finished.connect(self._thread.quit)
+        self._thread.finished.connect(self._on_thread_finished)
+
+        self._thread.start()
+        logger.info("后台生成任务已启动，输出目录: %s", output_dir)
+        return True
+
+    def is_running(self):
+        """是否有生成任务正在进行"""
+        return self._thread is not None and self._thread.isRunning()
+
+    def is_paused(self):
+        """生成任务是否处于暂停状态"""
+        return self._worker is not None and self._worker.is_paused()
+
+    def pause_generation(self):
+        """暂停生成"""
+        if self.is_running():
+            self._worker.pause()
+            logger.info("生成任务已暂停")
+
+    def resume_generation(self):
+        """继续生成"""
+        if self.is_running():
+            self._worker.resume()
+            logger.info("生成任务已继续")
+
+    def cancel_generation(self, wait=False):
+        """
+        取消生成
+
+        Args:
+            wait: 是否等待后台线程结束
+        """
+        if self.is_running():
+            self._worker.cancel()
+            logger.info("已请求取消生成任务")
+            if wait:
+                self._thread.wait()
+
+    def _on_thread_finished(self):
+        """后台线程结束回调"""
+        self._thread.wait()
+        stats = self._worker.job_stats()
+        self._thread = None
+        self._worker = None
+        self.job_finished.emit(stats)
+
+    def benchmark_encoding(self, image_path, text_positions, row, encoder, iterations=5,
+                           backend=DEFAULT_RENDER_BACKEND):
+        """
+        编码测试：用当前模板绘制一张图片，统计所选输出格式每张图片的编码耗时和大小
+
+        Args:
+            image_path: 图片路径
+            text_positions: 文字位置信息列表
+            row: 用于绘制的一组数据
+            encoder: 输出图片编码器
+            iterations: 重复绘制和编码的次数
+            backend: 渲染后端 (qt/pillow)
+
+        Returns:
+            包含 backend、ms_per_render、format、ms_per_image、bytes_per_image 的字典
+        """
+        if backend == 'pillow':
+            from src.processors.pillow_backend import load_base_image as load_pillow_image, PillowRenderPlan
+
+            base_image = load_pillow_image(image_path)
+            plan = PillowRenderPlan(positions_to_template(text_positions), base_image)
+        else:
+            base_image = load_base_image(image_path)
+            plan = RenderPlan(text_positions, base_image)
+
+        # 每次在底图的副本上绘制，只统计绘制耗时
+        iterations = max(1, iterations)
+        render_time = 0.0
+        for _ in range(iterations):
+            image = base_image.copy()
+            start = time.perf_counter()
+            plan.render(image, row)
+            render_time += time.perf_counter() - start
+
+        result = {'backend': backend, 'ms_per_render': round(render_time * 1000 / iterations, 3)}
+        result.update(benchmark_encoder(encoder, image, iterations))
+        logger.info(f"编码测试 {result['format']} ({backend}): 绘制 {result['ms_per_render']} ms/张, "
+                    f"编码 {result['ms_per_image']} ms/张, {result['bytes_per_image']} 字节/张")
+        return result
+
+    def check_layout(self, image_path, text_positions, data, max_width=None, limit=None,
+                     backend=DEFAULT_RENDER_BACKEND, max_issues=LAYOUT_MAX_ISSUES):
+        """
+        排版预检：不绘制、不编码，只测量每一行每个位置的文字，找出超宽或超出底图的文字
+
+        Args:
+            image_path: 图片路径
+            text_positions: 文字位置信息列表
+            data: 可迭代的数据行
+            max_width: 文字步进宽度的上限（原图像素），为None时只检查是否超出底图
+            limit: 最多检查的数据行数
+            backend: 渲染后端 (qt/pillow)，使用该后端的字体度量
+            max_issues: 报告中最多列出的问题数
+
+        Returns:
+            预检报告字典，见 LayoutChecker.run
+        """
+        # 只读取底图的尺寸和分辨率，渲染计划基于分辨率相同的 1x1 图片构建，不解码整张底图
+        if backend == 'pillow':
+            from src.processors.pillow_backend import probe_base_image as probe_pillow_image, PillowRenderPlan
+
+            probe, image_size = probe_pillow_image(image_path)
+            plan = PillowRenderPlan(positions_to_template(text_positions), probe)
+        else:
+            probe, image_size = probe_base_image(image_path)
+            plan = RenderPlan(text_positions, probe)
+
+        rows = islice(data, limit) if limit is not None else data
+        report = {'backend': backend}
+        report.update(LayoutChecker(plan, image_size, max_width).run(rows, max_issues))
+        return report
+
     def _get_safe_filename(self, filename):
         """获取安全的文件名"""
-        # 替换不安全的字符
-        unsafe_chars = ['/', '\\', ':', '*', '?', '"', '<', '>', '|']
-        for char in unsafe_chars:
-            filename = filename.replace(char, '_')
-        
-        # 确保文件名不超过255个字符
-        base_name, ext = os.path.splitext(filename)
-        if len(filename) > 255:
-            base_name = base_name[:255 - len(ext) - 1]
-            filename = base_name + ext
-        
-        return filename 
\ No newline at end of file
+        return get_safe_filename(filename)
@@ -0,0 +1,209 @@
+"""
+生成任务清单
+
+在输出目录中以 JSON Lines 格式逐行记录每个输出文件的内容键、行号、大小和校验和。
+内容键由底图内容摘要、位置模板、输出格式设置和数据行内容计算得到，
+重新生成时，内容键未改变且文件完好的输出会被跳过：
+中断的任务可以继续，只修改了少量数据时也只重新生成改变的行。
+"""
+import os
+import json
+import hashlib
+import threading
+import time
+from src.config.constants import MANIFEST_FILENAME, DEFAULT_RENDER_BACKEND
+from src.utils.logger import logger
+
+# 清单文件格式版本
+MANIFEST_VERSION = 2
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    """计算文件的 SHA-256 校验和"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def job_key(image_path, template, encoder, backend=DEFAULT_RENDER_BACKEND):
+    """
+    计算任务中所有行共用的输入摘要：底图内容、位置模板、输出格式设置和渲染后端
+
+    Args:
+        image_path: 底图路径
+        template: 可序列化的位置模板字典
+        encoder: 输出图片编码器
+        backend: 渲染后端
+
+    Returns:
+        十六进制摘要字符串
+    """
+    settings = {
+        'image': file_checksum(image_path),
+        'template': template,
+        'encoder': encoder.to_dict(),
+    }
+    # 默认后端不写入摘要，已有的任务清单仍然有效
+    if backend != DEFAULT_RENDER_BACKEND:
+        settings['backend'] = backend
+    text = json.dumps(settings, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def content_key(base_key, row):
+    """
+    计算单个输出的内容键
+
+    Args:
+        base_key: 任务的输入摘要，见 job_key()
+        row: 数据行
+
+    Returns:
+        十六进制内容键
+    """
+    digest = hashlib.blake2b(base_key.encode('ascii'), digest_size=16)
+    digest.update("\x1f".join(str(value) for value in row).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class JobManifest:
+    """生成任务清单（输出目录中的日志文件）"""
+
+    def __init__(self, output_dir, verify_checksums=False):
+        """
+        初始化任务清单
+
+        Args:
+            output_dir: 输出目录
+            verify_checksums: 跳过未改变的输出前是否重新计算文件校验和（否则只检查文件大小）
+        """
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self.verify_checksums = verify_checksums
+
+        self.entries = {}  # 输出文件相对于输出目录的路径 -> 最近一次记录的条目
+        self._file = None
+        self._lock = threading.Lock()
+
+    def open(self, incremental=True):
+        """
+        打开清单：读取已有记录并压缩重写，之后的记录追加到文件末尾
+
+        Args:
+            incremental: 是否使用已有记录跳过未改变的输出
+
+        Returns:
+            已有记录中完成的输出数
+        """
+        self.entries = self._load() if incremental else {}
+
+        # 每个输出只保留最近一条记录，避免清单随重新生成的次数无限增长
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'version': MANIFEST_VERSION, 'created': time.time()}) + "\n")
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+        done_count = sum(1 for entry in self.entries.values() if 'error' not in entry)
+        if done_count:
+            logger.info("读取任务清单 %s: 已有 %d 个输出记录", self.path, done_count)
+        return done_count
+
+    def _load(self):
+        """
+        读取已有的清单
+
+        Returns:
+            {输出文件路径: 条目}；清单不存在或版本不同时返回空字典
+        """
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            header = None
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 中断时可能留下不完整的最后一行
+                    continue
+                if header is None:
+                    header = record
+                    if header.get('version') != MANIFEST_VERSION:
+                        logger.info("任务清单版本不同，忽略已有记录: %s", self.path)
+                        return {}
+                    continue
+                # 同一输出的后一条记录覆盖前一条
+                entries[record['path']] = record
+        return entries
+
+    def _entry_name(self, output_path):
+        """输出文件在清单中的名称：相对于输出目录的路径（分隔符统一为 /）"""
+        return os.path.relpath(output_path, self.output_dir).replace(os.sep, '/')
+
+    def _append(self, record):
+        """追加一条记录并立即写出，进程崩溃时最多丢失正在写的这一行"""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def is_unchanged(self, key, output_path):
+        """
+        检查输出文件是否已按相同的内容键生成且文件完好
+
+        Args:
+            key: 内容键，见 content_key()
+            output_path: 输出文件路径
+
+        Returns:
+            是否可以跳过
+        """
+        entry = self.entries.get(self._entry_name(output_path))
+        if entry is None or entry.get('key') != key:
+            return False
+
+        try:
+            if os.path.getsize(output_path) != entry['size']:
+                return False
+            if self.verify_checksums and file_checksum(output_path) != entry['sha256']:
+                return False
+        except OSError:
+            return False
+        return True
+
+    def record_done(self, index, key, output_path, image_data):
+        """
+        记录已写入的输出（线程安全）
+
+        Args:
+            index: 行号
+            key: 内容键
+            output_path: 输出文件路径
+            image_data: 写入的图片数据
+        """
+        self._append({
+            'path': self._entry_name(output_path),
+            'index': index,
+            'key': key,
+            'size': len(image_data),
+            'sha256': hashlib.sha256(image_data).hexdigest(),
+        })
+
+    def record_failed(self, index, output_path, error):
+        """记录处理失败的输出，下次运行时会重新生成（线程安全）"""
+        self._append({'path': self._entry_name(output_path), 'index': index, 'error': str(error)})
+
+    def close(self):
+        """关闭清单文件"""
+        if self._file is not None:
+            with self._lock:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
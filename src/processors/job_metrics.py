@@ -0,0 +1,135 @@
+"""
+生成任务的性能统计
+
+记录各阶段（解码底图、字体设置、绘制、编码、写入）的耗时和每张图片的总延迟，
+使用对数分桶直方图统计 p50/p95/p99，内存占用与图片数量无关。
+未开启统计时工作对象不创建 JobMetrics，热路径上只多一次 None 判断。
+"""
+import json
+import math
+import threading
+import time
+
+# 直方图的最小可区分时间（秒）和相邻分桶的比例，相对误差约为 ±5%
+_HISTOGRAM_MIN = 1e-6
+_HISTOGRAM_RATIO = 1.1
+_LOG_RATIO = math.log(_HISTOGRAM_RATIO)
+
+# 报告中各阶段的顺序
+STAGES = ('decode', 'font_setup', 'paint', 'encode', 'write')
+
+
+class LatencyHistogram:
+    """对数分桶的耗时直方图"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._buckets = {}  # 分桶序号 -> 数量
+
+    def add(self, seconds):
+        """记录一次耗时（秒）"""
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        bucket = 0 if seconds <= _HISTOGRAM_MIN else int(math.log(seconds / _HISTOGRAM_MIN) / _LOG_RATIO) + 1
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def percentile(self, percent):
+        """
+        估算百分位数
+
+        Args:
+            percent: 百分位 (0–100)
+
+        Returns:
+            耗时（秒），没有记录时返回 0
+        """
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= target:
+                if bucket == 0:
+                    return _HISTOGRAM_MIN
+                # 取分桶的几何中点，且不超过实际最大值
+                return min(self.max, _HISTOGRAM_MIN * _HISTOGRAM_RATIO ** (bucket - 0.5))
+        return self.max
+
+    def to_dict(self):
+        """转换为以毫秒为单位的字典"""
+        return {
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p95_ms': round(self.percentile(95) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class JobMetrics:
+    """生成任务的各阶段耗时统计（线程安全）"""
+
+    def __init__(self):
+        self.stages = {}  # 阶段名称 -> LatencyHistogram
+        self.latency = LatencyHistogram()  # 每张图片从开始绘制到写入完成的延迟
+        self.start_time = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        """
+        记录一个阶段的一次耗时
+
+        Args:
+            stage: 阶段名称，见 STAGES
+            seconds: 耗时（秒）
+        """
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = LatencyHistogram()
+            histogram.add(seconds)
+
+    def record_image(self, seconds):
+        """记录一张图片的总延迟（秒）"""
+        with self._lock:
+            self.latency.add(seconds)
+
+    def snapshot(self):
+        """
+        获取当前的统计结果
+
+        Returns:
+            包含 wall_seconds、images、images_per_second、stages 和 image_latency 的字典
+        """
+        with self._lock:
+            wall = time.perf_counter() - self.start_time
+            order = {name: i for i, name in enumerate(STAGES)}
+            stages = {name: self.stages[name].to_dict()
+                      for name in sorted(self.stages, key=lambda name: order.get(name, len(order)))}
+            return {
+                'wall_seconds': round(wall, 3),
+                'images': self.latency.count,
+                'images_per_second': round(self.latency.count / wall, 2) if wall > 0 else 0.0,
+                'stages': stages,
+                'image_latency': self.latency.to_dict(),
+            }
+
+    def write_report(self, path, extra=None):
+        """
+        把统计结果写入 JSON 报告
+
+        Args:
+            path: 报告文件路径
+            extra: 需要一并写入的其他信息（如任务设置和结果计数）
+        """
+        report = dict(extra or {})
+        report.update(self.snapshot())
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
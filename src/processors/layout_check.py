@@ -0,0 +1,142 @@
+"""
+排版预检
+
+不绘制、不编码，只用渲染计划中的字体度量（与绘制时相同）计算每一行每个位置的文字范围，
+在批量生成之前找出宽度超过上限或超出底图范围的文字（过长的姓名等）。
+测量结果按 (文字, 样式编号) 缓存，重复的值只测量一次；每行只需查表和几次比较。
+"""
+import time
+from src.config.constants import LAYOUT_MEASURE_CACHE_SIZE, LAYOUT_MAX_ISSUES
+from src.utils.logger import logger
+
+# 问题类型
+OVERFLOW_WIDTH = 'width'  # 步进宽度超过宽度上限
+OVERFLOW_BOUNDS = 'bounds'  # 文字范围超出底图
+
+
+class LayoutChecker:
+    """排版预检器"""
+
+    def __init__(self, plan, image_size, max_width=None, cache_size=LAYOUT_MEASURE_CACHE_SIZE):
+        """
+        初始化预检器
+
+        Args:
+            plan: 渲染计划 RenderPlan 或 PillowRenderPlan（提供文字位置和 measure 方法）
+            image_size: 底图尺寸 (宽, 高)
+            max_width: 文字步进宽度的上限（原图像素），为None时只检查是否超出底图
+            cache_size: 最多缓存的测量结果数，超过时清空
+        """
+        self.plan = plan
+        self.image_width, self.image_height = image_size
+        self.max_width = max_width
+        self.cache_size = cache_size
+        self.measured = 0  # 实际测量的次数
+        self._cache = {}  # (文字, 样式编号) -> (步进宽度, 范围)
+
+    def measure(self, entry, text):
+        """
+        测量文字（按文字和样式缓存）
+
+        Returns:
+            (步进宽度, (左, 上, 右, 下))，范围相对基线原点
+        """
+        key = (text, entry.style_id)
+        result = self._cache.get(key)
+        if result is None:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            result = self._cache[key] = self.plan.measure(entry, text)
+            self.measured += 1
+        return result
+
+    def check_row(self, row):
+        """
+        检查一行数据
+
+        Args:
+            row: 一组文本数据
+
+        Returns:
+            [(位置序号, 数据列, 文字, 步进宽度, (左, 上, 右, 下), 问题类型列表), ...]，
+            范围为原图坐标，没有问题时为空列表
+        """
+        issues = []
+        last_column = len(row) - 1
+        max_width = self.max_width
+        for position, entry in enumerate(self.plan.entries):
+            # 与绘制时相同的列选择和居中规则
+            column = entry.column if entry.column < last_column else last_column
+            text = str(row[column])
+            text_width, (left, top, right, bottom) = self.measure(entry, text)
+            x = int(entry.center_x - text_width / 2)
+            y = int(entry.center_y + entry.text_height / 2 - entry.baseline_offset)
+            left += x
+            top += y
+            right += x
+            bottom += y
+
+            reasons = []
+            if max_width is not None and text_width > max_width:
+                reasons.append(OVERFLOW_WIDTH)
+            if left < 0 or top < 0 or right > self.image_width or bottom > self.image_height:
+                reasons.append(OVERFLOW_BOUNDS)
+            if reasons:
+                issues.append((position, column, text, text_width, (left, top, right, bottom), reasons))
+        return issues
+
+    def run(self, rows, max_issues=LAYOUT_MAX_ISSUES):
+        """
+        检查所有数据行
+
+        Args:
+            rows: 可迭代的数据行
+            max_issues: 报告中最多列出的问题数
+
+        Returns:
+            预检报告字典
+        """
+        start = time.perf_counter()
+        row_count = 0
+        rows_with_issues = 0
+        counts = {OVERFLOW_WIDTH: 0, OVERFLOW_BOUNDS: 0}
+        listed = []
+        check_row = self.check_row
+        for index, row in enumerate(rows):
+            row_count += 1
+            issues = check_row(row)
+            if not issues:
+                continue
+            rows_with_issues += 1
+            for position, column, text, text_width, box, reasons in issues:
+                for reason in reasons:
+                    counts[reason] += 1
+                if len(listed) < max_issues:
+                    listed.append({
+                        'row': index + 1,
+                        'position': position + 1,
+                        'column': column,
+                        'text': text,
+                        'width': round(text_width, 1),
+                        'box': list(box),
+                        'reasons': reasons,
+                    })
+        elapsed = time.perf_counter() - start
+
+        report = {
+            'rows': row_count,
+            'positions': len(self.plan.entries),
+            'image_size': [self.image_width, self.image_height],
+            'max_width': self.max_width,
+            'rows_with_issues': rows_with_issues,
+            'width_overflows': counts[OVERFLOW_WIDTH],
+            'bounds_overflows': counts[OVERFLOW_BOUNDS],
+            'issues': listed,
+            'measured': self.measured,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(row_count / elapsed) if elapsed > 0 else 0,
+        }
+        logger.info("排版预检: %d 行，%d 行有问题（超宽 %d 处，超出底图 %d 处），测量 %d 次，%.2f 秒",
+                    row_count, rows_with_issues, counts[OVERFLOW_WIDTH], counts[OVERFLOW_BOUNDS],
+                    self.measured, elapsed)
+        return report
@@ -0,0 +1,151 @@
+"""
+输出图片编码器
+
+输出格式及其参数是生成任务的一项设置：
+PNG 压缩级别 0–9、JPEG 质量和渐进式、WebP 质量和无损。
+"""
+import time
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt6.QtGui import QImage, QImageWriter
+from src.config.constants import (DEFAULT_OUTPUT_FORMAT, DEFAULT_PNG_COMPRESSION,
+                                  DEFAULT_JPEG_QUALITY, DEFAULT_WEBP_QUALITY)
+
+# 支持的输出格式: 格式名 -> (Qt格式名, 文件扩展名, 显示名称)
+OUTPUT_FORMATS = {
+    'png': (b'png', '.png', 'PNG'),
+    'jpeg': (b'jpeg', '.jpg', 'JPEG'),
+    'webp': (b'webp', '.webp', 'WebP'),
+}
+
+
+def png_level_to_quality(level):
+    """
+    把 PNG 压缩级别 (0–9) 转换为 Qt 的质量参数
+
+    Qt 的 PNG 写入器按 (100 - quality) * 9 / 91 计算 zlib 压缩级别，
+    这里取能得到指定级别的质量值；-1 表示使用 Qt 默认值。
+    """
+    if level is None or level < 0:
+        return -1
+    level = min(9, int(level))
+    return 100 - (91 * level + 8) // 9
+
+
+class OutputEncoder:
+    """输出图片编码器"""
+
+    def __init__(self, image_format=DEFAULT_OUTPUT_FORMAT, png_compression=DEFAULT_PNG_COMPRESSION,
+                 jpeg_quality=DEFAULT_JPEG_QUALITY, jpeg_progressive=False,
+                 webp_quality=DEFAULT_WEBP_QUALITY, webp_lossless=False):
+        """
+        初始化编码器
+
+        Args:
+            image_format: 输出格式 (png/jpeg/webp)
+            png_compression: PNG 压缩级别 0–9，-1 表示默认
+            jpeg_quality: JPEG 质量 0–100
+            jpeg_progressive: 是否输出渐进式 JPEG
+            webp_quality: WebP 质量 0–100
+            webp_lossless: 是否输出无损 WebP
+        """
+        image_format = image_format.lower()
+        if image_format == 'jpg':
+            image_format = 'jpeg'
+        if image_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {image_format}")
+
+        self.image_format = image_format
+        self.png_compression = png_compression
+        self.jpeg_quality = jpeg_quality
+        self.jpeg_progressive = jpeg_progressive
+        self.webp_quality = webp_quality
+        self.webp_lossless = webp_lossless
+
+    @property
+    def extension(self):
+        """输出文件扩展名"""
+        return OUTPUT_FORMATS[self.image_format][1]
+
+    def _quality(self):
+        """当前格式对应的 Qt 质量参数"""
+        if self.image_format == 'png':
+            return png_level_to_quality(self.png_compression)
+        if self.image_format == 'jpeg':
+            return self.jpeg_quality
+        # Qt 的 WebP 写入器在质量为100时使用无损编码
+        return 100 if self.webp_lossless else min(99, self.webp_quality)
+
+    def encode(self, image):
+        """
+        把 QImage 编码为图片文件数据
+
+        Args:
+            image: 要编码的 QImage，或 Pillow 渲染后端绘制的 PIL 图片
+
+        Returns:
+            编码后的 bytes
+        """
+        if not isinstance(image, QImage):
+            from src.processors.pillow_backend import encode_image
+
+            return encode_image(image, self)
+
+        byte_array = QByteArray()
+        buffer = QBuffer(byte_array)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+
+        writer = QImageWriter(buffer, OUTPUT_FORMATS[self.image_format][0])
+        writer.setQuality(self._quality())
+        if self.image_format == 'jpeg':
+            writer.setProgressiveScanWrite(self.jpeg_progressive)
+
+        if not writer.write(image):
+            raise ValueError(f"图片编码失败 ({self.describe()}): {writer.errorString()}")
+        buffer.close()
+        return byte_array.data()
+
+    def describe(self):
+        """编码设置的简短描述"""
+        if self.image_format == 'png':
+            level = "默认" if self.png_compression < 0 else self.png_compression
+            return f"PNG 压缩级别 {level}"
+        if self.image_format == 'jpeg':
+            return f"JPEG 质量 {self.jpeg_quality}{' 渐进式' if self.jpeg_progressive else ''}"
+        return "WebP 无损" if self.webp_lossless else f"WebP 质量 {self.webp_quality}"
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'format': self.image_format,
+            'png_compression': self.png_compression,
+            'jpeg_quality': self.jpeg_quality,
+            'jpeg_progressive': self.jpeg_progressive,
+            'webp_quality': self.webp_quality,
+            'webp_lossless': self.webp_lossless,
+        }
+
+
+def benchmark_encoder(encoder, image, iterations=5):
+    """
+    编码测试：对同一张图片重复编码，统计每张图片的耗时和大小
+
+    Args:
+        encoder: 输出图片编码器
+        image: 已绘制好文字的 QImage
+        iterations: 重复次数
+
+    Returns:
+        包含 format、ms_per_image、bytes_per_image 的字典
+    """
+    iterations = max(1, iterations)
+    total_bytes = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        total_bytes += len(encoder.encode(image))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'format': encoder.describe(),
+        'ms_per_image': round(elapsed * 1000 / iterations, 2),
+        'bytes_per_image': total_bytes // iterations,
+    }
@@ -0,0 +1,217 @@
+"""
+输出文件布局
+
+决定每个数据行的输出文件名和所在的子目录：
+- 文件名模板：用任意列组成文件名，如 "{0}_{2}"，{index} 表示行号（从1开始），支持格式说明如 {index:06d}
+- 子目录分片：按文件名哈希 (hash) 或行号 (index) 把文件分散到子目录中，避免单个目录中的文件过多
+- 重名处理：同一任务中重名（不区分大小写）的文件依次加上 _2、_3 等后缀，不会互相覆盖
+
+模板解析、分片目录的位数等在每个任务开始时计算一次；重名只在本任务生成的文件名之间检查，
+不需要对每个文件调用 stat()，同样的数据总是得到同样的文件名，增量生成可以据此跳过未改变的输出。
+重名记录只保留可能与后面的文件重名的文件名：按行号分片时只保留当前子目录中的文件名；
+文件名以行号结尾的模板（如 "{0}_{index}"）各行的文件名本来就不同，只记录被截断或加了后缀的文件名。
+"""
+import os
+import re
+import hashlib
+from string import Formatter
+from src.config.constants import DEFAULT_NAME_TEMPLATE, DEFAULT_SHARD_SIZE, DEFAULT_SHARD_WIDTH
+from src.utils.file_utils import get_safe_filename
+
+# 支持的子目录分片方式
+SHARD_MODES = ('hash', 'index')
+
+# 只输出数字（可带宽度和补零）的行号格式说明，如 ""、"d"、"06d"
+_DIGIT_FORMAT_SPEC = re.compile(r"\d*d?")
+
+
+class OutputLayout:
+    """输出文件布局"""
+
+    def __init__(self, name_template=DEFAULT_NAME_TEMPLATE, shard=None, shard_size=DEFAULT_SHARD_SIZE,
+                 shard_width=DEFAULT_SHARD_WIDTH):
+        """
+        初始化输出文件布局
+
+        Args:
+            name_template: 文件名模板（不含扩展名），{0}、{1} 等为数据列，{index} 为行号（从1开始）
+            shard: 子目录分片方式，None 表示不分子目录，hash 按文件名哈希，index 按行号
+            shard_size: 按行号分片时每个子目录中的文件数
+            shard_width: 按哈希分片时子目录名的十六进制位数（2 位为 256 个子目录）
+        """
+        if shard is not None and shard not in SHARD_MODES:
+            raise ValueError(f"不支持的子目录分片方式: {shard}")
+        if shard_size < 1 or not 1 <= shard_width <= 8:
+            raise ValueError(f"无效的子目录分片设置: {shard_size} 个文件, {shard_width} 位")
+        self.name_template = name_template
+        self.shard = shard
+        self.shard_size = shard_size
+        self.shard_width = shard_width
+
+        self._formatter = Formatter()
+        self._fields = self._parse_template(name_template)
+        self._check_template()
+        self._unique_names = self._names_unique(self._fields)
+        self._root = ""
+        self._extension = ""
+        self._make_dirs = False
+        self._index_digits = 1
+        self._used = set()  # 已分配的 (子目录, 小写文件名)，只保留可能与后面的文件重名的文件名
+        self._next_suffix = {}  # 重名文件 -> 下一个尝试的后缀序号
+        self._current_dir = None  # 按行号分片时当前的子目录
+        self._reserved = set()  # 输出目标自己使用、数据行不能使用的 (子目录, 小写文件名)
+        self._created_dirs = set()
+
+    @staticmethod
+    def _parse_template(template):
+        """
+        解析文件名模板
+
+        Returns:
+            [(字面文本, 字段: 列号/"index"/None, 格式说明, 转换标志)]
+        """
+        try:
+            parsed = list(Formatter().parse(template))
+        except ValueError as e:
+            raise ValueError(f"文件名模板格式无效: {template}（{e}）")
+        fields = []
+        for literal, field, format_spec, conversion in parsed:
+            if field is None:
+                fields.append((literal, None, "", None))
+            elif field == "index":
+                fields.append((literal, "index", format_spec or "", conversion))
+            elif field.isdigit():
+                fields.append((literal, int(field), format_spec or "", conversion))
+            else:
+                raise ValueError(f"文件名模板中的字段无效: {{{field}}}，只能使用列号或 index")
+        return fields
+
+    def _check_template(self):
+        """
+        用一行示例数据试生成文件名，格式说明与数据不匹配（如对文字使用 {0:06d}）时抛出 ValueError
+
+        数据列的值总是文字，试生成通过后每一行都能生成文件名。
+        """
+        columns = [field for _, field, _, _ in self._fields if isinstance(field, int)]
+        sample_row = ["示例"] * (max(columns) + 1 if columns else 0)
+        try:
+            self._format_name(0, sample_row)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"文件名模板格式无效: {self.name_template}（{e}）")
+
+    @staticmethod
+    def _names_unique(fields):
+        """
+        模板生成的文件名是否各行都不同：文件名以只含数字的行号字段结尾（后面只有固定文字），
+        且行号前面是模板开头或非数字的字面文本，从文件名末尾即可唯一地读出行号
+        """
+        last = None
+        for position, (literal, field, _, _) in enumerate(fields):
+            if field is not None:
+                last = position
+        if last is None or fields[last][1] != "index":
+            return False
+        literal, _, format_spec, conversion = fields[last]
+        if conversion not in (None, 's', 'r', 'a') or not _DIGIT_FORMAT_SPEC.fullmatch(format_spec):
+            return False
+        if literal:
+            return not literal[-1].isdigit()
+        return last == 0
+
+    def describe(self):
+        """布局设置的简短描述"""
+        if self.shard == 'hash':
+            shard = f"，按哈希分为 {16 ** self.shard_width} 个子目录"
+        elif self.shard == 'index':
+            shard = f"，每 {self.shard_size} 个文件一个子目录"
+        else:
+            shard = ""
+        return f"文件名 {self.name_template}{shard}"
+
+    def start(self, root, extension, total_count, make_dirs=True, reserved=()):
+        """
+        开始一个任务：记录输出位置并清空重名记录
+
+        Args:
+            root: 输出目录，单文件输出时为空字符串（得到相对路径）
+            extension: 输出文件扩展名
+            total_count: 任务的数据行数，用于确定按行号分片时子目录名的位数
+            make_dirs: 是否在分配文件名时创建子目录
+            reserved: 数据行不能使用的相对路径（如归档中的索引文件），与之重名的行加上后缀
+        """
+        self._root = root
+        self._extension = extension
+        self._make_dirs = make_dirs
+        self._index_digits = len(str(max(0, total_count - 1) // self.shard_size))
+        self._used = set()
+        self._next_suffix = {}
+        self._current_dir = None
+        self._reserved = {(os.path.dirname(path), os.path.basename(path).lower()) for path in reserved}
+        self._created_dirs = set()
+
+    def _format_name(self, index, row):
+        """用模板生成文件名（不含扩展名）"""
+        parts = []
+        for literal, field, format_spec, conversion in self._fields:
+            parts.append(literal)
+            if field is None:
+                continue
+            if field == "index":
+                value = index + 1
+            else:
+                value = row[field] if field < len(row) else ""
+            parts.append(format(self._formatter.convert_field(value, conversion), format_spec))
+        return "".join(parts)
+
+    def _shard_dir(self, index, name):
+        """获取文件所在的子目录名，不分子目录时为空字符串"""
+        if self.shard == 'hash':
+            return hashlib.md5(name.lower().encode('utf-8')).hexdigest()[:self.shard_width]
+        if self.shard == 'index':
+            return f"{index // self.shard_size:0{self._index_digits}d}"
+        return ""
+
+    def path(self, index, row):
+        """
+        分配数据行的输出文件路径（需要按行号顺序调用，同样的数据总是得到同样的路径）
+
+        Args:
+            index: 行号
+            row: 数据行
+
+        Returns:
+            输出文件路径
+        """
+        name = self._format_name(index, row).strip() or str(index + 1)
+        filename = get_safe_filename(f"{name}{self._extension}")
+        truncated = len(filename) < len(name) + len(self._extension)
+        directory = self._shard_dir(index, filename)
+
+        if self.shard == 'index' and directory != self._current_dir:
+            # 按行号顺序分配，之前的子目录不会再分配文件，不需要保留其中的文件名
+            self._current_dir = directory
+            self._used.clear()
+            self._next_suffix.clear()
+
+        key = (directory, filename.lower())
+        collided = key in self._used or key in self._reserved
+        if collided:
+            # 重名时加上序号后缀，后缀本身也可能与其他行的文件名相同
+            stem, extension = os.path.splitext(filename)
+            suffix = self._next_suffix.get(key, 2)
+            while True:
+                candidate = f"{stem}_{suffix}{extension}"
+                suffix += 1
+                candidate_key = (directory, candidate.lower())
+                if candidate_key not in self._used and candidate_key not in self._reserved:
+                    break
+            self._next_suffix[key] = suffix
+            filename = candidate
+            key = (directory, filename.lower())
+        if collided or truncated or not self._unique_names:
+            self._used.add(key)
+
+        if directory and self._make_dirs and directory not in self._created_dirs:
+            os.makedirs(os.path.join(self._root, directory), exist_ok=True)
+            self._created_dirs.add(directory)
+        return os.path.join(self._root, directory, filename)
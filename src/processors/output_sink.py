@@ -0,0 +1,176 @@
+"""
+单文件输出目标
+
+默认每行数据保存为输出目录中的一个图片文件；输出目标把整批图片按行号顺序写入同一个文件（如 PDF）。
+流水线和多进程渲染池按完成顺序返回结果，输出目标用一个重排缓冲区恢复行号顺序，
+缓冲区中最多只有在途的几张图片，内存占用与数据行数无关。
+"""
+import threading
+
+
+class SinkWriteError(OSError):
+    """
+    按行号顺序写入时有行写入失败
+
+    失败的行不一定是触发写入的那一行（缓冲区中前面的行可能在写入后面的行时才写出），
+    调用方应按 failures 记录失败的行。
+    """
+
+    def __init__(self, failures):
+        """
+        Args:
+            failures: [(行号, 错误信息), ...]
+        """
+        super().__init__(failures[0][1])
+        self.failures = failures
+
+
+class OutputSink:
+    """单文件输出目标的基类"""
+
+    EXTENSION = ""  # 输出文件扩展名
+    FILE_FILTER = ""  # 保存文件对话框的文件类型过滤器
+    REQUIRES_QT = True  # 是否需要 Qt 渲染后端（open() 使用 QImage 底图和 Qt 渲染计划）
+    RESERVED_NAMES = ()  # 输出目标自己使用的成员名（相对路径），数据行的输出名称不能与之相同
+
+    def __init__(self, path):
+        """
+        初始化输出目标
+
+        Args:
+            path: 输出文件路径
+        """
+        self.path = path
+        self.page_count = 0  # 已写入的图片/页数
+        # 是否可以直接用数据行写入（见 write_row），由 open() 根据渲染计划确定
+        self.draws_text = False
+
+        self._pending = {}  # 等待前面的行写入的结果: 行号 -> (输出路径, 图片数据) 或 None（跳过）
+        self._next_index = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def describe(self):
+        """输出设置的简短描述"""
+        return self.EXTENSION.lstrip('.').upper()
+
+    def location(self):
+        """输出位置，用于提示信息"""
+        return self.path
+
+    def image_encoder(self, encoder):
+        """
+        获取渲染流水线使用的图片编码器
+
+        Args:
+            encoder: 任务设置的输出图片编码器
+
+        Returns:
+            编码器对象（需要可以传给多进程渲染池的子进程）
+        """
+        return encoder
+
+    def open(self, base_image, plan):
+        """
+        打开输出文件
+
+        Args:
+            base_image: 原始底图
+            plan: 渲染计划
+        """
+        raise NotImplementedError
+
+    def write(self, index, output_path, image_data):
+        """
+        写入一张编码后的图片（线程安全，可以按任意顺序调用，按行号顺序写入）
+
+        参数与 render_pipeline.write_file 相同，可以直接作为流水线的写入函数。
+        本行或缓冲区中其他行写入失败时抛出 SinkWriteError（write_row、skip、close 相同）。
+
+        Args:
+            index: 行号
+            output_path: 行对应的输出文件名
+            image_data: 编码后的图片数据
+        """
+        with self._lock:
+            self._pending[index] = (output_path, image_data)
+            self._flush()
+
+    def write_row(self, index, row):
+        """
+        直接用数据行写入一页（draws_text 为True时按行号顺序调用）
+
+        Args:
+            index: 行号
+            row: 数据行
+
+        Returns:
+            是否已写入；返回False时调用方应把该行渲染为图片后用 write() 写入
+        """
+        with self._lock:
+            if not self._write_row(index, row):
+                return False
+            self.page_count += 1
+            self._pending[index] = None
+            self._flush()
+        return True
+
+    def skip(self, index):
+        """跳过处理失败的行，让后面的行可以继续写入（线程安全）"""
+        with self._lock:
+            if index < self._next_index:
+                return  # 已经按顺序处理过（写入时失败的行）
+            self._pending[index] = None
+            self._flush()
+
+    def _flush(self):
+        """按行号顺序写入缓冲区中已经连续的结果，某一行写入失败时跳过该行继续写入后面的行"""
+        failures = []
+        while self._next_index in self._pending:
+            index = self._next_index
+            try:
+                self._write_pending(index)
+            except Exception as e:
+                failures.append((index, str(e)))
+            finally:
+                self._next_index += 1
+        if failures:
+            raise SinkWriteError(failures)
+
+    def _write_pending(self, index):
+        """写入缓冲区中的一行（跳过的行不写入）"""
+        item = self._pending.pop(index)
+        if item is not None:
+            self._write_image(index, *item)
+            self.page_count += 1
+
+    def close(self):
+        """写入剩余的结果并完成输出文件（可重复调用）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            failures = []
+            try:
+                # 取消时中间可能缺少一些行，剩余的结果按行号顺序写入
+                for index in sorted(self._pending):
+                    try:
+                        self._write_pending(index)
+                    except Exception as e:
+                        failures.append((index, str(e)))
+            finally:
+                self._finish()
+            if failures:
+                raise SinkWriteError(failures)
+
+    def _write_row(self, index, row):
+        """直接用数据行写入一页，返回是否已写入；子类可以重写"""
+        return False
+
+    def _write_image(self, index, output_path, image_data):
+        """写入一张图片；子类需要重写"""
+        raise NotImplementedError
+
+    def _finish(self):
+        """完成并关闭输出文件；子类需要重写"""
+        raise NotImplementedError
@@ -0,0 +1,448 @@
+"""
+PDF 输出目标
+
+把整批图片按行号顺序逐页写入同一个 PDF 文件，每页写完即落盘，内存中只保留对象偏移量和页面编号。
+
+能用矢量文字时（字体可以嵌入、数据行的字符都在字体中），底图只作为共享的图片对象嵌入一次，
+每页只包含引用底图和绘制文字的几条指令，文件比逐页嵌入整张图片小得多，也不需要光栅化和编码。
+否则每页嵌入一张完整的图片，可以选择 JPEG 或 Flate（无损）压缩。
+
+reportlab 的 Canvas 会把所有页面保存在内存中直到 save()，这里只使用它的 TrueType 字体解析和子集化，
+页面由 PdfWriter 直接写入文件。
+"""
+import io
+import time
+import zlib
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QPainter, QFont
+from reportlab.pdfbase.ttfonts import TTFont, SUBSETN, makeToUnicodeCMap, FF_SYMBOLIC, FF_NONSYMBOLIC
+from src.processors.output_sink import OutputSink
+from src.processors.output_encoder import OutputEncoder
+from src.config.constants import APP_NAME, APP_VERSION, DEFAULT_JPEG_QUALITY, DEFAULT_PDF_COMPRESSION
+from src.utils.font_utils import font_file_data, font_pixel_size
+from src.utils.logger import logger
+
+# 支持的图片压缩方式: 名称 -> (PDF 过滤器, 显示名称)
+PDF_COMPRESSIONS = {
+    'jpeg': ('DCTDecode', 'JPEG'),
+    'flate': ('FlateDecode', 'Flate'),
+}
+
+# 页面树中每个中间节点的页数
+_PAGES_PER_NODE = 256
+
+
+def _flatten(image):
+    """把带透明通道的图片合成到白色背景上（PDF 页面的背景是白色）"""
+    if not image.hasAlphaChannel():
+        return image
+    flat = QImage(image.size(), QImage.Format.Format_RGB32)
+    flat.fill(Qt.GlobalColor.white)
+    painter = QPainter(flat)
+    painter.drawImage(0, 0, image)
+    painter.end()
+    return flat
+
+
+class PdfImageEncoder:
+    """把图片编码为 PDF 图片对象的数据：JPEG 直接嵌入 (DCTDecode)，Flate 为 zlib 压缩的 RGB 像素"""
+
+    extension = ".pdf"
+
+    def __init__(self, compression=DEFAULT_PDF_COMPRESSION, jpeg_quality=DEFAULT_JPEG_QUALITY):
+        """
+        初始化编码器
+
+        Args:
+            compression: 图片压缩方式 (jpeg/flate)
+            jpeg_quality: JPEG 质量 0–100
+        """
+        if compression not in PDF_COMPRESSIONS:
+            raise ValueError(f"不支持的 PDF 图片压缩方式: {compression}")
+        self.compression = compression
+        self.jpeg_quality = jpeg_quality
+        self._jpeg_encoder = OutputEncoder('jpeg', jpeg_quality=jpeg_quality)
+
+    @property
+    def filter_name(self):
+        """PDF 图片对象的过滤器名称"""
+        return PDF_COMPRESSIONS[self.compression][0]
+
+    def encode(self, image):
+        """
+        编码图片
+
+        Args:
+            image: 要编码的 QImage
+
+        Returns:
+            图片对象的流数据 bytes
+        """
+        image = _flatten(image)
+        if self.compression == 'jpeg':
+            return self._jpeg_encoder.encode(image)
+
+        rgb = image.convertToFormat(QImage.Format.Format_RGB888)
+        width, height, stride = rgb.width(), rgb.height(), rgb.bytesPerLine()
+        pixels = rgb.constBits().asstring(rgb.sizeInBytes())
+        if stride != width * 3:
+            # 去掉每行末尾的对齐填充
+            view = memoryview(pixels)
+            pixels = b''.join(view[y * stride:y * stride + width * 3] for y in range(height))
+        return zlib.compress(pixels, 6)
+
+    def describe(self):
+        """编码设置的简短描述"""
+        if self.compression == 'jpeg':
+            return f"JPEG 质量 {self.jpeg_quality}"
+        return "Flate 无损"
+
+    def to_dict(self):
+        """转换为字典"""
+        return {'format': 'pdf', 'compression': self.compression, 'jpeg_quality': self.jpeg_quality}
+
+
+class PdfWriter:
+    """
+    流式 PDF 写入器
+
+    对象按生成顺序直接写入文件。页面树、字体和共享资源等要到最后才能确定内容的对象
+    先预留编号供页面引用，在 finish() 中写入。
+    """
+
+    def __init__(self, file):
+        """
+        初始化写入器
+
+        Args:
+            file: 以二进制写入模式打开的文件对象
+        """
+        self._file = file
+        self._offsets = {}  # 对象编号 -> 文件中的偏移量
+        self._next_id = 1
+        self._position = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self._file.write(data)
+        self._position += len(data)
+
+    def reserve(self):
+        """预留一个对象编号"""
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def add_object(self, body, obj_id=None):
+        """
+        写入一个对象
+
+        Args:
+            body: 对象内容（PDF 语法的字符串）
+            obj_id: 预留的对象编号，默认分配新编号
+
+        Returns:
+            对象编号
+        """
+        if obj_id is None:
+            obj_id = self.reserve()
+        self._offsets[obj_id] = self._position
+        self._write(b"%d 0 obj\n%s\nendobj\n" % (obj_id, body.encode('latin-1')))
+        return obj_id
+
+    def add_stream(self, data, entries="", obj_id=None):
+        """
+        写入一个流对象
+
+        Args:
+            data: 流数据（已经按 entries 中的过滤器压缩）
+            entries: 流字典中除 Length 以外的条目
+            obj_id: 预留的对象编号，默认分配新编号
+
+        Returns:
+            对象编号
+        """
+        if obj_id is None:
+            obj_id = self.reserve()
+        self._offsets[obj_id] = self._position
+        self._write(b"%d 0 obj\n<< %s /Length %d >>\nstream\n" % (obj_id, entries.encode('latin-1'), len(data)))
+        self._write(data)
+        self._write(b"\nendstream\nendobj\n")
+        return obj_id
+
+    def finish(self, root_id, info_id):
+        """
+        写入交叉引用表和文件尾
+
+        Args:
+            root_id: 文档目录对象编号
+            info_id: 文档信息对象编号
+        """
+        xref_position = self._position
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % self._next_id)
+        for obj_id in range(1, self._next_id):
+            self._write(b"%010d 00000 n \n" % self._offsets[obj_id])
+        self._write(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (self._next_id, root_id, info_id, xref_position))
+
+
+class _TextStyle:
+    """一个文字位置的矢量绘制参数（由渲染计划条目预先计算）"""
+
+    __slots__ = ('column', 'center_x', 'baseline', 'font_index', 'size', 'color', 'alpha_name')
+
+    def __init__(self, column, center_x, baseline, font_index, size, color, alpha_name):
+        self.column = column
+        self.center_x = center_x
+        self.baseline = baseline  # 基线纵坐标（原图像素坐标，与 RenderPlan.render 相同）
+        self.font_index = font_index
+        self.size = size
+        self.color = color
+        self.alpha_name = alpha_name
+
+
+class PdfSink(OutputSink):
+    """PDF 输出目标"""
+
+    EXTENSION = ".pdf"
+    FILE_FILTER = "PDF 文档 (*.pdf)"
+
+    def __init__(self, path, compression=DEFAULT_PDF_COMPRESSION, jpeg_quality=DEFAULT_JPEG_QUALITY,
+                 dpi=None, vector_text=True):
+        """
+        初始化 PDF 输出目标
+
+        Args:
+            path: PDF 文件路径
+            compression: 底图和整页图片的压缩方式 (jpeg/flate)
+            jpeg_quality: JPEG 质量 0–100
+            dpi: 决定页面尺寸的图片分辨率，默认读取底图中记录的分辨率
+            vector_text: 是否尽量使用矢量文字（否则每页嵌入一张完整的图片）
+        """
+        super().__init__(path)
+        self.encoder = PdfImageEncoder(compression, jpeg_quality)
+        self.dpi = dpi
+        self.vector_text = vector_text
+
+        self._file = None
+        self._writer = None
+        self._fonts = []  # reportlab TTFont 列表，按字体编号
+        self._styles = []  # 各文字位置的 _TextStyle
+        self._alphas = {}  # 文字透明度 -> ExtGState 名称
+        self._nodes = []  # 页面树中间节点: [(对象编号, [页面对象编号])]
+
+    def describe(self):
+        """输出设置的简短描述"""
+        mode = "矢量文字" if self.vector_text else "整页图片"
+        return f"PDF（{mode}，{self.encoder.describe()}）"
+
+    def image_encoder(self, encoder):
+        """整页图片使用 PDF 图片编码器，忽略任务设置的图片格式"""
+        return self.encoder
+
+    def open(self, base_image, plan):
+        """打开 PDF 文件，准备矢量文字使用的字体并嵌入共享的底图"""
+        self.width = base_image.width()
+        self.height = base_image.height()
+        dpi = self.dpi or round(base_image.dotsPerMeterX() * 0.0254) or 96
+        self.scale = 72 / dpi  # 像素 -> 点
+
+        self._file = open(self.path, 'wb')
+        self._writer = PdfWriter(self._file)
+        self._catalog_id = self._writer.reserve()
+        self._pages_id = self._writer.reserve()
+        self._resources_id = self._writer.reserve()
+        self._page_matrix = b"%.6f 0 0 %.6f 0 0 cm\n" % (self.scale, self.scale)
+        self._image_matrix = b"q %d 0 0 %d 0 0 cm /%s Do Q\n"
+
+        self.draws_text = self.vector_text and self._prepare_text(plan, base_image)
+        if self.draws_text:
+            self._base_image_id = self._add_image(self.encoder.encode(base_image))
+        logger.info("PDF 输出: %s，%s，页面 %.1f x %.1f pt", self.path,
+                    "矢量文字" if self.draws_text else "整页图片",
+                    self.width * self.scale, self.height * self.scale)
+
+    def _prepare_text(self, plan, base_image):
+        """
+        为每个文字位置准备嵌入字体和绘制参数
+
+        Returns:
+            是否所有文字位置都可以使用矢量文字
+        """
+        font_indexes = {}  # QFont.key() -> 字体编号
+        dpi = base_image.logicalDpiY()
+        for entry in plan.entries:
+            font = entry.font
+            if (font.underline() or font.strikeOut() or font.overline()
+                    or font.letterSpacing() or font.wordSpacing()
+                    or font.capitalization() != QFont.Capitalization.MixedCase):
+                logger.info("PDF 使用整页图片: 字体 %s 使用了矢量文字不支持的样式", font.family())
+                return False
+
+            key = font.key()
+            if key not in font_indexes:
+                data = font_file_data(font)
+                if data is None:
+                    logger.info("PDF 使用整页图片: 无法获取字体 %s 的字体文件", font.family())
+                    return False
+                try:
+                    ttfont = TTFont(f"{APP_NAME}{len(self._fonts)}", io.BytesIO(data))
+                except Exception as e:
+                    # 如 PostScript (CFF) 轮廓的字体
+                    logger.info("PDF 使用整页图片: 无法嵌入字体 %s: %s", font.family(), e)
+                    return False
+                font_indexes[key] = len(self._fonts)
+                self._fonts.append(ttfont)
+
+            color = entry.pen.color()
+            alpha_name = None
+            if color.alpha() < 255:
+                alpha = round(color.alphaF(), 3)
+                alpha_name = self._alphas.setdefault(alpha, f"GS{len(self._alphas)}")
+
+            self._styles.append(_TextStyle(
+                column=entry.column,
+                center_x=entry.center_x,
+                baseline=int(entry.center_y + entry.text_height / 2 - entry.baseline_offset),
+                font_index=font_indexes[key],
+                size=font_pixel_size(font, dpi),
+                color=b"%.4f %.4f %.4f rg" % (color.redF(), color.greenF(), color.blueF()),
+                alpha_name=alpha_name
+            ))
+        return True
+
+    def _add_image(self, data):
+        """写入一个与底图尺寸相同的图片对象，返回对象编号"""
+        entries = (f"/Type /XObject /Subtype /Image /Width {self.width} /Height {self.height} "
+                   f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /{self.encoder.filter_name}")
+        return self._writer.add_stream(data, entries)
+
+    def _add_page(self, content, resources):
+        """
+        写入一页
+
+        Args:
+            content: 页面内容（未压缩）
+            resources: 页面资源（PDF 语法的字典或间接引用）
+        """
+        if not self._nodes or len(self._nodes[-1][1]) >= _PAGES_PER_NODE:
+            self._nodes.append((self._writer.reserve(), []))
+        node_id, kids = self._nodes[-1]
+
+        content_id = self._writer.add_stream(zlib.compress(self._page_matrix + content), "/Filter /FlateDecode")
+        page_id = self._writer.add_object(
+            f"<< /Type /Page /Parent {node_id} 0 R "
+            f"/MediaBox [0 0 {self.width * self.scale:.3f} {self.height * self.scale:.3f}] "
+            f"/Resources {resources} /Contents {content_id} 0 R >>"
+        )
+        kids.append(page_id)
+
+    def _write_row(self, index, row):
+        """用共享的底图和矢量文字写入一页；有字体中没有的字符时返回False"""
+        last_column = len(row) - 1
+        texts = []
+        for style in self._styles:
+            column = style.column if style.column < last_column else last_column
+            text = str(row[column])
+            char_to_glyph = self._fonts[style.font_index].face.charToGlyph
+            if any(ord(char) not in char_to_glyph and char != '\xa0' for char in text):
+                return False
+            texts.append(text)
+
+        content = [self._image_matrix % (self.width, self.height, b"Im0")]
+        for style, text in zip(self._styles, texts):
+            if not text:
+                continue
+            ttfont = self._fonts[style.font_index]
+            # 与 RenderPlan.render 相同：文字块在中心点处水平居中
+            x = style.center_x - ttfont.stringWidth(text, style.size) / 2
+            y = self.height - style.baseline
+
+            content.append(b"q ")
+            if style.alpha_name:
+                content.append(b"/%s gs " % style.alpha_name.encode('ascii'))
+            content.append(style.color + b" BT 1 0 0 1 %.3f %.3f Tm" % (x, y))
+            for subset, codes in ttfont.splitString(text, self):
+                content.append(b" /F%dS%d %d Tf <%s> Tj" % (style.font_index, subset, style.size,
+                                                             codes.hex().encode('ascii')))
+            content.append(b" ET Q\n")
+
+        self._add_page(b"".join(content), f"{self._resources_id} 0 R")
+        return True
+
+    def _write_image(self, index, output_path, image_data):
+        """写入一页完整的图片"""
+        image_id = self._add_image(image_data)
+        self._add_page(self._image_matrix % (self.width, self.height, b"P"),
+                       f"<< /XObject << /P {image_id} 0 R >> >>")
+
+    def _add_fonts(self):
+        """
+        写入用到的字体子集
+
+        Returns:
+            页面资源中的字体字典条目
+        """
+        fonts = []
+        for font_index, ttfont in enumerate(self._fonts):
+            state = ttfont.state.get(self)
+            if state is None:
+                continue
+            face = ttfont.face
+            for subset_index, subset in enumerate(state.subsets):
+                base_name = (SUBSETN(font_index * 1000 + subset_index) + b"+" + face.name).decode('latin-1')
+
+                font_data = face.makeSubset(subset)
+                font_file_id = self._writer.add_stream(zlib.compress(font_data),
+                                                       f"/Length1 {len(font_data)} /Filter /FlateDecode")
+                flags = (face.flags & ~FF_NONSYMBOLIC) | FF_SYMBOLIC
+                descriptor_id = self._writer.add_object(
+                    f"<< /Type /FontDescriptor /FontName /{base_name} /Flags {flags} "
+                    f"/FontBBox [{' '.join(str(value) for value in face.bbox)}] "
+                    f"/ItalicAngle {face.italicAngle} /Ascent {face.ascent} /Descent {face.descent} "
+                    f"/CapHeight {face.capHeight} /StemV {face.stemV} /MissingWidth {face.defaultWidth} "
+                    f"/FontFile2 {font_file_id} 0 R >>"
+                )
+                cmap_id = self._writer.add_stream(
+                    zlib.compress(makeToUnicodeCMap(base_name, subset).encode('latin-1')), "/Filter /FlateDecode"
+                )
+                widths = " ".join(str(face.getCharWidth(code)) for code in subset)
+                font_id = self._writer.add_object(
+                    f"<< /Type /Font /Subtype /TrueType /BaseFont /{base_name} "
+                    f"/FirstChar 0 /LastChar {len(subset) - 1} /Widths [{widths}] "
+                    f"/FontDescriptor {descriptor_id} 0 R /ToUnicode {cmap_id} 0 R >>"
+                )
+                fonts.append(f"/F{font_index}S{subset_index} {font_id} 0 R")
+            del ttfont.state[self]
+        return fonts
+
+    def _finish(self):
+        """写入字体、共享资源、页面树和文档信息，关闭文件"""
+        if self._writer is None:
+            return
+        try:
+            writer = self._writer
+            resources = ["/ProcSet [/PDF /Text /ImageC]"]
+            if self.draws_text:
+                resources.append(f"/XObject << /Im0 {self._base_image_id} 0 R >>")
+                resources.append(f"/Font << {' '.join(self._add_fonts())} >>")
+                if self._alphas:
+                    states = " ".join(f"/{name} << /Type /ExtGState /ca {alpha} >>"
+                                      for alpha, name in self._alphas.items())
+                    resources.append(f"/ExtGState << {states} >>")
+            writer.add_object(f"<< {' '.join(resources)} >>", self._resources_id)
+
+            for node_id, kids in self._nodes:
+                writer.add_object(f"<< /Type /Pages /Parent {self._pages_id} 0 R "
+                                  f"/Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>",
+                                  node_id)
+            writer.add_object(f"<< /Type /Pages /Kids [{' '.join(f'{node_id} 0 R' for node_id, _ in self._nodes)}] "
+                              f"/Count {self.page_count} >>", self._pages_id)
+            writer.add_object(f"<< /Type /Catalog /Pages {self._pages_id} 0 R >>", self._catalog_id)
+            info_id = writer.add_object(f"<< /Producer ({APP_NAME} {APP_VERSION}) "
+                                        f"/CreationDate (D:{time.strftime('%Y%m%d%H%M%S')}) >>")
+            writer.finish(self._catalog_id, info_id)
+        finally:
+            self._file.close()
+            self._writer = None
+            logger.info("PDF 已保存: %s，共 %d 页", self.path, self.page_count)
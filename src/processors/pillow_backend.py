@@ -0,0 +1,502 @@
+"""
+Pillow 渲染后端
+
+用 PIL.ImageDraw/ImageFont 绘制文字，不需要 Qt 平台插件和 QGuiApplication，
+可以在没有图形环境的容器中运行，也可以作为第二个渲染引擎与 Qt 后端对比性能。
+
+与 Qt 后端使用同一份位置模板（见 position_template.positions_to_template）：
+绝对坐标、字体、字号、颜色和居中规则相同——文字步进宽度的中点对齐中心点横坐标，
+(上升高度 + 下降高度) 的中点对齐中心点纵坐标。
+字体文件按模板中的 font_file（可选）、fontconfig、字体目录中的字体名称依次查找，
+字体对象按 (字体文件, 像素大小) 缓存，每个进程只加载一次。
+"""
+import io
+import os
+import logging
+import sys
+import shutil
+import subprocess
+import threading
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+from src.processors.sprite_cache import TextSprite
+from src.utils.logger import logger
+
+# Qt 的默认逻辑分辨率（图片中没有记录分辨率时使用）
+_DEFAULT_DPI = 96
+# QFont.Weight.DemiBold，不小于此值时使用粗体字体文件
+_BOLD_WEIGHT = 600
+# 找不到指定字体时依次尝试的字体
+_FALLBACK_FAMILIES = ("DejaVu Sans", "Liberation Sans", "Noto Sans", "Arial", "Helvetica")
+
+_FONT_FILE_EXTENSIONS = ('.ttf', '.otf', '.ttc', '.otc')
+
+# 字体目录中的字体: 小写字体名称 -> {(粗体, 斜体): 字体文件}（首次按名称查找时扫描）
+_font_index = None
+_font_index_lock = threading.Lock()
+
+
+def _font_dirs():
+    """系统和用户的字体目录"""
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        windir = os.environ.get("WINDIR", r"C:\Windows")
+        return [os.path.join(windir, "Fonts"),
+                os.path.join(os.environ.get("LOCALAPPDATA", home), "Microsoft", "Windows", "Fonts")]
+    if sys.platform == "darwin":
+        return ["/System/Library/Fonts", "/Library/Fonts", os.path.join(home, "Library", "Fonts")]
+    data_home = os.environ.get("XDG_DATA_HOME", os.path.join(home, ".local", "share"))
+    return ["/usr/share/fonts", "/usr/local/share/fonts", os.path.join(data_home, "fonts"),
+            os.path.join(home, ".fonts")]
+
+
+def parse_font_string(text):
+    """
+    解析 QFont.toString() 生成的字体描述
+
+    Args:
+        text: 字体描述，如 "Arial,40,-1,5,400,0,0,0,0,0"
+
+    Returns:
+        包含 family、point_size、pixel_size、bold、italic、underline、strike_out 的字典
+    """
+    fields = text.split(',')
+    if len(fields) < 2:
+        raise ValueError(f"无效的字体: {text}")
+
+    def field(i, default):
+        try:
+            return float(fields[i])
+        except (IndexError, ValueError):
+            return default
+
+    return {
+        'family': fields[0],
+        'point_size': field(1, -1.0),
+        'pixel_size': int(field(2, -1)),
+        'bold': field(4, 400) >= _BOLD_WEIGHT,
+        'italic': field(5, 0) != 0,
+        'underline': field(6, 0) != 0,
+        'strike_out': field(7, 0) != 0,
+    }
+
+
+def parse_color(text):
+    """
+    解析模板中的颜色
+
+    Args:
+        text: "#AARRGGBB" 或 "#RRGGBB"
+
+    Returns:
+        (R, G, B, A)
+    """
+    value = text.lstrip('#')
+    if len(value) == 6:
+        value = "ff" + value
+    if len(value) != 8:
+        raise ValueError(f"无效的颜色: {text}")
+    alpha, red, green, blue = (int(value[i:i + 2], 16) for i in range(0, 8, 2))
+    return red, green, blue, alpha
+
+
+def _scan_font_dirs():
+    """扫描字体目录，按字体名称和样式建立索引"""
+    index = {}
+    for directory in _font_dirs():
+        for root, _, files in os.walk(directory):
+            for filename in sorted(files):
+                if not filename.lower().endswith(_FONT_FILE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    family, style = ImageFont.truetype(path, 12).getname()
+                except (OSError, ValueError):
+                    continue
+                style = (style or "").lower()
+                key = ('bold' in style, 'italic' in style or 'oblique' in style)
+                index.setdefault((family or "").lower(), {}).setdefault(key, path)
+    logger.debug("字体目录中共 %d 个字体", len(index))
+    return index
+
+
+def _fontconfig_match(family, bold, italic):
+    """用 fontconfig 查找字体文件（与 Qt 在 Linux 上的字体匹配方式相同），不可用时返回None"""
+    if shutil.which("fc-match") is None:
+        return None
+    pattern = family + (":bold" if bold else "") + (":italic" if italic else "")
+    try:
+        result = subprocess.run(["fc-match", "-f", "%{file}", pattern], capture_output=True, text=True,
+                                timeout=10, check=True)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+@lru_cache(maxsize=None)
+def find_font_file(family, bold=False, italic=False):
+    """
+    查找字体名称对应的字体文件
+
+    Args:
+        family: 字体名称
+        bold: 是否粗体
+        italic: 是否斜体
+
+    Returns:
+        字体文件路径，找不到任何字体时返回None
+    """
+    path = _fontconfig_match(family, bold, italic)
+    if path:
+        return path
+
+    global _font_index
+    with _font_index_lock:
+        if _font_index is None:
+            _font_index = _scan_font_dirs()
+
+    for candidate in (family,) + _FALLBACK_FAMILIES:
+        styles = _font_index.get(candidate.lower())
+        if not styles:
+            continue
+        path = styles.get((bold, italic)) or styles.get((bold, False)) or styles.get((False, False)) \
+            or next(iter(styles.values()))
+        if candidate != family:
+            logger.warning("找不到字体 %s，使用 %s 代替", family, candidate)
+        return path
+    return None
+
+
+@lru_cache(maxsize=64)
+def load_font(path, pixel_size):
+    """
+    加载字体对象（按字体文件和像素大小缓存）
+
+    Args:
+        path: 字体文件路径，None 表示 Pillow 的内置字体
+        pixel_size: 像素大小
+
+    Returns:
+        ImageFont 对象
+    """
+    if path is None:
+        logger.warning("找不到可用的字体文件，使用 Pillow 的内置字体")
+        try:
+            return ImageFont.load_default(pixel_size)
+        except TypeError:
+            # Pillow 10.1 之前的内置字体不能指定大小
+            return ImageFont.load_default()
+    return ImageFont.truetype(path, pixel_size)
+
+
+def load_base_image(image_path):
+    """
+    加载底图为可绘制的 PIL 图片
+
+    Args:
+        image_path: 图片路径
+
+    Returns:
+        RGB 或 RGBA 模式的 PIL 图片
+    """
+    try:
+        with Image.open(image_path) as source:
+            has_alpha = source.mode in ('RGBA', 'LA', 'PA') or 'transparency' in source.info
+            image = source.convert('RGBA' if has_alpha else 'RGB')
+            image.info = dict(source.info)
+    except OSError as e:
+        raise ValueError(f"无法加载图片: {image_path}") from e
+    return image
+
+
+def probe_base_image(image_path):
+    """
+    只读取底图的文件头（尺寸和分辨率），不解码像素
+
+    Args:
+        image_path: 图片路径
+
+    Returns:
+        (1x1 的 PIL 图片（记录与底图相同的分辨率，用于构建渲染计划）, (宽, 高))
+    """
+    try:
+        with Image.open(image_path) as source:
+            size = source.size
+            dpi = source.info.get('dpi')
+    except OSError as e:
+        raise ValueError(f"无法加载图片: {image_path}") from e
+    probe = Image.new('RGB', (1, 1))
+    if dpi:
+        probe.info['dpi'] = dpi
+    return probe, size
+
+
+def image_dpi(image):
+    """图片的逻辑分辨率（与 QImage.logicalDpiY() 相同的取整方式）"""
+    dpi = image.info.get('dpi')
+    if dpi and dpi[1] > 0:
+        return round(dpi[1])
+    return _DEFAULT_DPI
+
+
+class PillowPlanEntry:
+    """渲染计划中的单个文字位置"""
+
+    __slots__ = ('column', 'center_x', 'center_y', 'font', 'fill', 'blend',
+                 'text_height', 'baseline_offset', 'margin', 'style_id')
+
+    def __init__(self, column, center_x, center_y, font, fill, style_id=0):
+        """
+        初始化文字位置
+
+        Args:
+            column: 数据列索引
+            center_x: 文字中心点横坐标（原图绝对坐标）
+            center_y: 文字中心点纵坐标（原图绝对坐标）
+            font: ImageFont 对象
+            fill: 颜色 (R, G, B, A)
+            style_id: 字体和颜色的编号，用作贴图缓存键
+        """
+        self.column = column
+        self.center_x = center_x
+        self.center_y = center_y
+        self.font = font
+        self.fill = fill
+        # 半透明的颜色需要按透明度与底图混合
+        self.blend = fill[3] < 255
+        ascent, descent = font.getmetrics()
+        self.text_height = ascent + descent
+        self.baseline_offset = descent
+        # 脏矩形的外扩边距，与 Qt 后端相同
+        self.margin = 2 + self.text_height // 8
+        self.style_id = style_id
+
+
+class PillowRenderPlan:
+    """
+    Pillow 渲染计划
+
+    由位置模板字典和底图（用于确定字号换算的分辨率）构建，接口与 RenderPlan 相同。
+    贴图为文字的覆盖率蒙版（L 模式，半透明颜色已乘入），按蒙版把颜色贴到图片上。
+    """
+
+    __slots__ = ('entries', 'sprite_cache')
+
+    def __init__(self, template, base_image, sprite_cache=None):
+        """
+        构建渲染计划
+
+        Args:
+            template: 位置模板字典，见 position_template.positions_to_template
+            base_image: 底图（PIL 图片），字号按它记录的分辨率换算为像素
+            sprite_cache: 文字贴图缓存 SpriteCache，为None时每次都直接绘制文字
+        """
+        self.sprite_cache = sprite_cache
+        dpi = image_dpi(base_image)
+        entries = []
+        styles = {}  # (字体, 颜色) -> 样式编号
+        for i, item in enumerate(template.get('positions', [])):
+            font_info = parse_font_string(item['font'])
+            if font_info['underline'] or font_info['strike_out']:
+                logger.warning("Pillow 渲染后端不支持下划线和删除线，第%d个位置将忽略", i + 1)
+
+            pixel_size = font_info['pixel_size']
+            if pixel_size <= 0:
+                pixel_size = max(1, round(font_info['point_size'] * dpi / 72))
+            path = item.get('font_file') or find_font_file(font_info['family'], font_info['bold'],
+                                                           font_info['italic'])
+            font = load_font(path, pixel_size)
+            fill = parse_color(item['color'])
+            entries.append(PillowPlanEntry(
+                column=int(item.get('index', i)),
+                center_x=int(item['x']),
+                center_y=int(item['y']),
+                font=font,
+                fill=fill,
+                style_id=styles.setdefault((path, pixel_size, fill), len(styles)),
+            ))
+            logger.debug("渲染计划: 列 %d 中心点 (%d, %d) 字体文件: %s %dpx",
+                         entries[-1].column, entries[-1].center_x, entries[-1].center_y, path, pixel_size)
+
+        self.entries = tuple(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def render(self, image, row):
+        """
+        在图片上绘制一组数据的文字
+
+        Args:
+            image: 要绘制的 PIL 图片（会被直接修改）
+            row: 一组文本数据
+
+        Returns:
+            被文字覆盖的矩形区域列表 [(左, 上, 右, 下)]（脏矩形）
+        """
+        draw = ImageDraw.Draw(image)
+        dirty_rects = []
+        last_column = len(row) - 1
+        sprite_cache = self.sprite_cache
+        for entry in self.entries:
+            try:
+                column = entry.column if entry.column < last_column else last_column
+                text = str(row[column])
+
+                sprite = None
+                if sprite_cache is not None:
+                    key = (text, entry.style_id)
+                    sprite = sprite_cache.get(key)
+                    # 第二次出现的文字才绘制贴图，只出现一次的值直接绘制
+                    if sprite is None and sprite_cache.admit(key):
+                        sprite = self._make_sprite(entry, text)
+                        sprite_cache.put(key, sprite)
+                if sprite is None and entry.blend:
+                    # ImageDraw 绘制文字时不按颜色的透明度混合，半透明的文字总是按蒙版贴到图片上
+                    sprite = self._make_sprite(entry, text)
+                if sprite is not None:
+                    x = int(entry.center_x - sprite.text_width / 2)
+                    y = int(entry.center_y + entry.text_height / 2 - entry.baseline_offset)
+                    left = x + sprite.offset_x
+                    top = y + sprite.offset_y
+                    box = (left, top, left + sprite.image.width, top + sprite.image.height)
+                    image.paste(entry.fill[:3] if image.mode == 'RGB' else entry.fill[:3] + (255,),
+                                box, sprite.image)
+                    dirty_rects.append(box)
+                    continue
+
+                # 使文字块在中心点处居中: 从基线开始绘制
+                text_width = entry.font.getlength(text)
+                x = int(entry.center_x - text_width / 2)
+                y = int(entry.center_y + entry.text_height / 2 - entry.baseline_offset)
+                draw.text((x, y), text, font=entry.font, fill=entry.fill, anchor='ls')
+
+                # 字形墨迹范围与步进范围的并集，再向外扩展边距
+                left, top, right, bottom = draw.textbbox((x, y), text, font=entry.font, anchor='ls')
+                margin = entry.margin
+                dirty_rects.append((min(left, x) - margin,
+                                    min(top, y - entry.text_height + entry.baseline_offset) - margin,
+                                    max(right, x + int(text_width)) + margin,
+                                    max(bottom, y + entry.baseline_offset) + margin))
+            except Exception as e:
+                logger.sample("paint_error", logging.ERROR, "绘制单个文字时出错: %s", e)
+                continue
+        return dirty_rects
+
+    @staticmethod
+    def measure(entry, text):
+        """
+        只测量文字、不绘制（排版预检使用，与绘制时的度量相同）
+
+        Args:
+            entry: 文字位置
+            text: 文字
+
+        Returns:
+            (步进宽度, 范围)，范围为字形墨迹范围与步进范围的并集 (左, 上, 右, 下)，相对基线原点
+        """
+        text_width = entry.font.getlength(text)
+        left, top, right, bottom = entry.font.getbbox(text, anchor='ls')
+        return text_width, (min(left, 0), min(top, entry.baseline_offset - entry.text_height),
+                            max(right, int(text_width)), max(bottom, entry.baseline_offset))
+
+    @classmethod
+    def _make_sprite(cls, entry, text):
+        """
+        把一段文字绘制为覆盖率蒙版贴图
+
+        蒙版覆盖的范围与直接绘制时的脏矩形相同，偏移为蒙版左上角相对基线原点的位置。
+
+        Args:
+            entry: 文字位置
+            text: 文字
+
+        Returns:
+            TextSprite
+        """
+        text_width, (left, top, right, bottom) = cls.measure(entry, text)
+        margin = entry.margin
+        left -= margin
+        top -= margin
+        right += margin
+        bottom += margin
+
+        mask = Image.new('L', (right - left, bottom - top), 0)
+        ImageDraw.Draw(mask).text((-left, -top), text, font=entry.font, fill=255, anchor='ls')
+        if entry.blend:
+            alpha = entry.fill[3]
+            mask = mask.point(lambda value: (value * alpha + 127) // 255)
+        return TextSprite(mask, left, top, text_width, mask.width * mask.height)
+
+
+class PillowScratchCanvas:
+    """
+    可复用的绘制画布（Pillow）
+
+    与 ScratchCanvas 相同，绘制下一行之前只把上一行文字覆盖的脏矩形从原始底图恢复。
+    """
+
+    def __init__(self, base_image):
+        """
+        初始化画布
+
+        Args:
+            base_image: 原始底图（不会被修改）
+        """
+        self.base_image = base_image
+        self.image = base_image.copy()
+        self._dirty_rects = []
+
+    def render(self, plan, row):
+        """
+        在画布上绘制一组数据的文字
+
+        返回的图片在下一次调用 render() 之前保持有效，调用方应在此之前完成编码。
+
+        Args:
+            plan: 渲染计划
+            row: 一组文本数据
+
+        Returns:
+            绘制好的 PIL 图片
+        """
+        self.restore()
+        self._dirty_rects = plan.render(self.image, row)
+        return self.image
+
+    def restore(self):
+        """把脏矩形区域从原始底图恢复"""
+        width, height = self.base_image.size
+        for left, top, right, bottom in self._dirty_rects:
+            box = (max(0, left), max(0, top), min(width, right), min(height, bottom))
+            if box[0] < box[2] and box[1] < box[3]:
+                self.image.paste(self.base_image.crop(box), box[:2])
+        self._dirty_rects = []
+
+
+def encode_image(image, encoder):
+    """
+    用 Pillow 按编码器的设置编码图片
+
+    Args:
+        image: PIL 图片
+        encoder: 输出图片编码器 OutputEncoder
+
+    Returns:
+        编码后的 bytes
+    """
+    buffer = io.BytesIO()
+    # 与 Qt 后端一样保留底图中记录的分辨率
+    options = {'dpi': image.info['dpi']} if 'dpi' in image.info else {}
+    if encoder.image_format == 'png':
+        if encoder.png_compression >= 0:
+            options['compress_level'] = min(9, encoder.png_compression)
+        image.save(buffer, 'PNG', **options)
+    elif encoder.image_format == 'jpeg':
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(buffer, 'JPEG', quality=encoder.jpeg_quality, progressive=encoder.jpeg_progressive,
+                   **options)
+    else:
+        image.save(buffer, 'WEBP', quality=encoder.webp_quality, lossless=encoder.webp_lossless)
+    return buffer.getvalue()
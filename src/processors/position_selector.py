@@ -2,19 +2,53 @@
 文字位置选择器
 """
 import os
+import math
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
                           QSpinBox, QCheckBox, QApplication, QWidget, QFontDialog, QColorDialog, QSlider, QSizePolicy)
-from PyQt6.QtGui import QPixmap, QPainter, QPen, QFont, QColor, QFontMetrics, QImage
-from PyQt6.QtCore import Qt, QPoint, pyqtSignal, QSize, QSizeF
+from PyQt6.QtGui import QPixmap, QPainter, QPen, QFont, QColor, QFontMetrics, QImage, QGuiApplication
+from PyQt6.QtCore import Qt, QPoint, QRect, QTimer, pyqtSignal, QSize, QSizeF
+from src.config.constants import PREVIEW_MAX_WIDTH, PREVIEW_MAX_HEIGHT
+from src.processors.image_canvas import ImageCanvas
+from src.processors.row_preview import OverlaySpec, RowFrameCache
+from src.processors.tile_pyramid import TilePyramid, read_scaled_image
 from src.utils.logger import logger
 
+
+class OverlayWidget(QWidget):
+    """
+    位置选择器的叠加层
+
+    只重绘需要更新的区域，内容由 PositionSelector.paint_overlay 绘制。
+    """
+
+    def __init__(self, selector, parent):
+        """
+        初始化叠加层
+
+        Args:
+            selector: 位置选择器
+            parent: 父控件（图片画布）
+        """
+        super().__init__(parent)
+        self.selector = selector
+        self.setMouseTracking(True)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WidgetAttribute.WA_NoSystemBackground)
+
+    def paintEvent(self, event):
+        """绘制需要更新的区域"""
+        painter = QPainter(self)
+        self.selector.paint_overlay(painter, event.rect())
+        painter.end()
+
+
 class PositionSelector(QDialog):
     """
     位置选择器对话框，用于在图片上选择文本位置
     """
     position_selected = pyqtSignal(list)  # 修改信号类型为list
     
-    def __init__(self, image_path, preview_texts, previous_positions=None):
+    def __init__(self, image_path, preview_texts, previous_positions=None, data=None):
         """
         初始化位置选择器
         
@@ -22,6 +56,7 @@ class PositionSelector(QDialog):
             image_path: 图片路径
             preview_texts: 预览文本列表
             previous_positions: 之前选择的位置(可选)
+            data: 数据（DataStream 或数据行列表，可选），多于一行时可以用滑块逐行预览
         """
         super().__init__()
         
@@ -59,6 +94,27 @@ class PositionSelector(QDialog):
                 self.click_positions.append(QPoint(-1, -1))  # 临时点位，稍后更新
         
         self.current_position_index = 0
+        self.current_position = None  # 鼠标处的原图坐标
+        
+        # 叠加层分为两层：已放置位置的缓存图层（位置、字体或颜色改变时重建）和鼠标处的预览文字
+        self._placed_layer = None
+        self._preview_font = None
+        self._preview_metrics = None
+        self._cursor_rect = QRect()  # 鼠标处的预览文字上一次绘制的区域
+        
+        # 鼠标移动事件按屏幕刷新间隔合并
+        self._pending_cursor = None
+        screen = QGuiApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen is not None and screen.refreshRate() > 0 else 60
+        self._move_timer = QTimer(self)
+        self._move_timer.setSingleShot(True)
+        self._move_timer.setInterval(max(1, int(1000 / refresh_rate)))
+        self._move_timer.timeout.connect(self._apply_cursor_move)
+        # 画布缩放、平移也按屏幕刷新间隔合并为一次更新
+        self._view_timer = QTimer(self)
+        self._view_timer.setSingleShot(True)
+        self._view_timer.setInterval(self._move_timer.interval())
+        self._view_timer.timeout.connect(self.update_preview)
         
         # 设置布局
         layout = QVBoxLayout()
@@ -67,36 +123,45 @@ class PositionSelector(QDialog):
         # 图片显示
         image_layout = QVBoxLayout()
         
-        # 图片标签
-        self.image_label = QLabel()
-        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.image_label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        self.image_label.setMouseTracking(True)  # 启用鼠标跟踪
-        self.image_label.mousePressEvent = self.image_mousePressEvent
-        self.image_label.mouseMoveEvent = self.image_mouseMoveEvent
+        # 按显示尺寸解码图片，原图只保留尺寸用于坐标换算
+        image, self.original_size = read_scaled_image(self.image_path,
+                                                      QSize(PREVIEW_MAX_WIDTH, PREVIEW_MAX_HEIGHT),
+                                                      allow_large=True)
+        self.pixmap = QPixmap.fromImage(image)
+        
+        # 放大时从瓦片金字塔中读取比预览图更清晰的瓦片（预览图已是原图尺寸时不需要）
+        self.pyramid = None
+        if not self.pixmap.isNull() and self.pixmap.width() < self.original_size.width():
+            preview_scale = self.pixmap.width() / self.original_size.width()
+            max_level = max(0, math.ceil(math.log2(1 / preview_scale)) - 1)
+            self.pyramid = TilePyramid(self.image_path, self.original_size, max_level)
+        
+        # 逐行预览：缓存各行的叠加层，并在后台预先绘制附近的行
+        self.row_index = 0
+        self._texts_row = 0  # preview_texts 所属的数据行（切换行后帧尚未绘制完成时与 row_index 不同）
+        self.frames = None
+        if data is not None and not self.pixmap.isNull() and len(data) > 1:
+            self.frames = RowFrameCache(data, len(self.preview_texts))
+            self.frames.frame_ready.connect(self.on_row_frame_ready)
+        
+        # 图片画布：滚轮缩放，右键拖动平移
+        self.canvas = ImageCanvas(self.pixmap, self.original_size, self.pyramid)
+        self.canvas.clicked.connect(self.on_image_clicked)
+        self.canvas.hovered.connect(self.on_image_hovered)
+        self.canvas.view_changed.connect(self.on_view_changed)
+        self.canvas.pan_finished.connect(self.on_pan_finished)
         
         # 创建叠加层用于绘制选择点和预览文本
-        self.overlay = QLabel(self.image_label)
-        self.overlay.setMouseTracking(True)
-        self.overlay.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.overlay = OverlayWidget(self, self.canvas)
         
-        image_layout.addWidget(self.image_label)
+        image_layout.addWidget(self.canvas)
         
-        # 加载图片
-        self.pixmap = QPixmap(self.image_path)
         if self.pixmap.isNull():
             logger.error(f"无法加载图片: {self.image_path}")
-            self.image_label.setText("无法加载图片")
+            self.canvas.placeholder_text = "无法加载图片"
         else:
-            logger.info(f"已加载图片: {self.image_path}")
-            self.original_size = QSize(self.pixmap.width(), self.pixmap.height())
-            
-            # 调整图片大小以适应窗口
-            if self.pixmap.width() > 700 or self.pixmap.height() > 500:
-                self.pixmap = self.pixmap.scaled(700, 500, Qt.AspectRatioMode.KeepAspectRatio)
-            
-            self.image_label.setPixmap(self.pixmap)
-            self.overlay.setGeometry(0, 0, self.image_label.width(), self.image_label.height())
+            logger.info(f"已加载图片: {self.image_path} ({self.original_size.width()} x {self.original_size.height()}，"
+                        f"预览 {self.pixmap.width()} x {self.pixmap.height()})")
             
             # 更新之前选择的位置的实际像素坐标
             if previous_positions:
@@ -113,7 +178,8 @@ class PositionSelector(QDialog):
         
         # 提示标签
         instruction_label = QLabel()
-        instruction_label.setText(f"请在图片上点击选择文本位置，共需选择{len(self.preview_texts)}个位置")
+        instruction_label.setText(f"请在图片上点击选择文本位置，共需选择{len(self.preview_texts)}个位置"
+                                  f"（滚轮缩放，右键拖动平移）")
         instruction_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         # 文本样式设置
@@ -136,11 +202,37 @@ class PositionSelector(QDialog):
         self.bold_checkbox.setChecked(self.font.bold())
         self.bold_checkbox.stateChanged.connect(self.on_bold_changed)
         
+        fit_button = QPushButton("适应窗口")
+        fit_button.clicked.connect(self.canvas.fit)
+        
         style_layout.addWidget(font_button)
         style_layout.addWidget(color_button)
         style_layout.addWidget(QLabel("大小:"))
         style_layout.addWidget(self.size_slider)
         style_layout.addWidget(self.bold_checkbox)
+        style_layout.addWidget(fit_button)
+        
+        # 数据行选择（逐行预览）
+        row_layout = None
+        if self.frames is not None:
+            row_count = self.frames.row_count
+            row_layout = QHBoxLayout()
+            
+            self.row_slider = QSlider(Qt.Orientation.Horizontal)
+            self.row_slider.setRange(1, row_count)
+            self.row_slider.setPageStep(max(1, row_count // 100))
+            
+            self.row_spinbox = QSpinBox()
+            self.row_spinbox.setRange(1, row_count)
+            
+            self.row_slider.valueChanged.connect(self.row_spinbox.setValue)
+            self.row_spinbox.valueChanged.connect(self.row_slider.setValue)
+            self.row_spinbox.valueChanged.connect(self.on_row_changed)
+            
+            row_layout.addWidget(QLabel("预览数据行:"))
+            row_layout.addWidget(self.row_slider)
+            row_layout.addWidget(self.row_spinbox)
+            row_layout.addWidget(QLabel(f"/ {row_count}"))
         
         # 底部按钮
         button_layout = QHBoxLayout()
@@ -158,6 +250,8 @@ class PositionSelector(QDialog):
         layout.addLayout(image_layout)
         layout.addWidget(instruction_label)
         layout.addLayout(style_layout)
+        if row_layout is not None:
+            layout.addLayout(row_layout)
         layout.addLayout(button_layout)
         
         # 更新预览
@@ -174,65 +268,101 @@ class PositionSelector(QDialog):
             相对位置坐标(QPoint)
         """
         if self.pixmap and not self.pixmap.isNull():
-            # 计算相对于当前显示图片的位置
-            image_rect = self.image_label.pixmap().rect()
-            image_pos = self.image_label.pos()
-            
-            # 调整位置以考虑图片在标签中的居中显示
-            offset_x = (self.image_label.width() - image_rect.width()) / 2
-            offset_y = (self.image_label.height() - image_rect.height()) / 2
-            
-            # 计算相对于图片的实际点击位置
-            relative_pos = QPoint(
-                pos.x() - offset_x,
-                pos.y() - offset_y
-            )
+            # 按画布当前的缩放和平移换算为原图坐标
+            source = self.canvas.map_to_source(pos)
             
             # 检查点击是否在图片范围内
-            if (0 <= relative_pos.x() <= image_rect.width() and
-                0 <= relative_pos.y() <= image_rect.height()):
-                
-                # 计算相对于原始图片尺寸的坐标
-                original_x = relative_pos.x() * self.original_size.width() / image_rect.width()
-                original_y = relative_pos.y() * self.original_size.height() / image_rect.height()
-                
-                return QPoint(int(original_x), int(original_y))
+            if (0 <= source.x() <= self.original_size.width() and
+                0 <= source.y() <= self.original_size.height()):
+                return QPoint(int(source.x()), int(source.y()))
         
         return QPoint(-1, -1)
     
-    def image_mousePressEvent(self, event):
+    def on_image_clicked(self, point):
         """
-        图片鼠标点击事件处理
+        图片左键点击事件处理
         
         Args:
-            event: 鼠标事件
+            point: 点击位置（画布坐标）
         """
-        if event.button() == Qt.MouseButton.LeftButton:
-            pos = self.get_relative_position(event.pos())
+        pos = self.get_relative_position(point)
+        
+        if pos.x() != -1 and self.current_position_index < len(self.preview_texts):
+            logger.info(f"选择位置 {self.current_position_index+1}/{len(self.preview_texts)}: ({pos.x()}, {pos.y()})")
             
-            if pos.x() != -1 and self.current_position_index < len(self.preview_texts):
-                logger.info(f"选择位置 {self.current_position_index+1}/{len(self.preview_texts)}: ({pos.x()}, {pos.y()})")
-                
-                # 如果已经选择了足够的位置，则替换最后一个
-                if len(self.click_positions) > self.current_position_index:
-                    self.click_positions[self.current_position_index] = pos
-                else:
-                    self.click_positions.append(pos)
-                
-                self.current_position_index += 1
-                self.update_preview()
+            # 如果已经选择了足够的位置，则替换最后一个
+            if len(self.click_positions) > self.current_position_index:
+                self.click_positions[self.current_position_index] = pos
+            else:
+                self.click_positions.append(pos)
+            
+            self.current_position_index += 1
+            self.update_preview()
     
-    def image_mouseMoveEvent(self, event):
+    def on_row_changed(self, value):
+        """
+        预览数据行改变：已缓存的行立即显示，否则等待后台绘制完成后显示
+
+        Args:
+            value: 行号（从1开始）
+        """
+        self.row_index = value - 1
+        frame = self.frames.get(self.row_index)
+        if frame is not None:
+            self._show_row_frame(self.row_index, *frame)
+        self.frames.request(self.row_index)
+    
+    def on_row_frame_ready(self, row):
+        """后台绘制完一行的叠加层，是当前行时显示"""
+        if row == self.row_index:
+            frame = self.frames.get(row)
+            if frame is not None:
+                self._show_row_frame(row, *frame)
+    
+    def _show_row_frame(self, row, layer, texts):
+        """
+        显示某一行的叠加层，鼠标处的预览文字也换成该行的文字
+
+        拖动平移期间缓存的帧仍按拖动前的视图绘制，只使用其中的文字，图层按当前视图重建。
+
+        Args:
+            row: 行号
+            layer: 已放置位置的图层 QPixmap
+            texts: 该行各位置的预览文字
+        """
+        self._texts_row = row
+        self.preview_texts = texts
+        self._placed_layer = None if self.canvas.is_panning() else layer
+        self._cursor_rect = self._cursor_text_rect()
+        self.overlay.update()
+    
+    def on_image_hovered(self, point):
         """
         图片鼠标移动事件处理
-        
+
+        只记录最新的鼠标位置，按屏幕刷新间隔合并为一次重绘。
+
         Args:
-            event: 鼠标事件
+            point: 鼠标位置（画布坐标）
         """
         if self.current_position_index < len(self.preview_texts):
-            self.current_position = self.get_relative_position(event.pos())
-            self.update_preview()
-    
+            self._pending_cursor = point
+            if not self._move_timer.isActive():
+                self._move_timer.start()
+
+    def _apply_cursor_move(self):
+        """应用合并后的鼠标位置，只重绘旧的和新的预览文字区域"""
+        if self._pending_cursor is None:
+            return
+        self.current_position = self.get_relative_position(self._pending_cursor)
+        self._pending_cursor = None
+
+        old_rect = self._cursor_rect
+        self._cursor_rect = self._cursor_text_rect()
+        if old_rect != self._cursor_rect:
+            self.overlay.update(old_rect)
+            self.overlay.update(self._cursor_rect)
+
     def select_font(self):
         """字体选择对话框"""
         font, ok = QFontDialog.getFont(self.font, self)
@@ -261,89 +391,140 @@ class PositionSelector(QDialog):
         self.font.setBold(state == Qt.CheckState.Checked)
         self.update_preview()
     
+    def on_view_changed(self):
+        """画布缩放、平移或大小改变：按屏幕刷新间隔合并为一次预览更新（大小改变时立即更新）"""
+        if self.overlay.size() != self.canvas.size():
+            self.update_preview()
+        elif not self._view_timer.isActive():
+            self._view_timer.start()
+
+    def on_pan_finished(self):
+        """拖动平移结束：按最终的视图更新一次预览（逐行预览的缓存帧在此时才作废）"""
+        self._view_timer.stop()
+        self.update_preview()
+
     def update_preview(self):
-        """更新预览图像，显示所有选择的位置和预览文本"""
-        if self.pixmap.isNull():
-            return
-        
-        # 创建透明叠加层
-        overlay_pixmap = QPixmap(self.image_label.size())
-        overlay_pixmap.fill(Qt.GlobalColor.transparent)
-        
-        painter = QPainter()
-        painter.begin(overlay_pixmap)
-        
-        # 获取图片在标签中的显示区域
-        image_rect = self.image_label.pixmap().rect()
-        label_size = self.image_label.size()
-        
-        # 计算图片在标签中的偏移和缩放比例
-        offset_x = (label_size.width() - image_rect.width()) / 2
-        offset_y = (label_size.height() - image_rect.height()) / 2
-        
-        scale_x = image_rect.width() / self.original_size.width()
-        scale_y = image_rect.height() / self.original_size.height()
-        
-        # 计算预览缩放后的字体大小
-        preview_point_size_f = self.font.pointSizeF() * scale_y
-        
-        preview_font = QFont(self.font) # 复制其他字体属性
-        preview_font.setPointSizeF(preview_point_size_f) # 设置缩放后的预览点数
+        """
+        位置、字体或颜色改变后更新预览
+
+        已放置位置的图层在下一次绘制时重建，鼠标处的预览文字随之更新。
+        画布缩放、平移或大小改变后也会调用（按屏幕刷新间隔合并）；
+        拖动平移期间只重建当前的图层，保留逐行预览已缓存的帧，拖动结束后再统一重建。
+        """
+        self._view_timer.stop()
+        if self.overlay.size() != self.canvas.size():
+            self.overlay.setGeometry(self.canvas.rect())
+        self._placed_layer = None
+        self._preview_font = None
+        if self.frames is not None and not self.canvas.is_panning():
+            # 旧参数绘制的帧立即作废，避免之后才绘制完成的帧按旧的位置显示；
+            # 作废时尚未绘制的请求一并清空，按新参数重新请求当前行及附近的行
+            self.frames.set_spec(self._overlay_spec())
+            self.frames.request(self.row_index)
+        self._cursor_rect = self._cursor_text_rect()
+        self.overlay.update()
+
+    def _display_transform(self):
+        """
+        获取原图坐标到画布坐标的变换
+
+        Returns:
+            (横向偏移, 纵向偏移, 横向缩放, 纵向缩放)
+        """
+        origin = self.canvas.origin()
+        return origin.x(), origin.y(), self.canvas.zoom, self.canvas.zoom
+
+    def _get_preview_font(self):
+        """按预览缩放比例换算字号后的字体及其度量（字体改变前只计算一次）"""
+        if self._preview_font is None:
+            scale_y = self._display_transform()[3]
+            preview_font = QFont(self.font)  # 复制其他字体属性
+            preview_font.setPointSizeF(self.font.pointSizeF() * scale_y)  # 设置缩放后的预览点数
+            self._preview_font = preview_font
+            self._preview_metrics = QFontMetrics(preview_font, self.overlay)
+        return self._preview_font, self._preview_metrics
+
+    def _text_origin(self, text, pos):
+        """
+        计算预览文字在画布中的基线起点，使文字居中于原图坐标 pos 对应的显示位置
+
+        Returns:
+            (x, y) 整数坐标
+        """
+        offset_x, offset_y, scale_x, scale_y = self._display_transform()
+        metrics = self._get_preview_font()[1]
+
+        display_x = pos.x() * scale_x + offset_x
+        display_y = pos.y() * scale_y + offset_y
+        text_width = metrics.horizontalAdvance(text)
+        # 使用基线偏移进行更精确的垂直居中
+        x = display_x - text_width / 2
+        y = display_y + metrics.height() / 2 - metrics.descent()
+        return int(x), int(y)
+
+    def _cursor_text_rect(self):
+        """鼠标处的预览文字在叠加层中覆盖的区域（没有预览文字时为空）"""
+        if (self.pixmap.isNull() or self.current_position is None or self.current_position.x() == -1
+                or self.current_position_index >= len(self.preview_texts)):
+            return QRect()
 
-        # --- 使用缩放后的字体绘制预览 --- 
-        painter.setFont(preview_font)
-        painter.setPen(self.color)
+        text = self.preview_texts[self.current_position_index]
+        x, y = self._text_origin(text, self.current_position)
+        metrics = self._get_preview_font()[1]
+        rect = metrics.boundingRect(text).translated(x, y)
+        rect = rect.united(QRect(x, y - metrics.ascent(), metrics.horizontalAdvance(text), metrics.height()))
+        # 外扩边距，覆盖抗锯齿的像素
+        margin = 2 + metrics.height() // 8
+        return rect.adjusted(-margin, -margin, margin, margin)
 
-        # --- 绘制已选择的位置 ---
+    def _overlay_spec(self):
+        """当前已放置位置的叠加层绘制参数"""
+        offset_x, offset_y, scale_x, scale_y = self._display_transform()
+        centers = []
         for i, pos in enumerate(self.click_positions):
-            if i < len(self.preview_texts):
-                text_to_draw = self.preview_texts[i]
-                
-                # 计算文字在显示区域的中心点坐标 (display_x, display_y)
-                display_x = pos.x() * scale_x + offset_x
-                display_y = pos.y() * scale_y + offset_y
-                
-                # 使用缩放后的字体计算度量
-                metrics = painter.fontMetrics()
-                text_width = metrics.horizontalAdvance(text_to_draw)
-                text_height = metrics.height()
-                # 使用基线偏移进行更精确的垂直居中
-                baseline_offset = metrics.descent()
-                
-                # 计算绘制的左上角坐标 (x, y)，使文字居中于 (display_x, display_y)
-                x = display_x - text_width / 2
-                y = display_y + text_height / 2 - baseline_offset
-                
-                painter.drawText(int(x), int(y), text_to_draw)
-        
-        # --- 绘制当前鼠标悬停位置的预览 (如果还在选择中) ---
-        if hasattr(self, 'current_position') and self.current_position_index < len(self.preview_texts):
-            current_text = self.preview_texts[self.current_position_index]
-            
-            # 计算当前鼠标位置对应的显示中心点坐标
-            cursor_display_x = self.current_position.x() * scale_x + offset_x
-            cursor_display_y = self.current_position.y() * scale_y + offset_y
-            
-            # 使用缩放后的字体计算度量 (如果上面设置了，这里无需重复设置 font)
-            metrics = painter.fontMetrics()
-            text_width = metrics.horizontalAdvance(current_text)
-            text_height = metrics.height()
-            baseline_offset = metrics.descent()
-            
-            # 计算绘制的左上角坐标
-            x = cursor_display_x - text_width / 2
-            y = cursor_display_y + text_height / 2 - baseline_offset
+            if i < len(self.preview_texts) and pos.x() != -1:
+                centers.append((i, pos.x() * scale_x + offset_x, pos.y() * scale_y + offset_y))
+        dpi = (self.overlay.logicalDpiX(), self.overlay.logicalDpiY())
+        return OverlaySpec(self.overlay.size(), dpi, self._get_preview_font()[0], self.color, centers)
 
-            painter.drawText(int(x), int(y), current_text)
+    def _rebuild_placed_layer(self):
+        """重建已放置位置的图层，逐行预览时同时缓存为当前行的帧并在后台绘制附近的行"""
+        spec = self._overlay_spec()
+        self._placed_layer = QPixmap.fromImage(spec.render(self.preview_texts))
+        if self.frames is not None and not self.canvas.is_panning():
+            self.frames.set_spec(spec)
+            # 当前行的帧尚未绘制完成时显示的仍是之前一行的文字，不能缓存为当前行
+            if self._texts_row == self.row_index:
+                self.frames.put(self.row_index, self._placed_layer, self.preview_texts)
+            self.frames.request(self.row_index)
 
-        painter.end()
-        self.overlay.setPixmap(overlay_pixmap)
-    
-    def resizeEvent(self, event):
-        """窗口大小改变事件"""
-        super().resizeEvent(event)
-        self.overlay.setGeometry(0, 0, self.image_label.width(), self.image_label.height())
-        self.update_preview()
+    def paint_overlay(self, painter, rect):
+        """
+        绘制叠加层中需要重绘的区域：已放置位置的缓存图层 + 鼠标处的预览文字
+
+        Args:
+            painter: 叠加层的 QPainter
+            rect: 需要重绘的区域
+        """
+        if self.pixmap.isNull():
+            return
+        if self._placed_layer is None or self._placed_layer.size() != self.overlay.size():
+            self._rebuild_placed_layer()
+        painter.drawPixmap(rect, self._placed_layer, rect)
+
+        if not self._cursor_rect.isEmpty() and self._cursor_rect.intersects(rect):
+            text = self.preview_texts[self.current_position_index]
+            painter.setFont(self._get_preview_font()[0])
+            painter.setPen(self.color)
+            painter.drawText(*self._text_origin(text, self.current_position), text)
+
+    def done(self, result):
+        """关闭对话框时停止瓦片解码和逐行预览的后台线程"""
+        if self.pyramid is not None:
+            self.pyramid.close()
+        if self.frames is not None:
+            self.frames.close()
+        super().done(result)
     
     def accept(self):
         """确定按钮点击事件"""
@@ -0,0 +1,119 @@
+"""
+文字位置模板的保存与加载
+"""
+import json
+from PyQt6.QtCore import QPoint
+from PyQt6.QtGui import QFont, QColor
+from src.utils.logger import logger
+
+# 模板文件格式版本
+TEMPLATE_VERSION = 1
+
+
+def positions_to_template(text_positions, image_size=None):
+    """
+    把 PositionSelector 生成的位置信息转换为可序列化的模板字典
+
+    Args:
+        text_positions: 文字位置信息列表
+        image_size: 原始图片尺寸 (宽, 高)，可选
+
+    Returns:
+        模板字典
+    """
+    positions = []
+    for pos_info in text_positions:
+        position = pos_info['position']
+        font = QFont(pos_info['font'])
+        color = QColor(pos_info['color'])
+        positions.append({
+            'x': position.x(),
+            'y': position.y(),
+            'index': pos_info.get('index', 0),
+            'text': pos_info.get('text', ''),
+            'font': font.toString(),
+            'color': color.name(QColor.NameFormat.HexArgb),
+            'relative_x': pos_info.get('relative_x'),
+            'relative_y': pos_info.get('relative_y'),
+        })
+
+    template = {'version': TEMPLATE_VERSION, 'positions': positions}
+    if image_size:
+        template['image_size'] = [int(image_size[0]), int(image_size[1])]
+    return template
+
+
+def template_to_positions(template):
+    """
+    把模板字典还原为 ImageTextProcessor 使用的位置信息列表
+
+    Args:
+        template: 模板字典
+
+    Returns:
+        文字位置信息列表
+    """
+    if template.get('version', TEMPLATE_VERSION) > TEMPLATE_VERSION:
+        raise ValueError(f"不支持的模板版本: {template.get('version')}")
+
+    image_size = template.get('image_size')
+    text_positions = []
+    for i, item in enumerate(template.get('positions', [])):
+        font = QFont()
+        if not font.fromString(item['font']):
+            raise ValueError(f"第{i+1}个位置的字体无效: {item['font']}")
+        color = QColor(item['color'])
+        if not color.isValid():
+            raise ValueError(f"第{i+1}个位置的颜色无效: {item['color']}")
+
+        x = int(item['x'])
+        y = int(item['y'])
+        relative_x = item.get('relative_x')
+        relative_y = item.get('relative_y')
+        if relative_x is None and image_size:
+            relative_x = x / image_size[0]
+        if relative_y is None and image_size:
+            relative_y = y / image_size[1]
+
+        text_positions.append({
+            'position': QPoint(x, y),
+            'text': item.get('text', ''),
+            'font': font,
+            'color': color,
+            'index': int(item.get('index', i)),
+            'relative_x': relative_x if relative_x is not None else 0.5,
+            'relative_y': relative_y if relative_y is not None else 0.5,
+        })
+    return text_positions
+
+
+def save_template(file_path, text_positions, image_size=None):
+    """
+    保存位置模板到JSON文件
+
+    Args:
+        file_path: 模板文件路径
+        text_positions: 文字位置信息列表
+        image_size: 原始图片尺寸 (宽, 高)，可选
+    """
+    template = positions_to_template(text_positions, image_size)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(template, f, ensure_ascii=False, indent=2)
+    logger.info("已保存位置模板: %s", file_path)
+
+
+def load_template(file_path):
+    """
+    从JSON文件加载位置模板
+
+    Args:
+        file_path: 模板文件路径
+
+    Returns:
+        文字位置信息列表
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        template = json.load(f)
+    text_positions = template_to_positions(template)
+    logger.info("已加载位置模板: %s，共 %d 个位置", file_path, len(text_positions))
+    return text_positions
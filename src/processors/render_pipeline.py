@@ -0,0 +1,283 @@
+"""
+分阶段渲染流水线
+
+把逐行的 绘制 → 编码 → 写入 拆分为三个阶段：
+一个绘制线程、若干编码线程和一个写入线程，阶段之间用有界队列连接。
+队列和画布池的容量限制了在途图片数量，下游变慢时上游会被阻塞（背压），内存占用保持平稳。
+"""
+import os
+import queue
+import logging
+import threading
+import time
+from src.processors.render_plan import ScratchCanvas
+from src.utils.logger import logger
+
+# 队列结束标记
+_SENTINEL = object()
+
+
+def default_encoder_count():
+    """默认编码线程数"""
+    return max(1, min(4, (os.cpu_count() or 1) - 1))
+
+
+def write_file(index, output_path, image_data):
+    """
+    默认的写入函数：把编码后的图片数据写入文件
+
+    Args:
+        index: 行号
+        output_path: 输出文件路径
+        image_data: 编码后的图片数据
+    """
+    with open(output_path, 'wb') as f:
+        f.write(image_data)
+
+
+class StageStats:
+    """单个流水线阶段的统计信息"""
+
+    def __init__(self, name, threads=1):
+        """
+        初始化统计信息
+
+        Args:
+            name: 阶段名称
+            threads: 阶段的线程数
+        """
+        self.name = name
+        self.threads = threads
+        self.items = 0
+        self.busy_time = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, busy_time):
+        """记录处理完一项所用的时间（线程安全）"""
+        with self._lock:
+            self.items += 1
+            self.busy_time += busy_time
+
+    def to_dict(self, wall_time):
+        """
+        转换为字典
+
+        Args:
+            wall_time: 流水线总运行时间（秒）
+
+        Returns:
+            包含处理数量、忙碌时间和利用率的字典
+        """
+        capacity = wall_time * self.threads
+        return {
+            'threads': self.threads,
+            'items': self.items,
+            'busy_seconds': round(self.busy_time, 4),
+            'utilization': round(self.busy_time / capacity, 4) if capacity > 0 else 0.0,
+        }
+
+
+class _Job:
+    """在阶段之间传递的单行任务"""
+
+    __slots__ = ('index', 'output_path', 'image', 'canvas', 'data', 'start')
+
+    def __init__(self, index, output_path):
+        self.index = index
+        self.output_path = output_path
+        self.start = 0.0
+        self.image = None
+        self.canvas = None
+        self.data = None
+
+
+class RenderPipeline:
+    """分阶段渲染流水线"""
+
+    def __init__(self, base_image, plan, encode, write=write_file,
+                 encoder_threads=None, queue_size=8, reuse_canvas=True, metrics=None,
+                 canvas_class=ScratchCanvas):
+        """
+        初始化流水线
+
+        Args:
+            base_image: 原始底图
+            plan: 渲染计划
+            encode: 编码函数，参数为 QImage，返回 bytes
+            write: 写入函数，参数为 (行号, 输出路径, 图片数据)
+            encoder_threads: 编码线程数，默认根据CPU核心数计算
+            queue_size: 编码结果队列的容量
+            reuse_canvas: 是否复用画布（只恢复脏矩形）
+            metrics: 性能统计对象 JobMetrics，为None时不记录耗时分布
+            canvas_class: 可复用画布的类，与渲染计划属于同一个渲染后端
+        """
+        self.base_image = base_image
+        self.plan = plan
+        self.encode = encode
+        self.write = write
+        self.encoder_threads = max(1, encoder_threads or default_encoder_count())
+        self.queue_size = max(1, queue_size)
+        self.reuse_canvas = reuse_canvas
+        self.metrics = metrics
+        self.canvas_class = canvas_class
+
+        self.stages = {
+            'render': StageStats('render'),
+            'encode': StageStats('encode', self.encoder_threads),
+            'write': StageStats('write'),
+        }
+        self.wall_time = 0.0
+
+    def stats(self):
+        """
+        获取各阶段的统计信息
+
+        Returns:
+            {阶段名称: {threads, items, busy_seconds, utilization}}
+        """
+        return {name: stage.to_dict(self.wall_time) for name, stage in self.stages.items()}
+
+    def log_stats(self):
+        """把各阶段利用率写入日志"""
+        for name, info in self.stats().items():
+            logger.info("流水线阶段 %s: %d 项，忙碌 %.2fs，利用率 %.0f%% (%d 线程)",
+                        name, info['items'], info['busy_seconds'], info['utilization'] * 100, info['threads'])
+
+    def run(self, jobs, wait_if_paused=None):
+        """
+        运行流水线，按完成顺序逐行返回结果
+
+        关闭生成器时会停止绘制新的行，已在途的行会继续完成编码和写入。
+
+        Args:
+            jobs: 可迭代的 (行号, 数据行, 输出路径)
+            wait_if_paused: 每绘制一行前调用，返回True表示取消
+
+        Yields:
+            (行号, 是否写入成功)
+        """
+        stop_event = threading.Event()
+        encode_queue = queue.Queue(maxsize=self.encoder_threads)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue()
+        errors = []
+
+        # 画布池：每张画布同时只属于一个在途任务，池的容量就是在途图片的上限
+        canvas_pool = None
+        if self.reuse_canvas:
+            canvas_pool = queue.Queue()
+            for _ in range(self.encoder_threads + 1):
+                canvas_pool.put(self.canvas_class(self.base_image))
+
+        metrics = self.metrics
+
+        def render_stage():
+            try:
+                for index, row, output_path in jobs:
+                    if stop_event.is_set() or (wait_if_paused and wait_if_paused()):
+                        break
+
+                    job = _Job(index, output_path)
+                    if canvas_pool is not None:
+                        job.canvas = canvas_pool.get()
+
+                    start = time.perf_counter()
+                    try:
+                        if job.canvas is not None:
+                            job.image = job.canvas.render(self.plan, row)
+                        else:
+                            job.image = self.base_image.copy()
+                            self.plan.render(job.image, row)
+                    except Exception as e:
+                        logger.sample("row_error", logging.ERROR, "处理数据行 %d 时出错: %s", index + 1, e)
+                        if job.canvas is not None:
+                            canvas_pool.put(job.canvas)
+                        result_queue.put((index, False))
+                        continue
+                    elapsed = time.perf_counter() - start
+                    self.stages['render'].add(elapsed)
+                    if metrics is not None:
+                        job.start = start
+                        metrics.record('paint', elapsed)
+
+                    encode_queue.put(job)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                for _ in range(self.encoder_threads):
+                    encode_queue.put(_SENTINEL)
+
+        def encode_stage():
+            while True:
+                job = encode_queue.get()
+                if job is _SENTINEL:
+                    write_queue.put(_SENTINEL)
+                    return
+
+                start = time.perf_counter()
+                try:
+                    job.data = self.encode(job.image)
+                except Exception as e:
+                    logger.sample("encode_error", logging.ERROR, "编码数据行 %d 时出错: %s", job.index + 1, e)
+                    result_queue.put((job.index, False))
+                    continue
+                finally:
+                    job.image = None
+                    if job.canvas is not None:
+                        canvas_pool.put(job.canvas)
+                        job.canvas = None
+                elapsed = time.perf_counter() - start
+                self.stages['encode'].add(elapsed)
+                if metrics is not None:
+                    metrics.record('encode', elapsed)
+
+                write_queue.put(job)
+
+        def write_stage():
+            remaining_encoders = self.encoder_threads
+            while remaining_encoders:
+                job = write_queue.get()
+                if job is _SENTINEL:
+                    remaining_encoders -= 1
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    self.write(job.index, job.output_path, job.data)
+                    success = True
+                    logger.sample("saved", logging.DEBUG, "已保存: %s", job.output_path)
+                except Exception as e:
+                    logger.sample("write_error", logging.ERROR, "保存失败: %s: %s", job.output_path, e)
+                    success = False
+                end = time.perf_counter()
+                self.stages['write'].add(end - start)
+                if metrics is not None:
+                    metrics.record('write', end - start)
+                    if success:
+                        metrics.record_image(end - job.start)
+                result_queue.put((job.index, success))
+            result_queue.put(_SENTINEL)
+
+        threads = [threading.Thread(target=render_stage, name="snaptext-render", daemon=True)]
+        threads += [threading.Thread(target=encode_stage, name=f"snaptext-encode-{i}", daemon=True)
+                    for i in range(self.encoder_threads)]
+        threads.append(threading.Thread(target=write_stage, name="snaptext-write", daemon=True))
+
+        start_time = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                result = result_queue.get()
+                if result is _SENTINEL:
+                    break
+                yield result
+        finally:
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+            self.wall_time = time.perf_counter() - start_time
+
+        if errors:
+            raise errors[0]
@@ -0,0 +1,272 @@
+"""
+渲染计划
+
+每个生成任务只根据 PositionSelector 生成的文字位置信息构建一次渲染计划，
+预先解析好字体、画笔、字体度量和数据列索引，逐行绘制时只需测量字符串宽度并绘制。
+使用文字贴图缓存时，重复的文字直接贴上缓存的贴图，不再重新排版和光栅化。
+"""
+import logging
+from PyQt6.QtCore import Qt, QRect
+from PyQt6.QtGui import QPainter, QFont, QColor, QPen, QFontMetrics, QImage
+from src.processors.sprite_cache import TextSprite
+from src.utils.logger import logger
+
+
+class PlanEntry:
+    """渲染计划中的单个文字位置（不可变）"""
+
+    __slots__ = ('column', 'center_x', 'center_y', 'font', 'pen', 'metrics',
+                 'text_height', 'baseline_offset', 'ascent', 'margin', 'style_id')
+
+    def __init__(self, column, center_x, center_y, font, pen, metrics, style_id=0):
+        """
+        初始化文字位置
+
+        Args:
+            column: 数据列索引
+            center_x: 文字中心点横坐标（原图绝对坐标）
+            center_y: 文字中心点纵坐标（原图绝对坐标）
+            font: 字体
+            pen: 画笔
+            metrics: 字体度量（基于输出图片的绘制设备）
+            style_id: 字体和颜色的编号（字体和颜色都相同的位置编号相同），
+                      绘制时编号与上一次绘制不同才切换字体和画笔，也用作贴图缓存键
+        """
+        setter = object.__setattr__
+        setter(self, 'column', column)
+        setter(self, 'center_x', center_x)
+        setter(self, 'center_y', center_y)
+        setter(self, 'font', font)
+        setter(self, 'pen', pen)
+        setter(self, 'metrics', metrics)
+        # 文字高度和基线偏移与文本内容无关，预先计算
+        setter(self, 'text_height', metrics.height())
+        setter(self, 'baseline_offset', metrics.descent())
+        setter(self, 'ascent', metrics.ascent())
+        # 脏矩形的外扩边距，覆盖抗锯齿和斜体等超出字形边界的像素
+        setter(self, 'margin', 2 + metrics.height() // 8)
+        setter(self, 'style_id', style_id)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 是不可变对象")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} 是不可变对象")
+
+
+class RenderPlan:
+    """
+    渲染计划
+
+    由文字位置信息和输出图片（用于确定字体度量的绘制设备）构建。
+    """
+
+    __slots__ = ('entries', 'sprite_cache', '_dots_per_meter')
+
+    def __init__(self, text_positions, paint_device, sprite_cache=None):
+        """
+        构建渲染计划
+
+        Args:
+            text_positions: 文字位置信息列表
+            paint_device: 输出图片（通常是底图），字体度量基于它的分辨率计算
+            sprite_cache: 文字贴图缓存 SpriteCache，为None时每次都直接绘制文字
+        """
+        self.sprite_cache = sprite_cache
+        # 贴图与输出图片使用相同的分辨率，字号换算为相同的像素大小
+        self._dots_per_meter = (paint_device.dotsPerMeterX(), paint_device.dotsPerMeterY())
+
+        entries = []
+        styles = {}  # (字体, 颜色) -> 样式编号
+        for pos_info in text_positions:
+            # 使用 PositionSelector 传来的原始 QFont (包含绝对点数)
+            font = QFont(pos_info['font'])
+            color = QColor(pos_info['color'])
+            position = pos_info['position']
+
+            style_id = styles.setdefault((font.key(), color.rgba()), len(styles))
+
+            entries.append(PlanEntry(
+                column=pos_info.get('index', 0),
+                center_x=position.x(),
+                center_y=position.y(),
+                font=font,
+                pen=QPen(color),
+                metrics=QFontMetrics(font, paint_device),
+                style_id=style_id
+            ))
+            logger.debug("渲染计划: 列 %d 中心点 (%d, %d) Font: %s %dpt",
+                         entries[-1].column, position.x(), position.y(), font.family(), font.pointSize())
+
+        self.entries = tuple(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def render(self, image, row):
+        """
+        在图片上绘制一组数据的文字
+
+        Args:
+            image: 要绘制的 QImage（会被直接修改）
+            row: 一组文本数据
+
+        Returns:
+            被文字覆盖的矩形区域列表（脏矩形）
+        """
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+
+        dirty_rects = []
+        last_column = len(row) - 1
+        sprite_cache = self.sprite_cache
+        current_style = None
+        for entry in self.entries:
+            try:
+                # 确保索引在数据范围内
+                column = entry.column if entry.column < last_column else last_column
+                text = str(row[column])  # 确保转换为字符串
+
+                if sprite_cache is not None:
+                    key = (text, entry.style_id)
+                    sprite = sprite_cache.get(key)
+                    # 第二次出现的文字才绘制贴图，只出现一次的值（姓名、编号等）直接绘制
+                    if sprite is None and sprite_cache.admit(key):
+                        sprite = self._make_sprite(entry, text)
+                        sprite_cache.put(key, sprite)
+                    if sprite is not None:
+                        # 与直接绘制相同的居中规则，贴图按基线原点的偏移放置
+                        x = int(entry.center_x - sprite.text_width / 2)
+                        y = int(entry.center_y + entry.text_height / 2 - entry.baseline_offset)
+                        left = x + sprite.offset_x
+                        top = y + sprite.offset_y
+                        painter.drawImage(left, top, sprite.image)
+                        dirty_rects.append(QRect(left, top, sprite.image.width(), sprite.image.height()))
+                        continue
+
+                if entry.style_id != current_style:
+                    painter.setFont(entry.font)
+                    painter.setPen(entry.pen)
+                    current_style = entry.style_id
+
+                # 使文字块在中心点处居中: drawText 从基线开始绘制
+                text_width = entry.metrics.horizontalAdvance(text)
+                x = int(entry.center_x - text_width / 2)
+                y = int(entry.center_y + entry.text_height / 2 - entry.baseline_offset)
+                painter.drawText(x, y, text)
+
+                # 字形墨迹范围与步进范围的并集，再向外扩展边距
+                rect = entry.metrics.boundingRect(text).translated(x, y)
+                rect = rect.united(QRect(x, y - entry.ascent, text_width, entry.text_height))
+                margin = entry.margin
+                dirty_rects.append(rect.adjusted(-margin, -margin, margin, margin))
+
+            except Exception as e:
+                logger.sample("paint_error", logging.ERROR, "绘制单个文字时出错: %s", e)
+                continue
+
+        painter.end()
+        return dirty_rects
+
+    @staticmethod
+    def measure(entry, text):
+        """
+        只测量文字、不绘制（排版预检使用，与绘制时的度量相同）
+
+        Args:
+            entry: 文字位置
+            text: 文字
+
+        Returns:
+            (步进宽度, 范围)，范围为字形墨迹范围与步进范围的并集 (左, 上, 右, 下)，相对基线原点
+        """
+        text_width = entry.metrics.horizontalAdvance(text)
+        rect = entry.metrics.boundingRect(text).united(QRect(0, -entry.ascent, text_width, entry.text_height))
+        return text_width, (rect.x(), rect.y(), rect.x() + rect.width(), rect.y() + rect.height())
+
+    def _make_sprite(self, entry, text):
+        """
+        把一段文字绘制为透明背景的贴图
+
+        贴图覆盖字形墨迹范围与步进范围的并集并向外扩展边距（与直接绘制时的脏矩形相同），
+        偏移为贴图左上角相对基线原点的位置。
+
+        Args:
+            entry: 文字位置
+            text: 文字
+
+        Returns:
+            TextSprite
+        """
+        text_width, (left, top, right, bottom) = self.measure(entry, text)
+        rect = QRect(left, top, right - left, bottom - top)
+        margin = entry.margin
+        rect = rect.adjusted(-margin, -margin, margin, margin)
+
+        image = QImage(rect.size(), QImage.Format.Format_ARGB32_Premultiplied)
+        image.setDotsPerMeterX(self._dots_per_meter[0])
+        image.setDotsPerMeterY(self._dots_per_meter[1])
+        image.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing, True)
+        painter.setFont(entry.font)
+        painter.setPen(entry.pen)
+        painter.drawText(-rect.x(), -rect.y(), text)
+        painter.end()
+        return TextSprite(image, rect.x(), rect.y(), text_width, image.sizeInBytes())
+
+
+class ScratchCanvas:
+    """
+    可复用的绘制画布
+
+    每个工作线程/进程只保留一张画布，绘制下一行之前只把上一行文字覆盖的
+    脏矩形从原始底图恢复，避免每行都完整复制一次底图。
+    """
+
+    def __init__(self, base_image):
+        """
+        初始化画布
+
+        Args:
+            base_image: 原始底图（不会被修改）
+        """
+        self.base_image = base_image
+        self.image = base_image.copy()
+        self._bounds = base_image.rect()
+        self._dirty_rects = []
+
+    def render(self, plan, row):
+        """
+        在画布上绘制一组数据的文字
+
+        返回的图片在下一次调用 render() 之前保持有效，调用方应在此之前完成编码。
+
+        Args:
+            plan: 渲染计划
+            row: 一组文本数据
+
+        Returns:
+            绘制好的 QImage
+        """
+        self.restore()
+        self._dirty_rects = plan.render(self.image, row)
+        return self.image
+
+    def restore(self):
+        """把脏矩形区域从原始底图恢复"""
+        if not self._dirty_rects:
+            return
+
+        painter = QPainter(self.image)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        for rect in self._dirty_rects:
+            rect = rect.intersected(self._bounds)
+            if not rect.isEmpty():
+                painter.drawImage(rect.topLeft(), self.base_image, rect)
+        painter.end()
+        self._dirty_rects = []
@@ -0,0 +1,209 @@
+"""
+多进程渲染池
+
+把数据行按块分发到多个进程，每个进程只解码一次底图、只构建一次字体和颜色设置，
+然后独立完成绘制和编码，把编码后的图片数据返回给主进程写入磁盘。
+"""
+import os
+import time
+import multiprocessing
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from src.config.constants import DEFAULT_RENDER_BACKEND
+from src.processors.sprite_cache import SpriteCache, sprite_stats
+from src.utils.logger import logger
+
+# 子进程中的渲染状态（由 _init_worker 初始化）
+_worker_state = {}
+
+
+def default_worker_count():
+    """默认渲染进程数（CPU核心数）"""
+    return os.cpu_count() or 1
+
+
+def _init_worker(image_path, template, reuse_canvas, encoder, instrument=False,
+                 backend=DEFAULT_RENDER_BACKEND, sprite_cache=True):
+    """
+    子进程初始化函数：加载底图并构建渲染计划（Qt 后端先创建无界面的 Qt 应用）
+
+    Args:
+        image_path: 图片路径
+        template: 可序列化的位置模板字典
+        reuse_canvas: 是否复用画布
+        encoder: 输出图片编码器
+        instrument: 是否返回每行的绘制和编码耗时
+        backend: 渲染后端 (qt/pillow)，Pillow 后端不创建 Qt 应用
+        sprite_cache: 是否在本进程中缓存重复文字的贴图
+    """
+    cache = SpriteCache() if sprite_cache else None
+    _worker_state['encoder'] = encoder
+    _worker_state['instrument'] = instrument
+    _worker_state['sprite_cache'] = cache
+    if backend == 'pillow':
+        from src.processors.pillow_backend import load_base_image, PillowRenderPlan, PillowScratchCanvas
+
+        base_image = load_base_image(image_path)
+        _worker_state['base_image'] = base_image
+        _worker_state['plan'] = PillowRenderPlan(template, base_image, cache)
+        _worker_state['canvas'] = PillowScratchCanvas(base_image) if reuse_canvas else None
+        return
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtGui import QGuiApplication
+    from src.processors.position_template import template_to_positions
+    from src.processors.render_plan import RenderPlan, ScratchCanvas
+    from src.processors.render_worker import load_base_image
+
+    app = QGuiApplication.instance()
+    if app is None:
+        app = QGuiApplication(["snaptext-render-worker"])
+
+    base_image = load_base_image(image_path)
+    _worker_state['app'] = app
+    _worker_state['base_image'] = base_image
+    _worker_state['plan'] = RenderPlan(template_to_positions(template), base_image, cache)
+    _worker_state['canvas'] = ScratchCanvas(base_image) if reuse_canvas else None
+
+
+def _render_chunk(chunk):
+    """
+    在子进程中渲染一块数据行
+
+    Args:
+        chunk: [(行号, 数据行, 输出路径), ...]
+
+    Returns:
+        ([(行号, 输出路径, 编码后的图片数据或None, 错误信息或None, (绘制耗时, 编码耗时)或None), ...],
+         本块的文字贴图缓存 (命中次数, 未命中次数))
+    """
+    base_image = _worker_state['base_image']
+    plan = _worker_state['plan']
+    canvas = _worker_state['canvas']
+    encoder = _worker_state['encoder']
+    instrument = _worker_state['instrument']
+
+    results = []
+    for index, row, output_path in chunk:
+        try:
+            start = time.perf_counter() if instrument else 0.0
+            if canvas is not None:
+                image = canvas.render(plan, row)
+            else:
+                image = base_image.copy()
+                plan.render(image, row)
+            if instrument:
+                painted = time.perf_counter()
+                image_data = encoder.encode(image)
+                timings = (painted - start, time.perf_counter() - painted)
+            else:
+                image_data = encoder.encode(image)
+                timings = None
+            results.append((index, output_path, image_data, None, timings))
+        except Exception as e:
+            results.append((index, output_path, None, str(e), None))
+
+    cache = _worker_state['sprite_cache']
+    return results, cache.take_counts() if cache is not None else (0, 0)
+
+
+class RenderPool:
+    """多进程渲染池"""
+
+    def __init__(self, image_path, text_positions, workers=None, chunk_size=None, reuse_canvas=True,
+                 encoder=None, instrument=False, backend=DEFAULT_RENDER_BACKEND, sprite_cache=True):
+        """
+        初始化渲染池
+
+        Args:
+            image_path: 图片路径
+            text_positions: 文字位置信息列表
+            workers: 进程数，默认为CPU核心数
+            chunk_size: 每块的数据行数，默认根据数据量自动计算
+            reuse_canvas: 每个进程是否复用画布（只恢复脏矩形）
+            encoder: 输出图片编码器，默认为PNG
+            instrument: 是否统计每行的绘制和编码耗时
+            backend: 渲染后端 (qt/pillow)
+            sprite_cache: 每个进程是否缓存重复文字的贴图
+        """
+        from src.processors.output_encoder import OutputEncoder
+        from src.processors.position_template import positions_to_template
+
+        self.image_path = image_path
+        self.template = positions_to_template(text_positions)
+        self.workers = max(1, workers or default_worker_count())
+        self.chunk_size = chunk_size
+        self.reuse_canvas = reuse_canvas
+        self.encoder = encoder or OutputEncoder()
+        self.instrument = instrument
+        self.backend = backend
+        self.sprite_cache = sprite_cache
+        self.sprite_hits = 0  # 各进程文字贴图缓存的命中次数之和
+        self.sprite_misses = 0
+
+    def sprite_stats(self):
+        """
+        各进程文字贴图缓存的命中统计之和
+
+        Returns:
+            包含 hits、misses、hit_rate 的字典
+        """
+        return sprite_stats(self.sprite_hits, self.sprite_misses)
+
+    def _get_chunk_size(self, total_count):
+        """根据数据量计算每块的行数，使每个进程大约分到4块"""
+        if self.chunk_size:
+            return self.chunk_size
+        return max(1, min(32, total_count // (self.workers * 4)))
+
+    def imap(self, rows, total_count):
+        """
+        并行渲染数据行，按完成顺序逐行返回结果
+
+        同时在途的块数受限于进程数的两倍，调用方停止取结果（暂停）时
+        不会继续提交新的块；关闭生成器（取消）时会取消尚未开始的块。
+
+        Args:
+            rows: 可迭代的 (行号, 数据行, 输出路径)，按需读取
+            total_count: 数据总行数
+
+        Yields:
+            (行号, 输出路径, 编码后的图片数据或None, 错误信息或None, (绘制耗时, 编码耗时)或None)
+        """
+        rows = iter(rows)
+        chunk_size = self._get_chunk_size(total_count)
+        workers = min(self.workers, max(1, -(-total_count // chunk_size)))
+        logger.info("启动多进程渲染: %d 个进程，每块 %d 行", workers, chunk_size)
+
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.image_path, self.template, self.reuse_canvas, self.encoder, self.instrument,
+                      self.backend, self.sprite_cache)
+        )
+        pending = set()
+
+        def submit_next():
+            chunk = list(islice(rows, chunk_size))
+            if chunk:
+                pending.add(executor.submit(_render_chunk, chunk))
+            return bool(chunk)
+
+        try:
+            for _ in range(workers * 2):
+                if not submit_next():
+                    break
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    results, (hits, misses) = future.result()
+                    self.sprite_hits += hits
+                    self.sprite_misses += misses
+                    submit_next()
+                    for result in results:
+                        yield result
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
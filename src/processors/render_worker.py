@@ -0,0 +1,566 @@
+"""
+后台批量渲染工作对象
+"""
+import os
+import logging
+import threading
+import time
+from collections import deque
+from itertools import islice
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QImage, QImageReader
+from src.processors.render_plan import RenderPlan, ScratchCanvas
+from src.processors.sprite_cache import SpriteCache
+from src.processors.output_encoder import OutputEncoder
+from src.processors.render_pipeline import RenderPipeline, write_file
+from src.processors.job_manifest import JobManifest, job_key, content_key
+from src.processors.position_template import positions_to_template
+from src.processors.job_metrics import JobMetrics
+from src.processors.output_layout import OutputLayout
+from src.processors.output_sink import SinkWriteError
+from src.config.constants import (APP_VERSION, JOB_REPORT_FILENAME, METRICS_INTERVAL, RENDER_BACKENDS,
+                                  DEFAULT_RENDER_BACKEND)
+from src.utils.file_utils import ensure_dir_exists
+from src.utils.logger import logger
+
+
+def load_base_image(image_path):
+    """
+    加载底图为可绘制的 QImage
+
+    QImage 可以在任意线程中使用（QPixmap 只能在GUI线程中使用），
+    索引色/灰度图片会被转换为 QPainter 可以绘制的格式。
+
+    Args:
+        image_path: 图片路径
+
+    Returns:
+        QImage 对象
+    """
+    image = QImage(image_path)
+    if image.isNull():
+        raise ValueError(f"无法加载图片: {image_path}")
+
+    if image.format() not in (QImage.Format.Format_RGB32,
+                              QImage.Format.Format_ARGB32,
+                              QImage.Format.Format_ARGB32_Premultiplied):
+        if image.hasAlphaChannel():
+            image = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+        else:
+            image = image.convertToFormat(QImage.Format.Format_RGB32)
+    return image
+
+
+def probe_base_image(image_path):
+    """
+    只读取底图的文件头（尺寸和分辨率），不解码像素
+
+    文字度量只取决于底图的分辨率，排版预检等不绘制的场合用与底图分辨率相同的 1x1 图片构建渲染计划。
+    QImageReader 不提供文件记录的分辨率，由 Pillow 读取文件头得到；Pillow 无法读取时才完整加载底图。
+
+    Args:
+        image_path: 图片路径
+
+    Returns:
+        (1x1 的 QImage（与底图的分辨率相同）, (宽, 高))
+    """
+    size = QImageReader(image_path).size()
+    if not size.isValid():
+        raise ValueError(f"无法加载图片: {image_path}")
+    probe = QImage(1, 1, QImage.Format.Format_RGB32)
+    try:
+        from PIL import Image
+
+        with Image.open(image_path) as source:
+            dpi = source.info.get('dpi')
+    except (ImportError, OSError):
+        image = load_base_image(image_path)
+        probe.setDotsPerMeterX(image.dotsPerMeterX())
+        probe.setDotsPerMeterY(image.dotsPerMeterY())
+        return probe, (image.width(), image.height())
+    if dpi and dpi[0] > 0 and dpi[1] > 0:
+        # 与 Qt 读取文件时相同，按每米点数记录分辨率
+        probe.setDotsPerMeterX(round(dpi[0] / 0.0254))
+        probe.setDotsPerMeterY(round(dpi[1] / 0.0254))
+    return probe, (size.width(), size.height())
+
+
+class RenderWorker(QObject):
+    """
+    批量渲染工作对象
+
+    在独立的 QThread 中运行 run()，通过信号把进度和结果传回GUI线程，
+    支持暂停、继续和取消。
+    """
+
+    # 定义信号
+    progress_updated = pyqtSignal(int)  # 进度更新信号
+    generation_completed = pyqtSignal(str)  # 生成完成信号
+    generation_cancelled = pyqtSignal(str)  # 生成取消信号
+    error_occurred = pyqtSignal(str)  # 错误信号
+    metrics_updated = pyqtSignal(dict)  # 性能统计信号（开启统计时定期发出，见 JobMetrics.snapshot）
+    finished = pyqtSignal()  # 工作结束信号（无论成功、失败或取消）
+
+    def __init__(self, image_path, data, text_positions, output_dir, workers=1, reuse_canvas=True,
+                 encoder_threads=None, encoder=None, limit=None, incremental=True, verify_checksums=False,
+                 instrument=False, sink=None, layout=None, backend=DEFAULT_RENDER_BACKEND, sprite_cache=True):
+        """
+        初始化渲染工作对象
+
+        Args:
+            image_path: 图片路径
+            data: 要添加的文本数据（列表或 DataStream 等可重复迭代、支持 len() 的数据源）
+            text_positions: 文字位置信息列表
+            output_dir: 输出目录
+            workers: 渲染进程数，大于1时使用多进程渲染池
+            reuse_canvas: 是否复用画布（只恢复脏矩形），否则每行完整复制底图
+            encoder_threads: 单进程流水线中的编码线程数，默认根据CPU核心数计算
+            encoder: 输出图片编码器，默认为PNG
+            limit: 最多生成的数据组数，默认全部
+            incremental: 是否根据输出目录中的任务清单跳过内容未改变的输出
+            verify_checksums: 跳过未改变的输出前是否重新计算文件的校验和（否则只检查文件大小）
+            instrument: 是否统计各阶段耗时分布，并在输出目录中写入任务报告
+            sink: 单文件输出目标（如 PdfSink），默认每行保存为输出目录中的一个图片文件
+            layout: 输出文件布局（文件名模板、子目录分片），默认用第一列作为文件名
+            backend: 渲染后端，qt 使用 QPainter，pillow 使用 PIL.ImageDraw（不需要 Qt 平台插件）
+            sprite_cache: 是否缓存重复文字的贴图（多进程渲染时每个进程一个缓存）
+        """
+        if backend not in RENDER_BACKENDS:
+            raise ValueError(f"不支持的渲染后端: {backend}")
+        if backend != 'qt' and sink is not None and sink.REQUIRES_QT:
+            raise ValueError(f"{sink.describe()} 只支持 Qt 渲染后端")
+        super().__init__()
+        self.image_path = image_path
+        self.data = data
+        self.limit = limit
+        self.total_count = len(data) if limit is None else min(len(data), limit)
+        self.text_positions = text_positions
+        self.output_dir = output_dir
+        self.workers = workers
+        self.reuse_canvas = reuse_canvas
+        self.encoder_threads = encoder_threads
+        self.encoder = encoder or OutputEncoder()
+        self.sink = sink
+        # 渲染流水线/渲染池使用的编码器（输出目标可以指定自己的编码器）
+        self.image_encoder = sink.image_encoder(self.encoder) if sink is not None else self.encoder
+        self.layout = layout or OutputLayout()
+        self.backend = backend
+        self.incremental = incremental
+        self.verify_checksums = verify_checksums
+        self.stage_stats = {}  # 流水线各阶段的统计信息（任务结束后可用）
+        self.sprite_stats = None  # 文字贴图缓存的命中统计（任务结束后可用，未开启缓存时为None）
+        self.rendered_count = 0  # 本次生成的图片数
+        self.unchanged_count = 0  # 内容未改变而跳过的图片数
+        self.failed_count = 0  # 处理失败的图片数
+        self.metrics = JobMetrics() if instrument else None  # 性能统计，未开启时为None
+
+        self._plan = None
+        self._sprite_cache = SpriteCache() if sprite_cache else None
+        self._manifest = None  # 任务清单（只用于输出目录）
+        self._base_key = None
+        self._row_keys = {}  # 在途行的行号 -> (内容键, 输出路径)，写入后记录到任务清单
+        self._sink_failures = deque()  # 输出目标中写入失败的其他行 (行号, 错误信息)，已按成功计数
+
+        self._cancel_event = threading.Event()
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+
+    def cancel(self):
+        """请求取消（线程安全）"""
+        self._cancel_event.set()
+        self._resume_event.set()  # 唤醒暂停中的工作线程
+
+    def pause(self):
+        """请求暂停（线程安全）"""
+        self._resume_event.clear()
+
+    def resume(self):
+        """继续执行（线程安全）"""
+        self._resume_event.set()
+
+    def is_paused(self):
+        """是否处于暂停状态"""
+        return not self._resume_event.is_set()
+
+    def is_cancelled(self):
+        """是否已请求取消"""
+        return self._cancel_event.is_set()
+
+    def job_stats(self):
+        """
+        获取任务的统计信息
+
+        Returns:
+            包含 total、rendered、unchanged、failed、流水线各阶段统计 stages
+            和文字贴图缓存命中统计 sprite_cache 的字典
+        """
+        return {
+            'total': self.total_count,
+            'rendered': self.rendered_count,
+            'unchanged': self.unchanged_count,
+            'failed': self.failed_count,
+            'stages': self.stage_stats,
+            'sprite_cache': self.sprite_stats,
+            'metrics': self.metrics.snapshot() if self.metrics is not None else None,
+        }
+
+    def _iter_jobs(self):
+        """
+        按需读取数据行，生成渲染任务
+
+        Yields:
+            (行号, 数据行, 输出路径)
+        """
+        # 单文件输出时得到相对路径，作为文档/归档中的名称
+        if self.sink is None:
+            self.layout.start(self.output_dir, self.image_encoder.extension, self.total_count)
+        else:
+            self.layout.start("", self.image_encoder.extension, self.total_count, make_dirs=False,
+                              reserved=self.sink.RESERVED_NAMES)
+
+        rows = self.data if self.limit is None else islice(self.data, self.limit)
+        for i, row in enumerate(rows):
+            output_path = self.layout.path(i, row)
+            if self._manifest is None:
+                yield i, row, output_path
+                continue
+
+            key = content_key(self._base_key, row)
+            if self._manifest.is_unchanged(key, output_path):
+                self.unchanged_count += 1
+                continue
+            self._row_keys[i] = (key, output_path)
+            yield i, row, output_path
+
+    def _write_output(self, index, output_path, image_data):
+        """写入图片文件，并在任务清单中记录该行已完成"""
+        if self.sink is not None:
+            self._sink_call(self.sink.write, index, output_path, image_data)
+            return
+        write_file(index, output_path, image_data)
+        key, _ = self._row_keys.pop(index)
+        self._manifest.record_done(index, key, output_path, image_data)
+
+    def _sink_call(self, method, index, *args):
+        """
+        调用输出目标的写入方法（write/write_row/skip）
+
+        输出目标按行号顺序写出缓冲区中的行，写入失败的可能是前面已经按成功计数的行：
+        这些行记录下来由 _apply_sink_failures 改为失败，只有本行写入失败时才抛出异常。
+
+        Args:
+            method: 输出目标的方法
+            index: 本行的行号
+            *args: 其余参数
+
+        Returns:
+            方法的返回值
+        """
+        try:
+            return method(index, *args)
+        except SinkWriteError as e:
+            own_error = None
+            for failed_index, error in e.failures:
+                if failed_index == index:
+                    own_error = error
+                else:
+                    self._sink_failures.append((failed_index, error))
+            if own_error is not None:
+                raise SinkWriteError([(index, own_error)]) from e
+            return True
+
+    def _close_sink(self):
+        """写入输出目标中剩余的行并完成输出文件，写入失败的行改为失败"""
+        try:
+            self.sink.close()
+        except SinkWriteError as e:
+            self._sink_failures.extend(e.failures)
+        self._apply_sink_failures()
+
+    def _apply_sink_failures(self):
+        """把输出目标中写入失败的行从成功改为失败"""
+        while self._sink_failures:
+            index, error = self._sink_failures.popleft()
+            logger.sample("write_error", logging.ERROR, "写入数据行 %d 失败: %s", index + 1, error)
+            self.rendered_count -= 1
+            self.failed_count += 1
+
+    def _open_manifest(self):
+        """计算任务的输入摘要并打开输出目录中的任务清单"""
+        self._base_key = job_key(self.image_path, positions_to_template(self.text_positions),
+                                 self.encoder, self.backend)
+        self._manifest = JobManifest(self.output_dir, self.verify_checksums)
+        self._manifest.open(self.incremental)
+
+    def _get_plan(self, base_image):
+        """获取渲染计划（每个任务只构建一次）"""
+        if self._plan is None:
+            start = time.perf_counter()
+            if self.backend == 'pillow':
+                from src.processors.pillow_backend import PillowRenderPlan
+
+                self._plan = PillowRenderPlan(positions_to_template(self.text_positions), base_image,
+                                              self._sprite_cache)
+            else:
+                self._plan = RenderPlan(self.text_positions, base_image, self._sprite_cache)
+            if self.metrics is not None:
+                self.metrics.record('font_setup', time.perf_counter() - start)
+        return self._plan
+
+    def _load_base_image(self):
+        """用任务的渲染后端加载底图"""
+        if self.backend == 'pillow':
+            from src.processors.pillow_backend import load_base_image as load_pillow_image
+
+            return load_pillow_image(self.image_path)
+        return load_base_image(self.image_path)
+
+    def _wait_if_paused(self):
+        """暂停时在此等待，返回是否已请求取消"""
+        self._resume_event.wait()
+        return self._cancel_event.is_set()
+
+    def _canvas_class(self):
+        """任务的渲染后端使用的可复用画布类"""
+        if self.backend == 'pillow':
+            from src.processors.pillow_backend import PillowScratchCanvas
+
+            return PillowScratchCanvas
+        return ScratchCanvas
+
+    def _run_pipeline(self, base_image):
+        """
+        使用 绘制 → 编码 → 写入 流水线渲染
+
+        Yields:
+            每处理完一行时返回 (行号, 是否保存成功, 错误信息或None)
+        """
+        pipeline = RenderPipeline(base_image, self._get_plan(base_image), self.image_encoder.encode,
+                                  self._write_output,
+                                  encoder_threads=self.encoder_threads,
+                                  reuse_canvas=self.reuse_canvas,
+                                  metrics=self.metrics,
+                                  canvas_class=self._canvas_class())
+
+        jobs = self._iter_jobs()
+        results = pipeline.run(jobs, self._wait_if_paused)
+        try:
+            for index, success in results:
+                yield index, success, None if success else "处理失败，详见日志"
+        finally:
+            results.close()
+            self.stage_stats = pipeline.stats()
+            pipeline.log_stats()
+            self._collect_sprite_stats()
+
+    def _run_pool(self):
+        """
+        使用多进程渲染池渲染，编码后的图片数据在当前线程中写入磁盘
+
+        Yields:
+            每处理完一行时返回 (行号, 是否保存成功, 错误信息或None)
+        """
+        from src.processors.render_pool import RenderPool
+
+        metrics = self.metrics
+        pool = RenderPool(self.image_path, self.text_positions, self.workers,
+                          reuse_canvas=self.reuse_canvas, encoder=self.image_encoder,
+                          instrument=metrics is not None, backend=self.backend,
+                          sprite_cache=self._sprite_cache is not None)
+        results = pool.imap(self._iter_jobs(), self.total_count)
+        try:
+            for index, output_path, image_data, error, timings in results:
+                if self._wait_if_paused():
+                    return
+
+                if error is not None:
+                    logger.sample("row_error", logging.ERROR, "处理数据行 %d 时出错: %s", index + 1, error)
+                    yield index, False, error
+                    continue
+
+                try:
+                    start = time.perf_counter() if metrics is not None else 0.0
+                    self._write_output(index, output_path, image_data)
+                    if metrics is not None:
+                        # 子进程中的绘制和编码耗时 + 主进程中的写入耗时
+                        write_time = time.perf_counter() - start
+                        metrics.record('paint', timings[0])
+                        metrics.record('encode', timings[1])
+                        metrics.record('write', write_time)
+                        metrics.record_image(timings[0] + timings[1] + write_time)
+                    logger.sample("saved", logging.DEBUG, "已保存: %s", output_path)
+                    yield index, True, None
+                except OSError as e:
+                    logger.sample("write_error", logging.ERROR, "保存失败: %s: %s", output_path, e)
+                    yield index, False, f"保存失败: {str(e)}"
+        finally:
+            results.close()
+            self._collect_sprite_stats(pool)
+
+    def _run_rows(self, base_image):
+        """
+        由输出目标直接用数据行写入（如 PDF 的矢量文字），无法直接写入的行在当前线程中渲染为图片
+
+        Yields:
+            每处理完一行时返回 (行号, 是否保存成功, 错误信息或None)
+        """
+        plan = self._get_plan(base_image)
+        canvas = None
+        metrics = self.metrics
+        for index, row, output_path in self._iter_jobs():
+            if self._wait_if_paused():
+                return
+
+            start = time.perf_counter()
+            try:
+                if not self._sink_call(self.sink.write_row, index, row):
+                    if canvas is None:
+                        canvas = ScratchCanvas(base_image)
+                    image = canvas.render(plan, row)
+                    self._sink_call(self.sink.write, index, output_path, self.image_encoder.encode(image))
+            except Exception as e:
+                logger.sample("row_error", logging.ERROR, "处理数据行 %d 时出错: %s", index + 1, e)
+                yield index, False, str(e)
+                continue
+
+            if metrics is not None:
+                elapsed = time.perf_counter() - start
+                metrics.record('paint', elapsed)
+                metrics.record_image(elapsed)
+            yield index, True, None
+        self._collect_sprite_stats()
+
+    def _collect_sprite_stats(self, pool=None):
+        """
+        记录文字贴图缓存的命中统计并写入日志
+
+        Args:
+            pool: 多进程渲染池，汇总各子进程的统计；为None时使用当前线程的缓存
+        """
+        if self._sprite_cache is None:
+            return
+        self.sprite_stats = pool.sprite_stats() if pool is not None else self._sprite_cache.stats()
+        stats = self.sprite_stats
+        if stats['hits'] or stats['misses']:
+            logger.info("文字贴图缓存: 命中 %d 次，未命中 %d 次，命中率 %.1f%%",
+                        stats['hits'], stats['misses'], stats['hit_rate'] * 100)
+
+    def _write_report(self):
+        """在输出目录中写入任务报告（任务设置、结果计数和各阶段耗时分布）"""
+        report_path = os.path.join(self.output_dir, JOB_REPORT_FILENAME)
+        extra = {
+            'version': APP_VERSION,
+            'image': self.image_path,
+            'output_format': self.sink.describe() if self.sink is not None else self.encoder.describe(),
+            'workers': self.workers,
+            'backend': self.backend,
+            'cancelled': self._cancel_event.is_set(),
+            'total': self.total_count,
+            'rendered': self.rendered_count,
+            'unchanged': self.unchanged_count,
+            'failed': self.failed_count,
+            'pipeline': self.stage_stats,
+            'sprite_cache': self.sprite_stats,
+        }
+        try:
+            self.metrics.write_report(report_path, extra)
+            logger.info("任务报告已保存: %s", report_path)
+        except OSError as e:
+            logger.error("保存任务报告失败: %s: %s", report_path, e)
+
+    @pyqtSlot()
+    def run(self):
+        """执行批量渲染"""
+        try:
+            ensure_dir_exists(self.output_dir)
+
+            # 加载原始图片（同时检查图片是否可用）
+            start = time.perf_counter()
+            base_image = self._load_base_image()
+            if self.metrics is not None:
+                self.metrics.record('decode', time.perf_counter() - start)
+            if self.backend == 'pillow':
+                logger.info("渲染后端: Pillow")
+                logger.debug("输出图片尺寸: %d x %d", *base_image.size)
+            else:
+                logger.debug("输出图片尺寸: %d x %d", base_image.width(), base_image.height())
+            if self.sink is not None:
+                logger.info("输出格式: %s", self.sink.describe())
+                self.sink.open(base_image, self._get_plan(base_image))
+            else:
+                logger.info("输出格式: %s，%s", self.encoder.describe(), self.layout.describe())
+                self._open_manifest()
+
+            total_count = self.total_count
+            if self.sink is not None and self.sink.draws_text:
+                results = self._run_rows(base_image)
+            elif self.workers > 1 and total_count > 1:
+                results = self._run_pool()
+            else:
+                results = self._run_pipeline(base_image)
+
+            last_progress = -1
+            last_metrics_time = time.perf_counter()
+            for done_count, (index, success, error) in enumerate(results, 1):
+                if success:
+                    self.rendered_count += 1
+                else:
+                    self.failed_count += 1
+                    if self.sink is not None:
+                        self._sink_call(self.sink.skip, index)
+                    else:
+                        _, output_path = self._row_keys.pop(index)
+                        self._manifest.record_failed(index, output_path, error)
+
+                # 更新进度（只在百分比变化时发出信号，避免大批量时信号堆积）
+                progress = int((done_count + self.unchanged_count) / total_count * 100)
+                if progress != last_progress:
+                    last_progress = progress
+                    self.progress_updated.emit(progress)
+
+                self._apply_sink_failures()
+
+                if self.metrics is not None and time.perf_counter() - last_metrics_time >= METRICS_INTERVAL:
+                    last_metrics_time = time.perf_counter()
+                    self.metrics_updated.emit(self.metrics.snapshot())
+
+            # 输出文件写完后才发出结束信号
+            if self.sink is not None:
+                self._close_sink()
+
+            # 最终的性能统计在结束信号之前发出
+            if self.metrics is not None:
+                self.metrics_updated.emit(self.metrics.snapshot())
+                self._write_report()
+
+            output = self.sink.location() if self.sink is not None else self.output_dir
+            if self._cancel_event.is_set():
+                message = f"已取消生成，已保存 {self.rendered_count} 张图片到 {output}"
+                self.generation_cancelled.emit(message)
+            else:
+                self.progress_updated.emit(100)
+                message = f"已生成 {self.rendered_count} 张图片"
+                if self.sink is None:
+                    message += f"，{self.unchanged_count} 张未改变"
+                if self.failed_count:
+                    message += f"，{self.failed_count} 张失败"
+                    if self.sink is None:
+                        message += "（重新生成时会重试）"
+                message += f"，保存在 {output}"
+                self.generation_completed.emit(message)
+            logger.info(message)
+
+        except Exception as e:
+            error_message = f"生成截图失败: {str(e)}"
+            self.error_occurred.emit(error_message)
+            logger.error(error_message)
+        finally:
+            if self._manifest is not None:
+                self._manifest.close()
+            if self.sink is not None:
+                try:
+                    self.sink.close()
+                except Exception as e:
+                    logger.error("关闭输出文件失败: %s: %s", self.sink.path, e)
+            logger.log_sample_summary()
+            self.finished.emit()
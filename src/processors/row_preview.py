@@ -0,0 +1,233 @@
+"""
+逐行预览的叠加层缓存
+
+位置选择器中拖动数据行滑块时，把各行文字绘制在已选位置上的叠加层图片按行号缓存（LRU，按帧数限制容量）；
+后台线程读取当前行附近的数据行并预先绘制它们的叠加层，快速拖动滑块时大多数行可以直接显示。
+字体、颜色、位置或画布视图改变后，按新的绘制参数重新绘制（旧参数绘制的帧全部作废）。
+"""
+import threading
+from collections import OrderedDict
+from PyQt6.QtCore import QObject, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QFontMetrics, QImage, QPainter, QPixmap
+from src.config.constants import ROW_PREVIEW_FRAMES, ROW_PREVIEW_PREFETCH
+from src.processors.data_stream import DataStream
+from src.utils.logger import logger
+
+
+def row_texts(row, count):
+    """
+    把数据行转换为各位置的预览文字（缺少的列显示为“位置 N”）
+
+    Args:
+        row: 数据行
+        count: 位置数量
+
+    Returns:
+        预览文字列表
+    """
+    return [str(row[i]) if i < len(row) else f"位置 {i+1}" for i in range(count)]
+
+
+def read_rows(data, start, count):
+    """
+    读取从 start 行开始的 count 行
+
+    Args:
+        data: DataStream 或数据行列表
+        start: 起始行号
+        count: 行数
+
+    Returns:
+        数据行列表
+    """
+    if isinstance(data, DataStream):
+        return data.rows(start, count)
+    return list(data[start:start + count])
+
+
+class OverlaySpec:
+    """叠加层的绘制参数（只读，可以在后台线程中使用）"""
+
+    def __init__(self, size, dpi, font, color, centers):
+        """
+        初始化绘制参数
+
+        Args:
+            size: 叠加层尺寸 QSize
+            dpi: 叠加层的逻辑 DPI (横向, 纵向)，按点数设置的字号据此换算为像素
+            font: 预览字体（已按画布缩放比例换算字号）
+            color: 文字颜色
+            centers: [(位置序号, 显示横坐标, 显示纵坐标), ...]，只包含已选择的位置
+        """
+        self.size = QSize(size)
+        self.dpi = dpi
+        self.font = QFont(font)
+        self.color = QColor(color)
+        self.centers = tuple(centers)
+        self.key = (size.width(), size.height(), dpi, font.key(), color.rgba(), self.centers)
+
+    def render(self, texts):
+        """
+        绘制一行文字的叠加层
+
+        Args:
+            texts: 各位置的预览文字
+
+        Returns:
+            透明背景的 QImage
+        """
+        image = QImage(self.size, QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(Qt.GlobalColor.transparent)
+        # QImage 默认按 72 DPI 换算点数，设置为叠加层的 DPI 才与直接在屏幕上绘制的字号一致
+        image.setDotsPerMeterX(round(self.dpi[0] / 0.0254))
+        image.setDotsPerMeterY(round(self.dpi[1] / 0.0254))
+
+        painter = QPainter(image)
+        painter.setFont(self.font)
+        painter.setPen(self.color)
+        metrics = QFontMetrics(self.font, image)
+        for index, display_x, display_y in self.centers:
+            if index < len(texts):
+                text = texts[index]
+                x = display_x - metrics.horizontalAdvance(text) / 2
+                y = display_y + metrics.height() / 2 - metrics.descent()
+                painter.drawText(int(x), int(y), text)
+        painter.end()
+        return image
+
+
+class RowFrameCache(QObject):
+    """
+    按行号缓存叠加层的 LRU 缓存
+
+    帧只在GUI线程中读取（QPixmap），附近行的读取和绘制在后台线程中进行（QImage），
+    绘制完成的行可用时发出 frame_ready 信号。
+    """
+
+    frame_ready = pyqtSignal(int)  # 该行的叠加层可以显示
+    _frame_rendered = pyqtSignal(int, int, QImage, list)  # 后台线程绘制完一行: 参数版本, 行号, 图片, 预览文字
+
+    def __init__(self, data, position_count, capacity=ROW_PREVIEW_FRAMES, prefetch=ROW_PREVIEW_PREFETCH):
+        """
+        初始化缓存
+
+        Args:
+            data: DataStream 或数据行列表
+            position_count: 位置数量
+            capacity: 最多缓存的帧数
+            prefetch: 预先绘制当前行前后各多少行
+        """
+        super().__init__()
+        self.data = data
+        self.row_count = len(data)
+        self.position_count = position_count
+        self.capacity = max(1, capacity)
+        self.prefetch = prefetch
+
+        self._frames = OrderedDict()  # 行号 -> (QPixmap, 预览文字)
+        self._spec = None
+        self._generation = 0  # 绘制参数的版本，参数改变后旧版本的帧作废
+
+        self._queue = []  # 待绘制的行号，按请求顺序绘制
+        self._job_spec = (0, None)  # 后台线程使用的 (版本, 绘制参数)
+        self._condition = threading.Condition()
+        self._closed = False
+        self._frame_rendered.connect(self._on_frame_rendered)
+        self._thread = threading.Thread(target=self._render_loop, name="row-preview", daemon=True)
+        self._thread.start()
+
+    def set_spec(self, spec):
+        """
+        设置绘制参数，与当前参数不同时清空已缓存的帧和尚未绘制的请求
+
+        Args:
+            spec: OverlaySpec
+        """
+        if self._spec is not None and self._spec.key == spec.key:
+            return
+        self._spec = spec
+        self._generation += 1
+        self._frames.clear()
+        with self._condition:
+            self._queue = []
+            self._job_spec = (self._generation, spec)
+
+    def get(self, row):
+        """
+        获取已绘制的帧
+
+        Args:
+            row: 行号
+
+        Returns:
+            (QPixmap, 预览文字)，尚未绘制时返回None
+        """
+        frame = self._frames.get(row)
+        if frame is not None:
+            self._frames.move_to_end(row)
+        return frame
+
+    def put(self, row, pixmap, texts):
+        """缓存一帧，超出容量时淘汰最久未使用的帧"""
+        self._frames[row] = (pixmap, texts)
+        self._frames.move_to_end(row)
+        while len(self._frames) > self.capacity:
+            self._frames.popitem(last=False)
+
+    def request(self, row):
+        """
+        请求绘制某一行及其附近的行，替换之前尚未开始的请求
+
+        先绘制该行，再由近到远绘制前后 prefetch 行（已缓存的行跳过）。
+
+        Args:
+            row: 当前行号
+        """
+        if self._spec is None:
+            return
+        rows = [row]
+        for distance in range(1, self.prefetch + 1):
+            rows.extend((row + distance, row - distance))
+        rows = [r for r in rows if 0 <= r < self.row_count and r not in self._frames]
+        with self._condition:
+            self._queue = rows
+            self._condition.notify()
+
+    def close(self):
+        """停止后台线程并释放缓存"""
+        with self._condition:
+            self._closed = True
+            self._queue = []
+            self._condition.notify()
+        self._frames.clear()
+
+    def _render_loop(self):
+        """后台线程：读取请求的行（一次读取相邻的一段）并依次绘制"""
+        rows = {}  # 本次请求读取的数据行
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                row = self._queue.pop(0)
+                generation, spec = self._job_spec
+                wanted = [row] + self._queue
+
+            try:
+                if row not in rows:
+                    start = min(wanted)
+                    rows = dict(enumerate(read_rows(self.data, start, max(wanted) - start + 1), start))
+                texts = row_texts(rows.get(row, []), self.position_count)
+                image = spec.render(texts)
+            except Exception as e:
+                logger.error("绘制第 %d 行预览失败: %s", row + 1, e)
+                continue
+            self._frame_rendered.emit(generation, row, image, texts)
+
+    def _on_frame_rendered(self, generation, row, image, texts):
+        """GUI线程：缓存绘制好的帧（绘制参数已经改变时丢弃）"""
+        if self._closed or generation != self._generation:
+            return
+        self.put(row, QPixmap.fromImage(image), texts)
+        self.frame_ready.emit(row)
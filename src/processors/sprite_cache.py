@@ -0,0 +1,162 @@
+"""
+文字贴图缓存
+
+数据中常有大量重复的值（班级、部门、日期等），同样的文字、字体和颜色每次都重新排版和光栅化。
+贴图缓存按 (文字, 字体, 颜色) 保存预先绘制好的透明文字图片（预乘 alpha）及其相对基线原点的偏移，
+重复的值直接贴到对应位置。缓存按图片占用的字节数做 LRU 淘汰，内存占用有上限。
+
+绘制贴图比直接绘制文字慢，只出现一次的值（姓名、编号等）缓存后得不到命中，
+因此文字第二次出现时才绘制贴图（见 admit），第一次出现的文字仍然直接绘制。
+"""
+from collections import OrderedDict
+from src.config.constants import DEFAULT_SPRITE_CACHE_BYTES
+
+# 准入记录中最多保存的键数，超过时清空（只保存键，不保存图片）
+_ADMISSION_KEYS = 65536
+
+
+class TextSprite:
+    """预先绘制好的文字贴图"""
+
+    __slots__ = ('image', 'offset_x', 'offset_y', 'text_width', 'size')
+
+    def __init__(self, image, offset_x, offset_y, text_width, size):
+        """
+        初始化文字贴图
+
+        Args:
+            image: 透明背景的文字图片（QImage 或 PIL 图片）
+            offset_x: 图片左上角相对基线原点的横向偏移
+            offset_y: 图片左上角相对基线原点的纵向偏移
+            text_width: 文字的步进宽度，用于居中
+            size: 图片占用的字节数
+        """
+        self.image = image
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.text_width = text_width
+        self.size = size
+
+
+class SpriteCache:
+    """按字节数限制容量的 LRU 文字贴图缓存（每个渲染线程/进程一个，不加锁）"""
+
+    def __init__(self, max_bytes=DEFAULT_SPRITE_CACHE_BYTES):
+        """
+        初始化缓存
+
+        Args:
+            max_bytes: 缓存的贴图最多占用的字节数
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._sprites = OrderedDict()  # (文字, 样式键) -> TextSprite
+        self._seen = set()  # 出现过一次、还没有缓存的键
+        self._reported = (0, 0)  # take_counts() 上次返回时的 (命中, 未命中)
+
+    def __len__(self):
+        return len(self._sprites)
+
+    def get(self, key):
+        """
+        查找贴图
+
+        Args:
+            key: (文字, 样式键)
+
+        Returns:
+            TextSprite，未缓存时返回None
+        """
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            self.misses += 1
+            return None
+        self._sprites.move_to_end(key)
+        self.hits += 1
+        return sprite
+
+    def admit(self, key):
+        """
+        未命中时判断是否为该文字绘制贴图：同一文字第二次出现时才缓存
+
+        Args:
+            key: (文字, 样式键)
+
+        Returns:
+            是否应该绘制并缓存贴图
+        """
+        if key in self._seen:
+            self._seen.discard(key)
+            return True
+        if len(self._seen) >= _ADMISSION_KEYS:
+            self._seen.clear()
+        self._seen.add(key)
+        return False
+
+    def put(self, key, sprite):
+        """
+        缓存贴图，超出容量时淘汰最久未使用的贴图
+
+        Args:
+            key: (文字, 样式键)
+            sprite: TextSprite
+        """
+        if sprite.size > self.max_bytes:
+            return
+        previous = self._sprites.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        self._sprites[key] = sprite
+        self._bytes += sprite.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._sprites.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def take_counts(self):
+        """
+        获取上次调用以来的命中和未命中次数（用于汇总多进程渲染池中各进程的统计）
+
+        Returns:
+            (命中次数, 未命中次数)
+        """
+        hits, misses = self.hits - self._reported[0], self.misses - self._reported[1]
+        self._reported = (self.hits, self.misses)
+        return hits, misses
+
+    def stats(self):
+        """
+        获取缓存统计
+
+        Returns:
+            包含 hits、misses、hit_rate、entries、bytes、evictions 的字典
+        """
+        return sprite_stats(self.hits, self.misses, len(self._sprites), self._bytes, self.evictions)
+
+
+def sprite_stats(hits, misses, entries=None, size=None, evictions=None):
+    """
+    把命中次数整理为统计字典
+
+    Args:
+        hits: 命中次数
+        misses: 未命中次数
+        entries: 缓存中的贴图数（多进程汇总时不可用）
+        size: 缓存占用的字节数
+        evictions: 淘汰次数
+
+    Returns:
+        统计字典
+    """
+    lookups = hits + misses
+    stats = {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+    }
+    if entries is not None:
+        stats.update({'entries': entries, 'bytes': size, 'evictions': evictions})
+    return stats
@@ -4,20 +4,104 @@
 import csv
 import os
 from PyQt6.QtWidgets import QFileDialog, QMessageBox
-from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtCore import QObject, QThread, Qt, pyqtSignal, pyqtSlot
+from src.config.constants import DATA_SAMPLE_SIZE
+from src.processors.data_stream import DataStream
 from src.utils.logger import logger
 
+
+def scan_data_stream(stream, progress=None):
+    """
+    扫描并校验流式数据源
+
+    Args:
+        stream: DataStream
+        progress: 进度回调，见 DataStream.scan
+
+    Returns:
+        (是否有效, 信息)，被进度回调停止时返回None
+    """
+    try:
+        count = stream.scan(progress)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return False, str(e)
+    if count is None:
+        return None
+    if not count:
+        return False, "没有数据"
+    return True, "数据验证通过"
+
+
+class DataScanWorker(QObject):
+    """
+    后台扫描数据文件的工作对象
+
+    在独立的 QThread 中运行，扫描大文件时不阻塞界面；每隔 SCAN_PROGRESS_INTERVAL 行报告进度并检查是否已取消。
+    """
+
+    progress_updated = pyqtSignal(int, int)  # 扫描进度信号: 已扫描行数, 百分比
+    scan_completed = pyqtSignal(object)  # 扫描完成信号，传递已校验的 DataStream
+    scan_cancelled = pyqtSignal()  # 扫描取消信号
+    error_occurred = pyqtSignal(str)  # 错误信号
+    finished = pyqtSignal()  # 工作结束信号（无论成功、失败或取消）
+
+    def __init__(self, file_path):
+        """
+        初始化工作对象
+
+        Args:
+            file_path: 数据文件路径
+        """
+        super().__init__()
+        self.file_path = file_path
+        self._cancelled = False
+
+    def cancel(self):
+        """请求取消扫描（可以在任意线程中调用）"""
+        self._cancelled = True
+
+    def _on_progress(self, count, fraction):
+        """扫描进度回调，返回是否停止扫描"""
+        self.progress_updated.emit(count, int(fraction * 100))
+        return self._cancelled
+
+    @pyqtSlot()
+    def run(self):
+        """扫描并校验数据文件"""
+        try:
+            stream = DataStream(self.file_path)
+            result = scan_data_stream(stream, self._on_progress)
+            if result is None or self._cancelled:
+                self.scan_cancelled.emit()
+                return
+            is_valid, message = result
+            if not is_valid:
+                self.error_occurred.emit(message)
+                return
+            self.scan_completed.emit(stream)
+        except Exception as e:
+            logger.error(f"导入数据失败: {str(e)}")
+            self.error_occurred.emit(f"导入数据失败: {str(e)}")
+        finally:
+            self.finished.emit()
+
+
 class TextProcessor(QObject):
     """文本数据处理类"""
     
     # 定义信号
-    data_loaded = pyqtSignal(list)  # 数据加载完成信号，传递数据列表
+    data_loaded = pyqtSignal(object)  # 数据加载完成信号，传递数据（DataStream 或列表）
     error_occurred = pyqtSignal(str)  # 错误信号，传递错误信息
+    import_progress = pyqtSignal(int, int)  # 后台导入进度信号: 已扫描行数, 百分比
+    import_cancelled = pyqtSignal(str)  # 后台导入取消信号
+    import_finished = pyqtSignal()  # 后台导入结束信号（无论成功、失败或取消）
     
     def __init__(self):
         super().__init__()
         self.data = []  # 存储加载的数据
         self.headers = []
+        self._scan_thread = None
+        self._scan_worker = None
     
     def import_text(self, file_path=None, text_content=None):
         """导入文本数据"""
@@ -46,19 +130,108 @@ class TextProcessor(QObject):
             self.error_occurred.emit(f"导入数据失败: {str(e)}")
             raise
     
+    def start_import(self, file_path):
+        """
+        在后台线程中导入数据文件
+
+        扫描校验通过后才替换当前数据并发出 data_loaded 信号；正在导入其他文件时先取消之前的导入。
+
+        Args:
+            file_path: 数据文件路径
+
+        Returns:
+            是否已开始导入
+        """
+        if not os.path.exists(file_path):
+            self.error_occurred.emit(f"导入数据失败: 文件不存在: {file_path}")
+            return False
+        if self.is_importing():
+            self.cancel_import(wait=True)
+
+        self._scan_thread = QThread()
+        self._scan_worker = DataScanWorker(file_path)
+        self._scan_worker.moveToThread(self._scan_thread)
+
+        # 工作对象的信号转发到处理器的槽（跨线程自动排队到GUI线程），已被替换的工作对象的结果在槽中丢弃
+        self._scan_thread.started.connect(self._scan_worker.run)
+        self._scan_worker.progress_updated.connect(self._on_scan_progress)
+        self._scan_worker.scan_completed.connect(self._on_scan_completed)
+        self._scan_worker.scan_cancelled.connect(self._on_scan_cancelled)
+        self._scan_worker.error_occurred.connect(self._on_scan_error)
+        # 直接连接：取消并等待线程结束时GUI线程正阻塞在 wait() 中，排队的 quit 无法执行
+        self._scan_worker.finished.connect(self._scan_thread.quit, Qt.ConnectionType.DirectConnection)
+        self._scan_thread.finished.connect(self._on_scan_thread_finished)
+
+        self._scan_thread.start()
+        logger.info("后台导入数据文件: %s", file_path)
+        return True
+
+    def is_importing(self):
+        """是否有导入任务正在进行"""
+        return self._scan_thread is not None and self._scan_thread.isRunning()
+
+    def cancel_import(self, wait=False):
+        """
+        取消后台导入
+
+        Args:
+            wait: 是否等待后台线程结束
+        """
+        if self.is_importing():
+            self._scan_worker.cancel()
+            logger.info("已请求取消导入数据")
+            if wait:
+                self._scan_thread.wait()
+
+    def _is_current_scan(self):
+        """发出信号的是否为当前的扫描工作对象（被新的导入替换的工作对象的信号忽略）"""
+        return self._scan_worker is not None and self.sender() is self._scan_worker
+
+    def _on_scan_progress(self, count, percent):
+        """扫描进度回调"""
+        if self._is_current_scan():
+            self.import_progress.emit(count, percent)
+
+    def _on_scan_completed(self, stream):
+        """扫描完成回调：替换当前数据"""
+        if not self._is_current_scan():
+            return
+        self.data = stream
+        self.headers = stream.headers
+        self.data_loaded.emit(self.data)
+        logger.info(f"成功导入 {len(self.data)} 条数据")
+
+    def _on_scan_cancelled(self):
+        """扫描取消回调"""
+        if self._is_current_scan():
+            self.import_cancelled.emit("已取消导入数据")
+            logger.info("导入数据已取消")
+
+    def _on_scan_error(self, message):
+        """扫描失败回调"""
+        if self._is_current_scan():
+            self.error_occurred.emit(message)
+
+    def _on_scan_thread_finished(self):
+        """后台导入线程结束回调"""
+        if self._scan_thread is None or self.sender() is not self._scan_thread:
+            return
+        self._scan_thread.wait()
+        self._scan_thread = None
+        self._scan_worker = None
+        self.import_finished.emit()
+
     def _import_from_file(self, file_path):
-        """从文件导入数据"""
-        _, ext = os.path.splitext(file_path)
-        ext = ext.lower()
-        
-        if ext == '.csv':
-            self._import_csv(file_path)
-        elif ext == '.txt':
-            self._import_txt(file_path)
-        else:
-            self._import_as_csv(file_path)  # 尝试作为CSV导入
+        """从文件导入数据（流式读取，导入时只扫描校验，不载入全部数据）
         
-        logger.debug(f"从文件导入了 {len(self.data)} 条数据")
+        TXT 格式要求：
+        1. 每行代表一组数据
+        2. 每组数据包含三个字段，用制表符分隔
+        3. 例如：姓名\t学号\t班级
+        其他文件按CSV读取，第一行为表头。
+        """
+        self.data = DataStream(file_path)
+        self.headers = []
     
     def _import_from_content(self, text_content):
         """从文本内容导入数据"""
@@ -74,58 +247,34 @@ class TextProcessor(QObject):
             logger.error(f"从文本内容导入失败: {str(e)}")
             raise ValueError(f"解析文本内容失败: {str(e)}")
     
-    def _import_csv(self, file_path):
-        """导入CSV文件"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            self.headers = next(reader)  # 获取表头
-            self.data = [row for row in reader]
-    
-    def _import_txt(self, file_path):
-        """导入TXT文件
-        格式要求：
-        1. 每行代表一组数据
-        2. 每组数据包含三个字段，用制表符分隔
-        3. 例如：姓名\t学号\t班级
-        """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            self.data = []
-            for line in f:
-                line = line.strip()
-                if line:  # 忽略空行
-                    fields = line.split('\t')
-                    if len(fields) != 3:
-                        raise ValueError("每行数据必须包含3个字段，用制表符分隔")
-                    self.data.append(fields)
-            
-            if self.data:
-                self.headers = ["姓名", "学号", "班级"]
-    
-    def _import_as_csv(self, file_path):
-        """尝试作为CSV导入文件"""
-        try:
-            self._import_csv(file_path)
-        except Exception as e:
-            logger.error(f"作为CSV导入失败: {str(e)}")
-            raise ValueError(f"无法导入文件: {str(e)}")
-    
     def get_headers(self):
         """获取表头"""
         return self.headers
     
     def get_data(self):
-        """获取数据"""
+        """获取数据（文件导入时为可重复迭代的 DataStream，文本内容导入时为列表）"""
         return self.data
     
+    def get_sample(self):
+        """获取示例数据（最多 DATA_SAMPLE_SIZE 行）"""
+        if not self.data:
+            return []
+        if isinstance(self.data, DataStream):
+            return self.data.sample
+        return self.data[:DATA_SAMPLE_SIZE]
+    
     def validate_data(self):
         """验证数据格式"""
+        if isinstance(self.data, DataStream):
+            # 流式数据源: 扫描一遍文件，逐行校验并统计行数
+            is_valid, message = scan_data_stream(self.data)
+            if is_valid:
+                self.headers = self.data.headers
+            return is_valid, message
+        
         if not self.data:
             return False, "没有数据"
         
-        # 检查数据组数
-        if len(self.data) > 40:
-            return False, "数据组数不能超过40组"
-        
         # 检查每行数据长度是否一致
         row_length = len(self.data[0])
         for i, row in enumerate(self.data):
@@ -0,0 +1,291 @@
+"""
+多分辨率瓦片金字塔
+
+位置选择器放大查看大图时使用：第 k 级是原图缩小 2^k 倍后的图片，按固定大小切成瓦片。
+瓦片在后台线程中按需解码（每次解码相邻的一块瓦片），只缓存最近使用的瓦片，内存占用有上限。
+支持裁剪解码的格式（如 JPEG）直接从文件中解码所需的区域，不解码整张原图；
+其他格式（PNG、BMP、WebP 等）先把该级整张图片按缩放尺寸解码一次，再从中切出瓦片。
+整级图片计入瓦片缓存的容量，该级排队的块都解码完后立即释放。
+
+整级解码受 Qt 的图片分配上限（QImageReader.allocationLimit()，Qt 6 默认 256 MB）限制：
+不支持缩放解码的格式解码任何一级都要先解码出完整分辨率的原图，原图超过上限时不使用瓦片，
+放大时只显示预览图；支持缩放解码的格式从整级解码不超过上限的最细一级开始使用瓦片。
+预览图只在打开时解码一次，不受此限制（见 read_scaled_image 的 allow_large）。
+"""
+import math
+import threading
+from collections import OrderedDict
+from PyQt6.QtCore import QObject, QPoint, QRect, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageIOHandler, QImageReader, QPixmap
+from src.config.constants import TILE_SIZE, TILE_BLOCK, TILE_CACHE_BYTES
+from src.utils.logger import logger
+
+
+def image_bytes(size):
+    """按每像素 4 字节估算解码后图片占用的字节数"""
+    return size.width() * size.height() * 4
+
+
+def allocation_limit_bytes():
+    """Qt 解码单张图片的分配上限（字节），没有上限时返回None"""
+    limit = QImageReader.allocationLimit()
+    return limit * 1024 * 1024 if limit > 0 else None
+
+
+def read_scaled_image(image_path, max_size, clip_rect=None, allow_large=False):
+    """
+    按显示尺寸解码图片（或图片的一部分）
+
+    通过 QImageReader 的裁剪和缩放解码直接得到显示尺寸的图片，支持缩放解码的格式（如 JPEG）
+    不会先解码出完整分辨率的像素，打开很大的底图时耗时和内存占用与原图尺寸基本无关。
+
+    Args:
+        image_path: 图片路径
+        max_size: 解码结果的最大尺寸 QSize，不超过时按原尺寸解码（不放大）
+        clip_rect: 只解码原图中的该区域 QRect（原图坐标），默认解码整张图片
+        allow_large: 不支持缩放解码的格式需要先解码出超过分配上限的原图时，是否临时放宽上限
+            （只用于打开时解码一次的预览图，解码出的原图缩放后即释放）
+
+    Returns:
+        (QImage, 原图尺寸 QSize)，无法加载时 QImage 为空
+    """
+    reader = QImageReader(image_path)
+    original_size = reader.size()
+    if not original_size.isValid():
+        # 无法预先读取尺寸的格式只能完整解码后再缩放
+        image = reader.read()
+        if image.isNull():
+            return image, QSize()
+        original_size = image.size()
+        if clip_rect is not None:
+            image = image.copy(clip_rect)
+        if image.width() > max_size.width() or image.height() > max_size.height():
+            image = image.scaled(max_size, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        return image, original_size
+
+    source = QRect(QPoint(0, 0), original_size)
+    if clip_rect is not None:
+        source = source.intersected(clip_rect)
+        reader.setClipRect(source)
+    target = source.size()
+    if target.width() > max_size.width() or target.height() > max_size.height():
+        target = target.scaled(max_size, Qt.AspectRatioMode.KeepAspectRatio)
+    reader.setScaledSize(target)
+
+    limit = allocation_limit_bytes()
+    full_bytes = image_bytes(original_size)
+    if (allow_large and limit is not None and full_bytes > limit
+            and not reader.supportsOption(QImageIOHandler.ImageOption.ScaledSize)):
+        previous = QImageReader.allocationLimit()
+        QImageReader.setAllocationLimit(math.ceil(full_bytes / (1024 * 1024)) + 1)
+        try:
+            return reader.read(), original_size
+        finally:
+            QImageReader.setAllocationLimit(previous)
+    return reader.read(), original_size
+
+
+class TilePyramid(QObject):
+    """
+    按需解码、有容量上限的瓦片金字塔
+
+    瓦片只在GUI线程中读取（QPixmap），解码在后台线程中进行，
+    新解码的瓦片可用时发出 tiles_ready 信号。
+    """
+
+    tiles_ready = pyqtSignal()  # 有新的瓦片可以绘制
+    _block_decoded = pyqtSignal(tuple, QImage)  # 后台线程解码完一块瓦片: (级别, 块列, 块行), 图片
+
+    def __init__(self, image_path, image_size, max_level, cache_bytes=TILE_CACHE_BYTES):
+        """
+        初始化瓦片金字塔
+
+        Args:
+            image_path: 图片路径
+            image_size: 原图尺寸 QSize
+            max_level: 最粗的级别（该级以下由预览图代替）
+            cache_bytes: 瓦片缓存最多占用的字节数
+        """
+        super().__init__()
+        self.image_path = image_path
+        self.image_size = image_size
+        self.max_level = max(0, max_level)
+        self.cache_bytes = cache_bytes
+        self.block_size = TILE_SIZE * TILE_BLOCK  # 一次解码的区域边长（该级像素）
+
+        self._tiles = OrderedDict()  # (级别, 列, 行) -> QPixmap
+        self._bytes = 0
+        self._pending = set()  # 已排队或正在解码的块（只在GUI线程中使用）
+
+        # 不支持裁剪解码的格式整级解码，只保留正在切分的一级，其字节数计入缓存容量
+        reader = QImageReader(image_path)
+        self._clip_decode = reader.supportsOption(QImageIOHandler.ImageOption.ClipRect)
+        self._scale_decode = reader.supportsOption(QImageIOHandler.ImageOption.ScaledSize)
+        self._level_image = (None, None)  # (级别, QImage)，只在后台线程中使用
+        self._level_bytes = 0  # 整级图片占用的字节数（后台线程写入，GUI线程淘汰瓦片时读取）
+        self.min_level = 0 if self._clip_decode else self._finest_full_level()
+        if self.min_level > self.max_level:
+            logger.info("图片超过 Qt 的分配上限且不支持缩放解码，放大时只显示预览图: %s", image_path)
+
+        self._queue = []  # 待解码的块，按请求顺序解码
+        self._condition = threading.Condition()
+        self._closed = False
+        self._block_decoded.connect(self._on_block_decoded)
+        self._thread = threading.Thread(target=self._decode_loop, name="tile-decoder", daemon=True)
+        self._thread.start()
+
+    def level_size(self, level):
+        """第 level 级图片的尺寸"""
+        factor = 1 << level
+        return QSize(-(-self.image_size.width() // factor), -(-self.image_size.height() // factor))
+
+    def _finest_full_level(self):
+        """
+        整级解码不超过分配上限的最细级别（不支持缩放解码时每级都要先解码出原图）
+
+        Returns:
+            级别，没有可用的级别时为 max_level + 1
+        """
+        limit = allocation_limit_bytes()
+        for level in range(self.max_level + 1):
+            decoded = self.level_size(level) if self._scale_decode else self.image_size
+            if limit is None or image_bytes(decoded) <= limit:
+                return level
+        return self.max_level + 1
+
+    def tile(self, level, column, row):
+        """
+        获取已解码的瓦片
+
+        Args:
+            level: 级别
+            column: 瓦片列
+            row: 瓦片行
+
+        Returns:
+            QPixmap，尚未解码时返回None
+        """
+        key = (level, column, row)
+        pixmap = self._tiles.get(key)
+        if pixmap is not None:
+            self._tiles.move_to_end(key)
+        return pixmap
+
+    def request(self, level, tiles):
+        """
+        请求解码一组瓦片，替换之前尚未开始的请求（只解码当前视图需要的瓦片）
+
+        Args:
+            level: 级别
+            tiles: 可迭代的 (列, 行)
+        """
+        blocks = []
+        for column, row in tiles:
+            block = (level, column // TILE_BLOCK, row // TILE_BLOCK)
+            if block not in blocks:
+                blocks.append(block)
+        with self._condition:
+            for block in self._queue:
+                if block not in blocks:
+                    self._pending.discard(block)
+            self._queue = [block for block in self._queue if block in blocks]
+            for block in blocks:
+                if block not in self._pending:
+                    self._pending.add(block)
+                    self._queue.append(block)
+            self._condition.notify()
+
+    def close(self):
+        """停止后台解码线程并释放缓存"""
+        with self._condition:
+            self._closed = True
+            self._queue = []
+            self._condition.notify()
+        self._tiles.clear()
+        self._bytes = 0
+
+    def _decode_loop(self):
+        """后台线程：依次解码请求的块"""
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    self._release_level_image()
+                    return
+                block = self._queue.pop(0)
+            try:
+                image = self._decode_block(*block)
+            except Exception as e:
+                logger.error("解码瓦片失败 %s: %s", block, e)
+                image = QImage()
+            with self._condition:
+                # 该级排队的块都已解码，释放整级图片
+                if not any(queued[0] == block[0] for queued in self._queue):
+                    self._release_level_image()
+            self._block_decoded.emit(block, image)
+
+    def _release_level_image(self):
+        """释放整级图片（后台线程）"""
+        self._level_image = (None, None)
+        self._level_bytes = 0
+
+    def _decode_block(self, level, block_column, block_row):
+        """
+        解码一块瓦片区域
+
+        Returns:
+            该块在第 level 级中的图片
+        """
+        size = self.level_size(level)
+        rect = QRect(block_column * self.block_size, block_row * self.block_size,
+                     self.block_size, self.block_size).intersected(QRect(QPoint(0, 0), size))
+        if rect.isEmpty():
+            return QImage()
+
+        if self._clip_decode:
+            factor = 1 << level
+            clip = QRect(rect.x() * factor, rect.y() * factor, rect.width() * factor, rect.height() * factor)
+            clip = clip.intersected(QRect(QPoint(0, 0), self.image_size))
+            reader = QImageReader(self.image_path)
+            reader.setClipRect(clip)
+            reader.setScaledSize(rect.size())
+            return reader.read()
+
+        cached_level, image = self._level_image
+        if cached_level != level:
+            self._release_level_image()
+            image, _ = read_scaled_image(self.image_path, size)
+            if image.isNull():
+                return image
+            self._level_image = (level, image)
+            self._level_bytes = image_bytes(image.size())
+        return image.copy(rect)
+
+    def _on_block_decoded(self, block, image):
+        """GUI线程：把解码好的块切成瓦片放入缓存"""
+        self._pending.discard(block)
+        if image.isNull() or self._closed:
+            return
+
+        level, block_column, block_row = block
+        for row in range(TILE_BLOCK):
+            for column in range(TILE_BLOCK):
+                rect = QRect(column * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE).intersected(image.rect())
+                if rect.isEmpty():
+                    continue
+                pixmap = QPixmap.fromImage(image.copy(rect))
+                self._put((level, block_column * TILE_BLOCK + column, block_row * TILE_BLOCK + row), pixmap)
+        self.tiles_ready.emit()
+
+    def _put(self, key, pixmap):
+        """缓存瓦片，超出容量（包括正在切分的整级图片）时淘汰最久未使用的瓦片"""
+        previous = self._tiles.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.width() * previous.height() * 4
+        self._tiles[key] = pixmap
+        self._bytes += pixmap.width() * pixmap.height() * 4
+        while self._bytes + self._level_bytes > self.cache_bytes and len(self._tiles) > 1:
+            _, evicted = self._tiles.popitem(last=False)
+            self._bytes -= evicted.width() * evicted.height() * 4
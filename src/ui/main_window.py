@@ -6,9 +6,10 @@ import webbrowser
 import tempfile
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                            QPushButton, QLabel, QProgressBar, QMessageBox,
-                           QHBoxLayout, QSpinBox, QFileDialog, QCheckBox)
+                           QHBoxLayout, QSpinBox, QFileDialog, QCheckBox,
+                           QComboBox, QLineEdit, QApplication)
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QIcon, QPixmap
+from PyQt6.QtGui import QIcon, QPixmap, QImageReader
 
 from src.ui.components import CardFrame, CSVFormatDialog
 from src.ui.styles import Style
@@ -17,10 +18,22 @@ from src.config.constants import (APP_TITLE, WINDOW_WIDTH, WINDOW_HEIGHT,
                                WINDOW_MARGIN, WINDOW_SPACING, DEFAULT_POSITION_COUNT, 
                                DEFAULT_DATA_COUNT, MAX_DATA_COUNT, 
                                SUPPORTED_IMAGE_FORMATS, SUPPORTED_DATA_FORMATS,
-                               GITHUB_REPO_URL, APP_VERSION)
+                               SUPPORTED_TEMPLATE_FORMATS, GITHUB_REPO_URL, APP_VERSION,
+                               DEFAULT_OUTPUT_FORMAT, DEFAULT_PNG_COMPRESSION,
+                               DEFAULT_JPEG_QUALITY, DEFAULT_WEBP_QUALITY,
+                               DEFAULT_DOCX_COLUMNS, DEFAULT_DOCX_ROWS, DEFAULT_NAME_TEMPLATE,
+                               DEFAULT_SHARD_SIZE)
 from src.processors.text_processor import TextProcessor
+from src.processors.data_stream import DataStream
 from src.processors.image_text_processor import ImageTextProcessor
 from src.processors.position_selector import PositionSelector
+from src.processors.position_template import save_template, load_template
+from src.processors.render_pool import default_worker_count
+from src.processors.output_encoder import OutputEncoder, OUTPUT_FORMATS
+from src.processors.pdf_sink import PdfSink, PdfImageEncoder
+from src.processors.docx_sink import DocxSink
+from src.processors.archive_sink import ArchiveSink
+from src.processors.output_layout import OutputLayout
 from src.utils.file_utils import get_resource_path, copy_to_temp
 from src.utils.theme_utils import is_system_dark_mode
 from src.utils.logger import logger
@@ -194,9 +207,15 @@ class MainWindow(QMainWindow):
         data_layout.addLayout(data_count_layout)
         
         # 导入数据按钮
+        import_layout = QHBoxLayout()
         self.import_text_btn = QPushButton("导入文本数据")
         self.import_text_btn.setIcon(QIcon.fromTheme("document-open"))
-        data_layout.addWidget(self.import_text_btn)
+        import_layout.addWidget(self.import_text_btn)
+        # 取消导入按钮（仅在后台扫描数据文件时显示）
+        self.cancel_import_btn = QPushButton("取消导入")
+        self.cancel_import_btn.setVisible(False)
+        import_layout.addWidget(self.cancel_import_btn)
+        data_layout.addLayout(import_layout)
         
         # 创建拖放区域（放在按钮下方）
         self.csv_drop_label = DragDropLabel(self, is_image=False)
@@ -226,9 +245,125 @@ class MainWindow(QMainWindow):
         self.select_positions_btn.setIcon(QIcon.fromTheme("edit"))
         position_layout.addWidget(self.select_positions_btn)
         
+        # 位置模板保存/加载按钮（模板可用于命令行批量生成）
+        template_layout = QHBoxLayout()
+        self.save_template_btn = QPushButton("保存位置模板")
+        template_layout.addWidget(self.save_template_btn)
+        self.load_template_btn = QPushButton("加载位置模板")
+        template_layout.addWidget(self.load_template_btn)
+        position_layout.addLayout(template_layout)
+        
         self.position_card.layout.addLayout(position_layout)
         layout.addWidget(self.position_card)
         
+        # 输出设置卡片
+        self.output_card = CardFrame("输出设置")
+        output_layout = QHBoxLayout()
+        output_layout.setSpacing(8)
+        
+        # 输出格式选择
+        output_layout.addWidget(QLabel("输出格式:"))
+        self.format_combo = QComboBox()
+        for key, (_, _, name) in OUTPUT_FORMATS.items():
+            self.format_combo.addItem(name, key)
+        # 单文件输出：所有图片按顺序写入同一个文档
+        self.format_combo.addItem("PDF 文档", 'pdf')
+        self.format_combo.addItem("Word 文档", 'docx')
+        self.format_combo.setCurrentIndex(self.format_combo.findData(DEFAULT_OUTPUT_FORMAT))
+        output_layout.addWidget(self.format_combo)
+        
+        # 压缩级别/质量（含义随输出格式变化）
+        self.quality_label = QLabel()
+        output_layout.addWidget(self.quality_label)
+        self.quality_spin = QSpinBox()
+        output_layout.addWidget(self.quality_spin)
+        
+        # 渐进式（JPEG）/无损（WebP）
+        self.format_option_checkbox = QCheckBox()
+        output_layout.addWidget(self.format_option_checkbox)
+        
+        # Word 文档每页的网格布局
+        self.grid_label = QLabel("每页:")
+        output_layout.addWidget(self.grid_label)
+        self.docx_columns_spin = QSpinBox()
+        self.docx_columns_spin.setRange(1, 10)
+        self.docx_columns_spin.setValue(DEFAULT_DOCX_COLUMNS)
+        self.docx_columns_spin.setSuffix(" 列")
+        output_layout.addWidget(self.docx_columns_spin)
+        self.docx_rows_spin = QSpinBox()
+        self.docx_rows_spin.setRange(1, 20)
+        self.docx_rows_spin.setValue(DEFAULT_DOCX_ROWS)
+        self.docx_rows_spin.setSuffix(" 行")
+        output_layout.addWidget(self.docx_rows_spin)
+        
+        # 图片格式可以打包为一个 ZIP 文件
+        self.archive_checkbox = QCheckBox("打包为 ZIP")
+        self.archive_checkbox.setToolTip("所有图片按顺序直接写入一个 ZIP 文件（不再压缩），不在输出目录中创建大量小文件")
+        output_layout.addWidget(self.archive_checkbox)
+        
+        # 渲染进程数选择
+        output_layout.addWidget(QLabel("渲染进程数:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, default_worker_count())
+        # 默认单进程：每个渲染进程启动时都要创建 Qt 应用、加载底图，小批量任务的启动开销可能超过渲染本身
+        self.workers_spin.setValue(1)
+        self.workers_spin.setToolTip("使用多个进程并行绘制和编码图片（适合数据量较大的任务，进程启动需要额外时间）")
+        output_layout.addWidget(self.workers_spin)
+        
+        # 性能统计开关
+        self.metrics_checkbox = QCheckBox("性能统计")
+        self.metrics_checkbox.setToolTip("统计各阶段耗时，生成时显示在状态栏，并在输出目录中保存任务报告")
+        output_layout.addWidget(self.metrics_checkbox)
+        output_layout.addStretch()
+        
+        # 编码测试按钮
+        self.benchmark_btn = QPushButton("编码测试")
+        self.benchmark_btn.setToolTip("用当前模板测试所选输出格式每张图片的编码耗时和大小")
+        output_layout.addWidget(self.benchmark_btn)
+        
+        self.output_card.layout.addLayout(output_layout)
+        
+        # 输出文件布局：文件名模板和子目录分片（只用于图片格式）
+        layout_row = QHBoxLayout()
+        layout_row.setSpacing(8)
+        self.name_template_label = QLabel("文件名:")
+        layout_row.addWidget(self.name_template_label)
+        self.name_template_edit = QLineEdit(DEFAULT_NAME_TEMPLATE)
+        self.name_template_edit.setToolTip("文件名模板：{0}、{1} 等为数据列，{index} 为行号，如 {index:06d}_{0}；"
+                                           "重名的文件依次加上 _2、_3 等后缀")
+        layout_row.addWidget(self.name_template_edit)
+        self.shard_label = QLabel("子目录:")
+        layout_row.addWidget(self.shard_label)
+        self.shard_combo = QComboBox()
+        self.shard_combo.addItem("不分子目录", None)
+        self.shard_combo.addItem("按文件名哈希", 'hash')
+        self.shard_combo.addItem(f"按行号（每 {DEFAULT_SHARD_SIZE} 个）", 'index')
+        self.shard_combo.setToolTip("数据很多时把输出文件分散到子目录中，避免单个目录中的文件过多")
+        layout_row.addWidget(self.shard_combo)
+        self.backend_label = QLabel("渲染引擎:")
+        layout_row.addWidget(self.backend_label)
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItem("Qt", 'qt')
+        self.backend_combo.addItem("Pillow", 'pillow')
+        self.backend_combo.setToolTip("Pillow 引擎用 PIL 绘制文字和编码图片，不依赖 Qt 的绘制，可以用来对比速度")
+        layout_row.addWidget(self.backend_combo)
+        layout_row.addStretch()
+        self.output_card.layout.addLayout(layout_row)
+        layout.addWidget(self.output_card)
+        
+        # 各格式的压缩级别/质量设置
+        self._format_settings = {
+            'png': DEFAULT_PNG_COMPRESSION,
+            'jpeg': DEFAULT_JPEG_QUALITY,
+            'webp': DEFAULT_WEBP_QUALITY,
+            'pdf': DEFAULT_JPEG_QUALITY,
+            'docx': DEFAULT_JPEG_QUALITY,
+        }
+        # Word 文档默认使用无损的 PNG 图片
+        self._format_options = {'png': False, 'jpeg': False, 'webp': False, 'pdf': False, 'docx': True}
+        self._current_format = None
+        self.on_format_changed()
+        
         # 创建生成按钮和进度条布局
         generate_layout = QVBoxLayout()
         generate_layout.setSpacing(8)
@@ -245,6 +380,16 @@ class MainWindow(QMainWindow):
         self.progress_bar.setVisible(False)
         generate_layout.addWidget(self.progress_bar)
         
+        # 暂停和取消按钮（仅在生成过程中显示）
+        control_layout = QHBoxLayout()
+        self.pause_btn = QPushButton("暂停")
+        self.pause_btn.setVisible(False)
+        control_layout.addWidget(self.pause_btn)
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.setVisible(False)
+        control_layout.addWidget(self.cancel_btn)
+        generate_layout.addLayout(control_layout)
+        
         # 添加生成布局到主布局
         layout.addLayout(generate_layout)
         
@@ -257,14 +402,27 @@ class MainWindow(QMainWindow):
         self.import_image_btn.clicked.connect(self.import_image)
         self.select_positions_btn.clicked.connect(self.select_all_positions)
         self.import_text_btn.clicked.connect(self.import_text)
+        self.cancel_import_btn.clicked.connect(self.cancel_import)
+        self.save_template_btn.clicked.connect(self.save_position_template)
+        self.load_template_btn.clicked.connect(self.load_position_template)
         self.generate_btn.clicked.connect(self.generate_screenshots)
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        self.cancel_btn.clicked.connect(self.cancel_generation)
+        self.format_combo.currentIndexChanged.connect(self.on_format_changed)
+        self.benchmark_btn.clicked.connect(self.benchmark_encoding)
         
         # 连接模块信号
         self.text_processor.data_loaded.connect(self.on_data_loaded)
         self.text_processor.error_occurred.connect(self.show_error)
+        self.text_processor.import_progress.connect(self.on_import_progress)
+        self.text_processor.import_cancelled.connect(self.status_label.setText)
+        self.text_processor.import_finished.connect(self.on_import_finished)
         self.image_processor.progress_updated.connect(self.update_progress)
         self.image_processor.generation_completed.connect(self.on_generation_completed)
-        self.image_processor.error_occurred.connect(self.show_error)
+        self.image_processor.generation_cancelled.connect(self.on_generation_cancelled)
+        self.image_processor.error_occurred.connect(self.on_generation_error)
+        self.image_processor.job_finished.connect(self.on_job_finished)
+        self.image_processor.metrics_updated.connect(self.on_metrics_updated)
         
         # 初始化变量
         self.image_path = None
@@ -290,11 +448,14 @@ class MainWindow(QMainWindow):
         self.image_card.setStyleSheet(Style.get_card_style(self.isDarkMode))
         self.data_card.setStyleSheet(Style.get_card_style(self.isDarkMode))
         self.position_card.setStyleSheet(Style.get_card_style(self.isDarkMode))
+        self.output_card.setStyleSheet(Style.get_card_style(self.isDarkMode))
         
         # 更新按钮样式
         self.import_image_btn.setStyleSheet(Style.get_primary_button_style(self.isDarkMode))
         self.import_text_btn.setStyleSheet(Style.get_primary_button_style(self.isDarkMode))
         self.select_positions_btn.setStyleSheet(Style.get_primary_button_style(self.isDarkMode))
+        self.save_template_btn.setStyleSheet(Style.get_primary_button_style(self.isDarkMode))
+        self.load_template_btn.setStyleSheet(Style.get_primary_button_style(self.isDarkMode))
         self.generate_btn.setStyleSheet(Style.get_success_button_style(self.isDarkMode))
         
         # 更新GitHub按钮图标
@@ -302,12 +463,12 @@ class MainWindow(QMainWindow):
         github_icon = QIcon(github_icon_path)
         if not github_icon.isNull():
             self.github_btn.setIcon(github_icon)
-            self.logger.debug(f"已更新GitHub图标: {github_icon_path}")
+            self.logger.debug("已更新GitHub图标: %s", github_icon_path)
         else:
             self.logger.warning(f"无法加载GitHub图标: {github_icon_path}")
         
         # 记录主题切换日志
-        self.logger.debug(f"主题已更新为: {'暗色' if self.isDarkMode else '亮色'}")
+        self.logger.debug("主题已更新为: %s", '暗色' if self.isDarkMode else '亮色')
 
     def select_all_positions(self):
         """一次性选择所有文字位置"""
@@ -323,10 +484,11 @@ class MainWindow(QMainWindow):
         
         # 使用第一组数据作为预览文本(如果有的话)
         preview_texts = []
-        if self.data and len(self.data) > 0:
+        sample = self.text_processor.get_sample()
+        if sample:
             for i in range(position_count):
-                if i < len(self.data[0]):
-                    preview_texts.append(str(self.data[0][i]))
+                if i < len(sample[0]):
+                    preview_texts.append(str(sample[0][i]))
                 else:
                     preview_texts.append(f"位置 {i+1}")
         else:
@@ -334,7 +496,8 @@ class MainWindow(QMainWindow):
                 preview_texts.append(f"位置 {i+1}")
         
         # 创建位置选择器对话框
-        selector = PositionSelector(self.image_path, preview_texts, self.text_positions)
+        selector = PositionSelector(self.image_path, preview_texts, self.text_positions,
+                                    data=self.text_processor.get_data() if sample else None)
         selector.position_selected.connect(self.on_positions_selected)
         selector.exec()
     
@@ -348,11 +511,56 @@ class MainWindow(QMainWindow):
         
         # 打印调试信息
         for i, pos_info in enumerate(positions):
-            self.logger.debug(f"位置 {i+1} 设置:")
-            self.logger.debug(f"  位置: ({pos_info['position'].x()}, {pos_info['position'].y()})")
-            self.logger.debug(f"  文字: {pos_info['text']}")
-            self.logger.debug(f"  字体: {pos_info['font'].family()}, {pos_info['font'].pointSize()}pt")
-            self.logger.debug(f"  颜色: ({pos_info['color'].red()}, {pos_info['color'].green()}, {pos_info['color'].blue()})")
+            self.logger.debug("位置 %d 设置: 位置 (%d, %d)，文字 %s，字体 %s %dpt，颜色 %s",
+                              i + 1, pos_info['position'].x(), pos_info['position'].y(), pos_info['text'],
+                              pos_info['font'].family(), pos_info['font'].pointSize(),
+                              pos_info['color'].name())
+    
+    def save_position_template(self):
+        """保存位置模板"""
+        if not self.text_positions:
+            QMessageBox.warning(self, "警告", "请先选择所有文字位置")
+            return
+        
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "保存位置模板",
+            "snaptext_template.json",
+            SUPPORTED_TEMPLATE_FORMATS
+        )
+        if not file_path:
+            return
+        
+        try:
+            image_size = None
+            if self.image_path and os.path.exists(self.image_path):
+                size = QImageReader(self.image_path).size()
+                if size.isValid():
+                    image_size = (size.width(), size.height())
+            save_template(file_path, self.text_positions, image_size)
+            self.status_label.setText(f"已保存位置模板: {os.path.basename(file_path)}")
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"保存位置模板失败: {str(e)}")
+            self.logger.error(f"保存位置模板失败: {str(e)}")
+    
+    def load_position_template(self):
+        """加载位置模板"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "加载位置模板",
+            "",
+            SUPPORTED_TEMPLATE_FORMATS
+        )
+        if not file_path:
+            return
+        
+        try:
+            positions = load_template(file_path)
+            self.position_count_spin.setValue(len(positions))
+            self.on_positions_selected(positions)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"加载位置模板失败: {str(e)}")
+            self.logger.error(f"加载位置模板失败: {str(e)}")
     
     def import_text(self):
         """导入文本数据"""
@@ -364,22 +572,49 @@ class MainWindow(QMainWindow):
         )
         
         if file_path:
-            self.status_label.setText("正在导入数据...")
-            try:
-                # 导入数据
-                self.text_processor.import_text(file_path=file_path)
-                self.csv_drop_label.setText(f"已导入数据:\n{os.path.basename(file_path)}")
-                self.logger.info(f"已导入数据文件: {file_path}")
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"导入数据失败: {str(e)}")
-                self.status_label.setText("导入数据失败")
-                self.logger.error(f"导入数据失败: {str(e)}")
+            self.start_data_import(file_path)
         else:
             self.status_label.setText("未选择文件")
     
+    def start_data_import(self, file_path):
+        """
+        在后台线程中导入数据文件（扫描大文件时界面保持响应，可以取消）
+
+        直接从原文件流式读取数据（生成时按需逐行读取，文件需保留到生成结束）；
+        扫描校验完成后由 on_data_loaded 更新界面，失败时由 show_error 提示。
+
+        Args:
+            file_path: 数据文件路径
+        """
+        if self.text_processor.start_import(file_path):
+            self.set_importing(True)
+            self.status_label.setText("正在导入数据...")
+            self.logger.info(f"开始导入数据文件: {file_path}")
+    
+    def set_importing(self, importing):
+        """切换导入中/空闲状态的界面"""
+        self.cancel_import_btn.setVisible(importing)
+        self.cancel_import_btn.setEnabled(True)
+    
+    def cancel_import(self):
+        """取消导入数据"""
+        self.text_processor.cancel_import()
+        self.cancel_import_btn.setEnabled(False)
+        self.status_label.setText("正在取消导入...")
+    
+    def on_import_finished(self):
+        """后台导入结束回调"""
+        self.set_importing(False)
+    
+    def on_import_progress(self, count, percent):
+        """导入进度回调"""
+        self.status_label.setText(f"正在导入数据... 已扫描 {count} 条（{percent}%）")
+    
     def on_data_loaded(self, data):
         """数据加载完成回调"""
         self.data = data
+        if isinstance(data, DataStream):
+            self.csv_drop_label.setText(f"已导入数据:\n{os.path.basename(data.file_path)}")
         self.status_label.setText(f"已导入 {len(data)} 条数据")
         # 更新数据组数选择框的最大值
         self.data_count_spin.setMaximum(min(len(data), MAX_DATA_COUNT))
@@ -399,34 +634,227 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "警告", "请选择所有文字位置")
             return
         
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setValue(0)
-        self.status_label.setText("正在生成截图...")
+        if self.image_processor.is_running():
+            QMessageBox.warning(self, "警告", "已有生成任务正在进行")
+            return
         
-        # 生成截图
+        # 生成截图（在后台线程中进行）
         data_count = self.data_count_spin.value()
         self.logger.info(f"开始生成截图，数据组数: {data_count}")
         
-        self.image_processor.generate_screenshots(
-            self.image_path,
-            self.data[:data_count],
-            self.text_positions
+        options = {
+            'workers': self.workers_spin.value(),
+            'instrument': self.metrics_checkbox.isChecked(),
+            'limit': data_count,
+        }
+        image_format = self.format_combo.currentData()
+        if image_format in OUTPUT_FORMATS:
+            try:
+                options['layout'] = OutputLayout(self.name_template_edit.text().strip() or DEFAULT_NAME_TEMPLATE,
+                                                 shard=self.shard_combo.currentData())
+                options['backend'] = self.backend_combo.currentData()
+            except ValueError as e:
+                QMessageBox.warning(self, "警告", str(e))
+                return
+        if image_format == 'pdf':
+            encoder = self.create_encoder()
+            started = self.image_processor.generate_document(
+                self.image_path,
+                self.data,
+                self.text_positions,
+                PdfSink,
+                {'compression': encoder.compression, 'jpeg_quality': encoder.jpeg_quality},
+                **options
+            )
+        elif image_format == 'docx':
+            started = self.image_processor.generate_document(
+                self.image_path,
+                self.data,
+                self.text_positions,
+                DocxSink,
+                {'columns': self.docx_columns_spin.value(), 'rows': self.docx_rows_spin.value()},
+                encoder=self.create_encoder(),
+                **options
+            )
+        elif self.archive_checkbox.isChecked():
+            started = self.image_processor.generate_document(
+                self.image_path,
+                self.data,
+                self.text_positions,
+                ArchiveSink,
+                {'archive_format': 'zip'},
+                encoder=self.create_encoder(),
+                **options
+            )
+        else:
+            started = self.image_processor.generate_screenshots(
+                self.image_path,
+                self.data,
+                self.text_positions,
+                encoder=self.create_encoder(),
+                **options
+            )
+        if started:
+            self.set_generating(True)
+            self.progress_bar.setValue(0)
+            self.status_label.setText("正在生成截图...")
+    
+    def on_format_changed(self):
+        """输出格式切换时更新压缩级别/质量控件"""
+        # 保存上一个格式的设置
+        if self._current_format is not None:
+            self._format_settings[self._current_format] = self.quality_spin.value()
+            self._format_options[self._current_format] = self.format_option_checkbox.isChecked()
+        
+        image_format = self.format_combo.currentData()
+        self._current_format = image_format
+        
+        if image_format == 'png':
+            self.quality_label.setText("压缩级别:")
+            self.quality_spin.setRange(-1, 9)
+            self.quality_spin.setSpecialValueText("默认")
+            self.quality_spin.setToolTip("PNG 压缩级别 0-9，越小编码越快、文件越大")
+        else:
+            self.quality_label.setText("质量:")
+            self.quality_spin.setRange(0, 100)
+            self.quality_spin.setSpecialValueText("")
+            tooltips = {
+                'pdf': "PDF 中底图和整页图片的 JPEG 质量 0-100",
+                'docx': "Word 文档中图片的 JPEG 质量 0-100（勾选无损时使用 PNG）",
+            }
+            self.quality_spin.setToolTip(tooltips.get(image_format, "质量 0-100，越小文件越小"))
+        self.quality_spin.setValue(self._format_settings[image_format])
+        
+        self.format_option_checkbox.setVisible(image_format != 'png')
+        self.format_option_checkbox.setText("渐进式" if image_format == 'jpeg' else "无损")
+        self.format_option_checkbox.setChecked(self._format_options[image_format])
+        
+        is_docx = image_format == 'docx'
+        self.grid_label.setVisible(is_docx)
+        self.docx_columns_spin.setVisible(is_docx)
+        self.docx_rows_spin.setVisible(is_docx)
+        is_image = image_format in OUTPUT_FORMATS
+        self.archive_checkbox.setVisible(is_image)
+        for widget in (self.name_template_label, self.name_template_edit, self.shard_label, self.shard_combo,
+                       self.backend_label, self.backend_combo):
+            widget.setVisible(is_image)
+    
+    def create_encoder(self):
+        """根据输出设置创建编码器"""
+        image_format = self.format_combo.currentData()
+        value = self.quality_spin.value()
+        option = self.format_option_checkbox.isChecked()
+        if image_format == 'pdf':
+            return PdfImageEncoder(compression='flate' if option else 'jpeg', jpeg_quality=value)
+        if image_format == 'docx':
+            return OutputEncoder(image_format='png') if option else OutputEncoder(image_format='jpeg', jpeg_quality=value)
+        return OutputEncoder(
+            image_format=image_format,
+            png_compression=value if image_format == 'png' else DEFAULT_PNG_COMPRESSION,
+            jpeg_quality=value if image_format == 'jpeg' else DEFAULT_JPEG_QUALITY,
+            jpeg_progressive=option and image_format == 'jpeg',
+            webp_quality=value if image_format == 'webp' else DEFAULT_WEBP_QUALITY,
+            webp_lossless=option and image_format == 'webp'
         )
     
+    def benchmark_encoding(self):
+        """编码测试：用当前模板和第一组数据测试所选输出格式"""
+        if not self.image_path:
+            QMessageBox.warning(self, "警告", "请先选择图片")
+            return
+        
+        if not self.text_positions:
+            QMessageBox.warning(self, "警告", "请选择所有文字位置")
+            return
+        
+        sample = self.text_processor.get_sample()
+        row = sample[0] if sample else [pos_info['text'] for pos_info in self.text_positions]
+        self.status_label.setText("正在进行编码测试...")
+        # 文档格式只支持 Qt 渲染引擎
+        backend = self.backend_combo.currentData() if self.format_combo.currentData() in OUTPUT_FORMATS else 'qt'
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            result = self.image_processor.benchmark_encoding(
+                self.image_path, self.text_positions, row, self.create_encoder(), backend=backend
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"编码测试失败: {str(e)}")
+            self.logger.error(f"编码测试失败: {str(e)}")
+            self.status_label.setText("编码测试失败")
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+        
+        message = (f"{result['format']}: 绘制 {result['ms_per_render']:.2f} ms/张，"
+                   f"编码 {result['ms_per_image']:.1f} ms/张，{result['bytes_per_image'] / 1024:.1f} KB/张")
+        self.status_label.setText(message)
+        QMessageBox.information(self, "编码测试", message)
+    
+    def set_generating(self, generating):
+        """切换生成中/空闲状态的界面"""
+        self.progress_bar.setVisible(generating)
+        self.pause_btn.setVisible(generating)
+        self.pause_btn.setText("暂停")
+        self.cancel_btn.setVisible(generating)
+        self.cancel_btn.setEnabled(True)
+        self.generate_btn.setEnabled(not generating)
+        self.benchmark_btn.setEnabled(not generating)
+    
+    def toggle_pause(self):
+        """暂停或继续生成"""
+        if self.image_processor.is_paused():
+            self.image_processor.resume_generation()
+            self.pause_btn.setText("暂停")
+            self.status_label.setText("正在生成截图...")
+        else:
+            self.image_processor.pause_generation()
+            self.pause_btn.setText("继续")
+            self.status_label.setText("已暂停")
+    
+    def cancel_generation(self):
+        """取消生成"""
+        self.image_processor.cancel_generation()
+        self.cancel_btn.setEnabled(False)
+        self.status_label.setText("正在取消...")
+    
     def update_progress(self, value):
         """更新进度条"""
         self.progress_bar.setValue(value)
     
     def on_generation_completed(self, message):
         """生成完成回调"""
-        self.progress_bar.setVisible(False)
+        self.set_generating(False)
         self.status_label.setText(message)
         QMessageBox.information(self, "完成", "截图生成完成！")
         self.logger.info("截图生成完成")
     
+    def on_metrics_updated(self, metrics):
+        """性能统计更新回调：在状态栏显示速度和各阶段的 p95 耗时"""
+        stage_names = {'paint': "绘制", 'encode': "编码", 'write': "写入"}
+        parts = [f"{metrics['images_per_second']:.1f} 张/秒"]
+        for stage, name in stage_names.items():
+            info = metrics['stages'].get(stage)
+            if info:
+                parts.append(f"{name} p95 {info['p95_ms']:.1f}ms")
+        self.status_label.setText("正在生成截图... " + "，".join(parts))
+    
+    def on_generation_cancelled(self, message):
+        """生成取消回调"""
+        self.set_generating(False)
+        self.status_label.setText(message)
+        self.logger.info("截图生成已取消")
+    
+    def on_generation_error(self, message):
+        """生成出错回调"""
+        self.set_generating(False)
+        self.show_error(message)
+    
+    def on_job_finished(self, stats):
+        """后台生成任务结束回调（无论成功、失败或取消，恢复空闲状态的界面）"""
+        self.set_generating(False)
+    
     def show_error(self, message):
-        """显示错误信息"""
-        self.progress_bar.setVisible(False)
+        """显示错误信息（不改变生成状态，导入数据出错时生成任务可能仍在进行）"""
         self.status_label.setText("发生错误")
         QMessageBox.critical(self, "错误", message)
         self.logger.error(f"错误: {message}")
@@ -477,23 +905,8 @@ class MainWindow(QMainWindow):
     
     def on_csv_dropped(self, file_path):
         """处理CSV拖放"""
-        try:
-            # 复制CSV文件到临时文件并导入
-            temp_file = copy_to_temp(file_path, "snaptext_data.csv")
-            self.text_processor.import_text(file_path=temp_file)
-            self.status_label.setText("数据已导入")
-            self.logger.info(f"拖放导入数据: {file_path}")
-            
-            # 更新拖放标签显示
-            self.csv_drop_label.setText(f"已导入数据:\n{os.path.basename(file_path)}")
-            
-            # 删除临时文件
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"导入数据失败: {str(e)}")
-            self.logger.error(f"拖放导入数据失败: {str(e)}")
-            self.status_label.setText("导入数据失败")
+        self.logger.info(f"拖放导入数据: {file_path}")
+        self.start_data_import(file_path)
 
     def toggleTheme(self, state):
         """切换主题"""
@@ -502,6 +915,9 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """处理窗口关闭事件"""
+        # 取消正在进行的导入和生成任务并等待后台线程结束
+        self.text_processor.cancel_import(wait=True)
+        self.image_processor.cancel_generation(wait=True)
         self.logger.info("应用程序关闭")
         event.accept()
 
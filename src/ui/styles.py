@@ -36,7 +36,7 @@ class Style:
             QPushButton:pressed {{
                 background-color: {"#5d5d5d" if isDark else "#c0c0c0"};
             }}
-            QSpinBox {{
+            QSpinBox, QComboBox {{
                 background-color: {"#3d3d3d" if isDark else "#ffffff"};
                 color: {text_color};
                 border: 1px solid {"#5d5d5d" if isDark else "#c0c0c0"};
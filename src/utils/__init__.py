@@ -2,7 +2,7 @@
 工具模块 - 包含应用程序使用的各种工具函数和类
 """
 
-from src.utils.file_utils import get_resource_path, copy_to_temp, ensure_dir_exists, clean_temp_files
+from src.utils.file_utils import get_resource_path, copy_to_temp, ensure_dir_exists, clean_temp_files, get_safe_filename
 from src.utils.theme_utils import is_system_dark_mode
 from src.utils.logger import Logger
 
@@ -11,6 +11,7 @@ __all__ = [
     'copy_to_temp',
     'ensure_dir_exists',
     'clean_temp_files',
+    'get_safe_filename',
     'is_system_dark_mode',
     'Logger'
 ]
\ No newline at end of file
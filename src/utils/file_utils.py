@@ -37,6 +37,21 @@ def ensure_dir_exists(directory):
         os.makedirs(directory)
     return directory
 
+def get_safe_filename(filename):
+    """获取安全的文件名"""
+    # 替换不安全的字符
+    unsafe_chars = ['/', '\\', ':', '*', '?', '"', '<', '>', '|']
+    for char in unsafe_chars:
+        filename = filename.replace(char, '_')
+    
+    # 确保文件名不超过255个字符
+    base_name, ext = os.path.splitext(filename)
+    if len(filename) > 255:
+        base_name = base_name[:255 - len(ext) - 1]
+        filename = base_name + ext
+    
+    return filename
+
 def clean_temp_files(temp_files):
     """清理临时文件"""
     for file_path in temp_files:
@@ -0,0 +1,100 @@
+"""
+字体工具类
+
+从 Qt 实际使用的字体中取出字体文件数据，供 PDF 等需要嵌入字体的输出使用。
+"""
+import struct
+from PyQt6.QtGui import QFont, QRawFont
+
+# 重建字体文件时读取的表（QRawFont 不能列出字体中的所有表，只能按名称读取）
+_SFNT_TABLES = (
+    b'cmap', b'head', b'hhea', b'hmtx', b'maxp', b'name', b'OS/2', b'post',
+    b'glyf', b'loca', b'cvt ', b'fpgm', b'prep', b'gasp', b'kern',
+    b'GDEF', b'GPOS', b'GSUB', b'CFF ', b'vhea', b'vmtx',
+)
+
+# 字体文件数据缓存: QFont.key() -> bytes 或 None
+_font_data_cache = {}
+
+
+def font_pixel_size(font, dpi):
+    """
+    计算字体在指定分辨率下的像素大小
+
+    Qt 绘制时把点数换算为整数像素大小，这里使用相同的取整方式。
+
+    Args:
+        font: QFont 对象
+        dpi: 绘制设备的逻辑分辨率
+
+    Returns:
+        像素大小
+    """
+    if font.pixelSize() > 0:
+        return font.pixelSize()
+    return round(font.pointSizeF() * dpi / 72)
+
+
+def _table_checksum(data):
+    """计算 sfnt 表的校验和"""
+    padded = data + b'\0' * (-len(data) % 4)
+    return sum(struct.unpack(f">{len(padded) // 4}L", padded)) & 0xFFFFFFFF
+
+
+def font_file_data(font):
+    """
+    获取 Qt 绘制指定字体时实际使用的字体文件数据
+
+    字体表从 QRawFont 读取后重新组装为 TrueType/OpenType 文件，不依赖字体文件的安装位置。
+    Qt 用常规字体合成的粗体和斜体没有对应的字体文件，此时返回None。
+
+    Args:
+        font: QFont 对象
+
+    Returns:
+        字体文件数据 bytes，无法获取时返回None
+    """
+    key = font.key()
+    if key in _font_data_cache:
+        return _font_data_cache[key]
+
+    data = None
+    raw_font = QRawFont.fromFont(font)
+    synthetic_bold = font.weight() >= QFont.Weight.DemiBold.value and raw_font.weight() < QFont.Weight.DemiBold.value
+    synthetic_italic = (font.style() != QFont.Style.StyleNormal
+                        and raw_font.style() == QFont.Style.StyleNormal)
+    if raw_font.isValid() and not synthetic_bold and not synthetic_italic:
+        tables = [(tag, raw_font.fontTable(tag.decode('ascii')).data()) for tag in _SFNT_TABLES]
+        tables = [(tag, table) for tag, table in tables if table]
+        if tables:
+            data = _build_sfnt(tables)
+
+    _font_data_cache[key] = data
+    return data
+
+
+def _build_sfnt(tables):
+    """
+    把字体表组装为 sfnt 字体文件
+
+    Args:
+        tables: [(表名, 表数据)]
+
+    Returns:
+        字体文件数据 bytes
+    """
+    tables.sort()
+    count = len(tables)
+    entry_selector = count.bit_length() - 1
+    search_range = (1 << entry_selector) * 16
+    version = b'OTTO' if any(tag == b'CFF ' for tag, _ in tables) else b'\x00\x01\x00\x00'
+
+    header = [version + struct.pack(">HHHH", count, search_range, entry_selector, count * 16 - search_range)]
+    body = []
+    offset = 12 + count * 16
+    for tag, table in tables:
+        header.append(tag + struct.pack(">LLL", _table_checksum(table), offset, len(table)))
+        padded = table + b'\0' * (-len(table) % 4)
+        body.append(padded)
+        offset += len(padded)
+    return b''.join(header + body)
@@ -1,78 +1,320 @@
 """
 日志处理工具类
+
+日志记录通过 QueueHandler 放入队列，由 QueueListener 在后台线程中格式化并写入文件和控制台，
+调用方只承担级别判断和入队的开销。消息使用 %-style 参数延迟格式化：
+    logger.debug("已保存: %s", output_path)
+未启用的级别不会格式化消息。
 """
 import os
+import re
+import glob
+import gzip
+import queue
+import shutil
+import atexit
 import logging
 import tempfile
-from datetime import datetime
+import threading
+import multiprocessing
+import multiprocessing.util
+from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener, BaseRotatingHandler, WatchedFileHandler
+from src.config.constants import (DEFAULT_LOG_LEVEL, LOG_LEVEL_ENV, LOG_SAMPLE_INTERVAL,
+                                  LOG_FILENAME, LOG_MAX_BYTES, LOG_BACKUP_COUNT)
+
+# 旧版本按天命名的日志文件
+_LEGACY_LOG_PATTERN = re.compile(r"^snaptext_(\d{8})\.log$")
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    不在调用线程中格式化的 QueueHandler
+
+    标准的 QueueHandler.prepare() 会在调用线程中完成格式化，
+    这里只把非基本类型的参数转换为字符串（避免入队后被修改），格式化留给监听线程。
+    """
+
+    def prepare(self, record):
+        if isinstance(record.args, tuple):
+            record.args = tuple(arg if isinstance(arg, (str, int, float)) else str(arg)
+                                for arg in record.args)
+        return record
+
+
+class CompressedRotatingFileHandler(BaseRotatingHandler):
+    """
+    按大小和时间轮转的日志文件处理器
+
+    文件超过 max_bytes 或跨过午夜时轮转，旧日志压缩为 <文件名>.<时间>.gz，只保留最近 backup_count 个。
+    轮转在 QueueListener 的后台线程中进行，不会阻塞记录日志的线程。
+    文件被占用而轮转失败时继续写入原文件，到下一个大小或时间界限时再尝试，不会每条记录都重试。
+    """
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, encoding="utf-8"):
+        """
+        初始化处理器
+
+        Args:
+            filename: 日志文件路径
+            max_bytes: 单个日志文件的最大字节数，0 表示不按大小轮转
+            backup_count: 保留的压缩旧日志数量
+            encoding: 文件编码
+        """
+        super().__init__(filename, 'a', encoding=encoding)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rollover_at = self._next_midnight(datetime.now())
+        self.rollover_size = max_bytes  # 文件达到该大小时轮转（轮转失败后推迟到下一个 max_bytes 的整数倍）
+
+        # 上次运行留下的日志不是今天写的，先轮转
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            modified = datetime.fromtimestamp(os.path.getmtime(filename))
+            if self._next_midnight(modified) <= datetime.now():
+                self.doRollover()
+
+    @staticmethod
+    def _next_midnight(moment):
+        """指定时间之后的下一个午夜"""
+        return datetime.combine(moment.date() + timedelta(days=1), datetime.min.time())
+
+    def shouldRollover(self, record):
+        """是否需要轮转（按文件当前大小判断，不重复格式化记录）"""
+        if datetime.now() >= self.rollover_at:
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            return self.stream.tell() >= self.rollover_size
+        return False
+
+    def doRollover(self):
+        """关闭当前文件，压缩为带时间的备份，删除多余的旧备份后重新打开"""
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        self.rollover_size = self.max_bytes
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            try:
+                compress_log(self.baseFilename, f"{self.baseFilename}.{stamp}")
+            except OSError:
+                # 文件被其他进程占用时（Windows）放弃本次轮转，继续写入原文件，到下一个大小界限再尝试
+                if self.max_bytes > 0 and os.path.exists(self.baseFilename):
+                    size = os.path.getsize(self.baseFilename)
+                    self.rollover_size = (size // self.max_bytes + 1) * self.max_bytes
+            self._remove_old_backups()
+
+        self.rollover_at = self._next_midnight(datetime.now())
+        self.stream = self._open()
+
+    def _remove_old_backups(self):
+        """只保留最近 backup_count 个压缩旧日志"""
+        backups = sorted(glob.glob(glob.escape(self.baseFilename) + ".*.gz"), key=os.path.getmtime)
+        for path in backups[:max(0, len(backups) - self.backup_count)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def compress_log(source, backup_base):
+    """
+    把日志文件移走并压缩为 gzip，原文件被删除
+
+    Args:
+        source: 日志文件路径
+        backup_base: 备份文件路径（不含 .gz），已存在时自动加序号
+    """
+    target = backup_base + ".gz"
+    counter = 1
+    while os.path.exists(target):
+        target = f"{backup_base}-{counter}.gz"
+        counter += 1
+
+    # 先改名再压缩，压缩期间新的日志可以写入新文件
+    temp_path = target[:-3] + ".tmp"
+    os.replace(source, temp_path)
+    with open(temp_path, 'rb') as f_in, gzip.open(target, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(temp_path)
+
+
+def _migrate_legacy_logs(log_dir, log_file):
+    """把旧版本按天命名、不会被清理的日志文件压缩为轮转备份"""
+    for name in os.listdir(log_dir):
+        match = _LEGACY_LOG_PATTERN.match(name)
+        if match:
+            try:
+                compress_log(os.path.join(log_dir, name), f"{log_file}.{match.group(1)}-000000")
+            except OSError:
+                pass
+
+
+def parse_level(level):
+    """
+    把级别名称或数值转换为 logging 级别
+
+    Args:
+        level: 级别名称（如 "DEBUG"）或数值
+
+    Returns:
+        logging 级别数值
+    """
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"无效的日志级别: {level}")
+    return value
+
 
 class Logger:
     """日志记录器"""
-    
+
     _instance = None
-    
+    _initialized = False
+
     @classmethod
     def get_instance(cls):
         """获取单例实例"""
+        return cls()
+
+    def __new__(cls):
+        # 每个进程只有一个实例，直接调用 Logger() 也返回同一个对象
         if cls._instance is None:
-            cls._instance = cls()
+            cls._instance = super().__new__(cls)
         return cls._instance
-    
+
     def __init__(self):
-        """初始化日志记录器"""
+        """初始化日志记录器（重复调用不会重复添加处理器）"""
+        if self._initialized:
+            return
+        Logger._initialized = True
+
         # 创建日志目录
         log_dir = os.path.join(tempfile.gettempdir(), "snaptext_logs")
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
-        
-        # 创建日志文件名
-        log_file = os.path.join(log_dir, f"snaptext_{datetime.now().strftime('%Y%m%d')}.log")
-        
-        # 配置日志记录器
+        log_file = os.path.join(log_dir, LOG_FILENAME)
+
+        # 配置日志记录器（级别可通过环境变量 SNAPTEXT_LOG_LEVEL 或 set_level() 设置）
         self.logger = logging.getLogger("SnapText")
-        self.logger.setLevel(logging.DEBUG)
-        
-        # 创建文件处理器
-        file_handler = logging.FileHandler(log_file, encoding="utf-8")
-        file_handler.setLevel(logging.DEBUG)
-        
+        self.logger.setLevel(parse_level(os.environ.get(LOG_LEVEL_ENV, DEFAULT_LOG_LEVEL)))
+        self.logger.propagate = False  # 不再交给根记录器，避免重复输出
+
+        # 创建文件处理器：主进程负责按大小和时间轮转，
+        # 多进程渲染池的子进程只追加写入，文件被轮转后自动重新打开
+        if multiprocessing.parent_process() is None:
+            _migrate_legacy_logs(log_dir, log_file)
+            file_handler = CompressedRotatingFileHandler(log_file)
+        else:
+            file_handler = WatchedFileHandler(log_file, encoding="utf-8")
+
         # 创建控制台处理器
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
-        
+
         # 创建格式化器
         formatter = logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s")
         file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
-        
-        # 添加处理器到日志记录器
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
-    
-    def debug(self, message):
+
+        # 记录放入队列，由后台线程格式化并写入文件和控制台
+        log_queue = queue.SimpleQueue()
+        self._queue_handler = _DeferredQueueHandler(log_queue)
+        self.logger.addHandler(self._queue_handler)
+        self._listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        self._listener.start()
+
+        # 进程退出时写完队列中剩余的记录（多进程子进程不会执行 atexit，需要注册 Finalize）
+        atexit.register(self.stop)
+        multiprocessing.util.Finalize(self, self.stop, exitpriority=1)
+
+        # 热循环中采样记录的计数: 键 -> 次数
+        self._samples = {}
+        self._samples_lock = threading.Lock()
+
+    def stop(self):
+        """
+        停止后台写日志线程，写完队列中剩余的记录
+
+        之后的记录（如其他退出回调中记录的）在调用线程中直接写入文件和控制台，不会丢失。
+        """
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+        # 先改为直接写入再停止监听线程，两者之间入队的记录仍由监听线程写完
+        for handler in listener.handlers:
+            self.logger.addHandler(handler)
+        self.logger.removeHandler(self._queue_handler)
+        listener.stop()
+
+    def set_level(self, level):
+        """
+        设置日志级别
+
+        Args:
+            level: 级别名称（如 "DEBUG"、"INFO"）或数值
+        """
+        self.logger.setLevel(parse_level(level))
+
+    def is_enabled_for(self, level):
+        """指定级别的日志是否会被记录"""
+        return self.logger.isEnabledFor(level)
+
+    def debug(self, message, *args, **kwargs):
         """记录调试信息"""
-        self.logger.debug(message)
-    
-    def info(self, message):
+        self.logger.debug(message, *args, **kwargs)
+
+    def info(self, message, *args, **kwargs):
         """记录一般信息"""
-        self.logger.info(message)
-    
-    def warning(self, message):
+        self.logger.info(message, *args, **kwargs)
+
+    def warning(self, message, *args, **kwargs):
         """记录警告信息"""
-        self.logger.warning(message)
-    
-    def error(self, message, exc_info=False):
+        self.logger.warning(message, *args, **kwargs)
+
+    def error(self, message, *args, exc_info=False, **kwargs):
         """记录错误信息
-        
+
         Args:
-            message: 错误信息
+            message: 错误信息（可包含 %-style 占位符）
+            *args: 占位符参数
             exc_info: 是否包含异常详情
         """
-        self.logger.error(message, exc_info=exc_info)
-    
-    def critical(self, message):
+        self.logger.error(message, *args, exc_info=exc_info, **kwargs)
+
+    def critical(self, message, *args, **kwargs):
         """记录严重错误信息"""
-        self.logger.critical(message)
+        self.logger.critical(message, *args, **kwargs)
+
+    def sample(self, key, level, message, *args, interval=LOG_SAMPLE_INTERVAL):
+        """
+        采样记录热循环中的诊断信息：同一个键的第1次和之后每 interval 次记录一次
+
+        每个键出现的总次数由 log_sample_summary() 在任务结束时汇总记录。
+
+        Args:
+            key: 采样键，如 "saved"、"paint_error"
+            level: 日志级别
+            message: 日志信息（可包含 %-style 占位符）
+            *args: 占位符参数
+            interval: 采样间隔
+        """
+        with self._samples_lock:
+            count = self._samples.get(key, 0) + 1
+            self._samples[key] = count
+        if (count == 1 or count % interval == 0) and self.logger.isEnabledFor(level):
+            self.logger.log(level, message + " (第 %d 次)", *args, count)
+
+    def log_sample_summary(self):
+        """汇总记录采样信息的出现次数，并清空计数"""
+        with self._samples_lock:
+            samples, self._samples = self._samples, {}
+        for key, count in samples.items():
+            self.logger.info("诊断信息 %s: 共 %d 次", key, count)
 
 # 创建全局日志记录器
-logger = Logger.get_instance() 
\ No newline at end of file
+logger = Logger.get_instance()